@@ -131,3 +131,7 @@ REST_FRAMEWORK = {
     ]
 }
 
+
+# Bulk book requests (api.views.BookBulkView) carry up to BULK_MAX_ROWS
+# rows, more than Django's default 2.5 MB request body limit
+DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024
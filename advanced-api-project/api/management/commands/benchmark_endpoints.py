@@ -0,0 +1,220 @@
+import json
+import math
+import random
+import subprocess
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from api.models import Author, Book
+from api.views import AuthorListView, BookListView
+
+WORDS = (
+    'river night house garden storm letter silent empire winter city '
+    'shadow kingdom promise journey stranger ocean memory fire road'
+).split()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+
+@contextmanager
+def counting_queries():
+    # Unlike CaptureQueriesContext, not capped by the 9000-entry query log
+    counter = {'queries': 0}
+
+    def count(execute, sql, params, many, context):
+        counter['queries'] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        yield counter
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """Endpoints that issue more queries, or got slower at p99, than the baseline."""
+    regressions = []
+    for name, current in results['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(name)
+        if previous is None or 'error' in previous:
+            continue
+        if 'error' in current:
+            regressions.append(f"{name}: {current['error']}")
+            continue
+        if current['queries'] > previous['queries']:
+            regressions.append(f"{name}: {previous['queries']} -> {current['queries']} queries")
+        if current['p99_ms'] > previous['p99_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {previous['p99_ms']:.2f} -> {current['p99_ms']:.2f} ms")
+        if previous.get('index_only') and not current.get('index_only'):
+            regressions.append(f"{name}: no longer index-only: {' / '.join(current['plan'])}")
+    return regressions
+
+
+def is_index_only(plan):
+    """Whether every access to the book table in an EXPLAIN is index-only."""
+    if connection.vendor == 'sqlite':
+        steps = [line for line in plan if ' api_book' in line]
+        return bool(steps) and all('COVERING INDEX' in line for line in steps)
+    if connection.vendor == 'postgresql':
+        steps = [line for line in plan if ' on api_book' in line]
+        return bool(steps) and all('Index Only Scan' in line for line in steps)
+    return None
+
+
+# Benchmarks BookListView and AuthorListView on generated authors and books
+class Command(BaseCommand):
+    help = (
+        'Seed synthetic authors and books (rolled back afterwards), then report '
+        'p50/p99 latency, query counts, response sizes and query plans of '
+        'BookListView and AuthorListView as JSON. '
+        'Production-like scale: --authors 50000 --books 1000000.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--authors', type=int, default=1000)
+        parser.add_argument('--books', type=int, default=10000)
+        parser.add_argument('--requests', type=int, default=50, help='Requests per endpoint')
+        parser.add_argument(
+            '--endpoint', action='append', dest='endpoints',
+            help='Only benchmark this endpoint (repeatable), e.g. "BookListView?author"',
+        )
+        parser.add_argument('--output', help='Write the JSON results to this file instead of stdout')
+        parser.add_argument('--baseline', help='Fail if results regress against this earlier JSON output')
+        parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed p99 slowdown vs the baseline')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        with transaction.atomic():
+            self._seed(options['authors'], options['books'])
+            endpoints = self._measure(options['requests'], options['endpoints'])
+            transaction.set_rollback(True)
+
+        results = {
+            'project': 'advanced-api-project',
+            'commit': git_commit(),
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'scale': {key: options[key] for key in ('authors', 'books', 'requests')},
+            'endpoints': endpoints,
+        }
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+        if options['baseline']:
+            with open(options['baseline']) as fh:
+                regressions = compare(results, json.load(fh), options['tolerance'])
+            if regressions:
+                raise CommandError('Regressions against baseline:\n  ' + '\n  '.join(regressions))
+            self.stderr.write(self.style.SUCCESS('No regressions against baseline'))
+
+    def _seed(self, author_count, book_count):
+        self.stderr.write(f'Seeding {author_count} authors and {book_count} books...')
+        Author.objects.bulk_create(
+            [Author(name=f'Author {i} {self.rng.choice(WORDS).title()}') for i in range(author_count)],
+            batch_size=5000,
+        )
+        # bulk_create skips Book.save(), so author_name is filled in here
+        authors = list(Author.objects.values_list('pk', 'name'))
+        self.author_id = authors[0][0]
+        batch = []
+        for _ in range(book_count):
+            author_id, author_name = self.rng.choice(authors)
+            batch.append(Book(
+                title=' '.join(self.rng.choices(WORDS, k=3)).title(),
+                publication_year=self.rng.randint(1800, 2024),
+                author_id=author_id,
+                author_name=author_name,
+            ))
+            if len(batch) == 5000:
+                Book.objects.bulk_create(batch)
+                batch = []
+        Book.objects.bulk_create(batch)
+
+    def _measure(self, requests, only=None):
+        factory = APIRequestFactory()
+        endpoints = {
+            'BookListView': (BookListView, '/api/books/', {}),
+            'BookListView?publication_year': (BookListView, '/api/books/', {'publication_year': 1999}),
+            'BookListView?publication_year__range': (
+                BookListView, '/api/books/', {'publication_year__gte': 1990, 'publication_year__lte': 1994},
+            ),
+            'BookListView?author': (BookListView, '/api/books/', {'author': self.author_id}),
+            'BookListView?title': (BookListView, '/api/books/', {'title': 'Winter Road Fire'}),
+            'BookListView?search': (BookListView, '/api/books/', {'search': 'winter'}),
+            'BookListView?ordering': (BookListView, '/api/books/', {'ordering': '-publication_year'}),
+            'AuthorListView': (AuthorListView, '/api/authors/', {}),
+            'AuthorListView?expand': (AuthorListView, '/api/authors/', {'expand': 'books', 'page': 2}),
+        }
+        if only:
+            unknown = set(only) - set(endpoints)
+            if unknown:
+                raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+            endpoints = {name: endpoint for name, endpoint in endpoints.items() if name in only}
+        results = {}
+        # Requests are built by the test factory, whose host is "testserver"
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for name, (view_class, path, params) in endpoints.items():
+                try:
+                    results[name] = self._time_endpoint(factory, view_class.as_view(), path, params, requests)
+                except Exception as exc:
+                    # Keep benchmarking the other endpoints; a broken one is reported
+                    results[name] = {'error': f'{type(exc).__name__}: {exc}'}
+                    self.stderr.write(self.style.ERROR(f"{name}: {results[name]['error']}"))
+                    continue
+                results[name]['plan'] = plan = self._explain(factory, view_class, path, params)
+                results[name]['index_only'] = is_index_only(plan)
+                self.stderr.write(
+                    f"{name}: p50 {results[name]['p50_ms']} ms, p99 {results[name]['p99_ms']} ms, "
+                    f"{results[name]['queries']} queries, {results[name]['bytes']} bytes, "
+                    f"index-only: {results[name]['index_only']}"
+                )
+        return results
+
+    def _explain(self, factory, view_class, path, params):
+        # Build the list query exactly as the view would, without running it
+        view = view_class(args=(), kwargs={}, format_kwarg=None)
+        view.request = view.initialize_request(factory.get(path, params))
+        queryset = view.filter_queryset(view.get_queryset())
+        return queryset.explain().splitlines()
+
+    def _time_endpoint(self, factory, view, path, params, requests):
+        timings, queries, size = [], 0, 0
+        for _ in range(requests):
+            request = factory.get(path, params)
+            with counting_queries() as counter:
+                start = time.perf_counter()
+                response = view(request)
+                response.render()
+                timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f'HTTP {response.status_code}')
+            queries = max(queries, counter['queries'])
+            size = max(size, len(response.content))
+        return {
+            'requests': requests,
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+            'mean_ms': round(sum(timings) / len(timings), 3),
+            'queries': queries,
+            'bytes': size,
+        }
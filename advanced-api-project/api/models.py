@@ -6,6 +6,20 @@ from django.db import models
 class Author(models.Model):
     name = models.CharField(max_length=255)
 
+    class Meta:
+        # AuthorListView pages through authors by name
+        indexes = [models.Index(fields=["name"], name="author_name_idx")]
+
+    def save(self, *args, **kwargs):
+        # A new author has no books yet
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        if adding or (update_fields is not None and "name" not in update_fields):
+            return
+        # Keep the copy of the name on each book in step (see Book.author_name)
+        self.books.exclude(author_name=self.name).update(author_name=self.name)
+
     def __str__(self):
         return self.name
 
@@ -13,10 +27,30 @@ class Author(models.Model):
 # Book model
 # Stores info about a book written by an Author.
 # Linked to Author through a ForeignKey (Many books → One author).
+# Indexes match BookListView's filters and orderings. Each one also holds
+# the other listed columns, so filtered listings are answered from the
+# index alone; the FK's own index is dropped as book_author_title_idx
+# starts with it.
 class Book(models.Model):
     title = models.CharField(max_length=255)
     publication_year = models.IntegerField()
-    author = models.ForeignKey(Author, related_name="books", on_delete=models.CASCADE)
+    author = models.ForeignKey(Author, related_name="books", on_delete=models.CASCADE, db_index=False)
+    # Copy of author.name so search doesn't join the author table. Kept in
+    # step by Author.save() and Book.save() only: after renaming authors
+    # with QuerySet.update() or bulk_update(), also run
+    # Book.objects.filter(author__in=...).update(author_name=...)
+    author_name = models.CharField(max_length=255, editable=False, default="")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["title", "publication_year", "author"], name="book_title_idx"),
+            models.Index(fields=["publication_year", "title", "author"], name="book_year_title_idx"),
+            models.Index(fields=["author", "title", "publication_year"], name="book_author_title_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.author_name = self.author.name
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.title
@@ -0,0 +1,18 @@
+from rest_framework.pagination import PageNumberPagination
+
+
+# Page-number pagination for AuthorListView: each page holds at most
+# max_page_size authors, each with at most
+# EXPANDED_BOOKS books (see api/views.py).
+class AuthorPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+# Page-number pagination for BookListView, so a broad filter such as a
+# year range returns one bounded page rather than every matching book.
+class BookPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
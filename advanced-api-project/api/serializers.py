@@ -1,11 +1,125 @@
+from django.db import DatabaseError, transaction
+from django.db.models import QuerySet
 from rest_framework import serializers
 from .models import Author, Book
 from datetime import datetime
 
+# The bulk-write code below has a twin in api_project's
+# api/serializers.py. The projects share no package, so each carries a
+# copy; keep the two in step.
+
+# Rows written per transaction by bulk requests
+BULK_CHUNK_SIZE = 1000
+# Largest number of rows accepted by one bulk request
+BULK_MAX_ROWS = 10000
+
+_ID_FIELD = serializers.IntegerField(min_value=1)
+
+
+def _pk(value):
+    # Same rules as BookIdsSerializer: 1.9 or True is not an id, not book 1
+    try:
+        return _ID_FIELD.run_validation(value)
+    except serializers.ValidationError:
+        return None
+
+
+# Raised by write_in_chunks() when a chunk fails to write
+# Bulk writes are not all-or-nothing: the chunks before the failing one
+# are committed, and "written" lists their rows.
+class BulkWriteError(Exception):
+
+    def __init__(self, written):
+        self.written = written
+        super().__init__(f"Writing failed at row {len(written)}; the {len(written)} rows before it were written.")
+
+
+def write_in_chunks(rows, write):
+    """Call write() on every BULK_CHUNK_SIZE rows, each chunk in its own transaction."""
+    for start in range(0, len(rows), BULK_CHUNK_SIZE):
+        try:
+            with transaction.atomic():
+                write(rows[start:start + BULK_CHUNK_SIZE])
+        except DatabaseError as exc:
+            raise BulkWriteError(rows[:start]) from exc
+
+
+# Author field of BookSerializer
+# In bulk requests BookListSerializer loads every referenced author in one
+# query up front; rows are then resolved from that instead of a get() each.
+class AuthorField(serializers.PrimaryKeyRelatedField):
+
+    def to_internal_value(self, data):
+        pk = _pk(data)
+        if pk is None:
+            # The queryset lookup would truncate 1.9 to author 1
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        author = self.context.get("prefetched_authors", {}).get(pk)
+        if author is not None:
+            return author
+        return super().to_internal_value(pk)
+
+
+# Serializer used for BookSerializer(many=True)
+# Validates every row (errors are keyed by row index) and writes them with
+# bulk_create/bulk_update through write_in_chunks().
+# For updates, pass the books (or a queryset) as the instance and include
+# "id" in each row.
+class BookListSerializer(serializers.ListSerializer):
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            author_ids = {_pk(row.get("author")) for row in data if isinstance(row, dict)}
+            author_ids.discard(None)
+            self.context["prefetched_authors"] = Author.objects.in_bulk(author_ids)
+        return super().to_internal_value(data)
+
+    def books_by_id(self):
+        # The instance may be a queryset; only the rows named in the data are loaded
+        if not hasattr(self, "_books_by_id"):
+            rows = self.initial_data if isinstance(self.initial_data, list) else []
+            ids = {_pk(row.get("id")) for row in rows if isinstance(row, dict)}
+            ids.discard(None)
+            books = self.instance
+            if isinstance(books, QuerySet):
+                books = books.filter(pk__in=ids)
+            self._books_by_id = {book.pk: book for book in books if book.pk in ids}
+        return self._books_by_id
+
+    def run_child_validation(self, data):
+        if self.instance is not None:
+            book_id = _pk(data.get("id")) if isinstance(data, dict) else None
+            if book_id not in self.books_by_id():
+                raise serializers.ValidationError({"id": ["No book with this id."]})
+            self.child.instance = self.books_by_id()[book_id]
+            self.child.initial_data = data
+        return super().run_child_validation(data)
+
+    def create(self, validated_data):
+        books = [Book(author_name=attrs["author"].name, **attrs) for attrs in validated_data]
+        write_in_chunks(books, Book.objects.bulk_create)
+        return books
+
+    def update(self, instance, validated_data):
+        books, fields = [], set()
+        for row, attrs in zip(self.initial_data, validated_data):
+            book = self.books_by_id()[_pk(row["id"])]
+            for name, value in attrs.items():
+                setattr(book, name, value)
+            if "author" in attrs:
+                book.author_name = attrs["author"].name
+                fields.add("author_name")
+            fields.update(attrs)
+            books.append(book)
+        if fields:
+            write_in_chunks(books, lambda chunk: Book.objects.bulk_update(chunk, list(fields)))
+        return books
+
 
 # Serializer for Book model
 # Serializes all fields and adds custom validation
 class BookSerializer(serializers.ModelSerializer):
+    author = AuthorField(queryset=Author.objects.all())
 
     # Custom validation for publication year
     def validate_publication_year(self, value):
@@ -17,14 +131,29 @@ class BookSerializer(serializers.ModelSerializer):
     class Meta:
         model = Book
         fields = ['id', 'title', 'publication_year', 'author']
+        list_serializer_class = BookListSerializer
+
+
+class BookIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=BULK_MAX_ROWS
+    )
 
 
 # Serializer for Author model
-# Demonstrates nested serialization:
-# Includes a list of books (BookSerializer) under each Author.
+# books_count comes from an annotation (see AuthorListView). The nested
+# books are only included when the context asks for them ("expand_books"),
+# and come from the capped "book_preview" prefetch, not author.books.
 class AuthorSerializer(serializers.ModelSerializer):
-    books = BookSerializer(many=True, read_only=True)
+    books_count = serializers.IntegerField(read_only=True)
+    books = BookSerializer(many=True, read_only=True, source='book_preview')
 
     class Meta:
         model = Author
-        fields = ['id', 'name', 'books']
+        fields = ['id', 'name', 'books_count', 'books']
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.context.get('expand_books'):
+            del fields['books']
+        return fields
@@ -1,8 +1,13 @@
+import json
+from unittest import mock
+
+from django.db import DatabaseError
 from django.urls import reverse
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from django.contrib.auth.models import User
 from .models import Author, Book
+from .views import EXPANDED_BOOKS
 
 
 class BookAPITestCase(APITestCase):
@@ -36,7 +41,14 @@ class BookAPITestCase(APITestCase):
         url = reverse("book-list")
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 3)
+        self.assertEqual(response.data["count"], 3)
+        self.assertEqual(len(response.data["results"]), 3)
+
+    def test_list_books_is_paginated(self):
+        url = reverse("book-list") + "?page_size=2&page=2"
+        response = self.client.get(url)
+        self.assertEqual(response.data["count"], 3)
+        self.assertEqual([book["title"] for book in response.data["results"]], ["Things Fall Apart"])
 
     # ----------------------------
     # Test Retrieve Endpoint
@@ -96,8 +108,8 @@ class BookAPITestCase(APITestCase):
     def test_filter_books_by_title(self):
         url = reverse("book-list") + "?title=The Alchemist"
         response = self.client.get(url)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["title"], "The Alchemist")
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["title"], "The Alchemist")
 
     # ----------------------------
     # Test Searching
@@ -105,7 +117,7 @@ class BookAPITestCase(APITestCase):
     def test_search_books_by_author(self):
         url = reverse("book-list") + "?search=Chinua"
         response = self.client.get(url)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data["results"]), 2)
 
     # ----------------------------
     # Test Ordering
@@ -113,4 +125,137 @@ class BookAPITestCase(APITestCase):
     def test_order_books_by_publication_year_desc(self):
         url = reverse("book-list") + "?ordering=-publication_year"
         response = self.client.get(url)
-        self.assertEqual(response.data[0]["publication_year"], 1988)  # The Alchemist first
+        self.assertEqual(response.data["results"][0]["publication_year"], 1988)  # The Alchemist first
+
+    # ----------------------------
+    # Test Year Range Filter
+    # ----------------------------
+    def test_filter_books_by_publication_year_range(self):
+        url = reverse("book-list") + "?publication_year__gte=1959&publication_year__lte=1990"
+        response = self.client.get(url)
+        self.assertEqual([book["title"] for book in response.data["results"]], ["No Longer at Ease", "The Alchemist"])
+
+    # ----------------------------
+    # Test Search After Author Rename
+    # ----------------------------
+    def test_search_follows_author_rename(self):
+        self.author2.name = "P. Coelho"
+        self.author2.save()
+        response = self.client.get(reverse("book-list") + "?search=P. Coelho")
+        self.assertEqual(len(response.data["results"]), 1)
+
+    def test_creating_an_author_skips_the_book_update(self):
+        with self.assertNumQueries(1):
+            Author.objects.create(name="Chimamanda Adichie")
+
+    # ----------------------------
+    # Test Author List
+    # ----------------------------
+    def test_list_authors_counts_books_without_expanding(self):
+        self.client.logout()  # keep session queries out of the count
+        with self.assertNumQueries(2):  # count + page
+            response = self.client.get(reverse("author-list"))
+        self.assertEqual(
+            [(author["name"], author["books_count"]) for author in response.data["results"]],
+            [("Chinua Achebe", 2), ("Paulo Coelho", 1)],
+        )
+        self.assertNotIn("books", response.data["results"][0])
+
+    def test_list_authors_expand_books_is_capped(self):
+        Book.objects.bulk_create(
+            Book(title=f"Extra {i}", publication_year=2000, author=self.author2, author_name=self.author2.name)
+            for i in range(10)
+        )
+        self.client.logout()
+        with self.assertNumQueries(3):  # count + page + one prefetch for all authors
+            response = self.client.get(reverse("author-list") + "?expand=books")
+        coelho = response.data["results"][1]
+        self.assertEqual(coelho["books_count"], 11)
+        self.assertEqual(len(coelho["books"]), EXPANDED_BOOKS)
+
+    # ----------------------------
+    # Test Bulk Endpoints
+    # ----------------------------
+    def test_bulk_create_books(self):
+        rows = [{"title": f"Bulk {i}", "publication_year": 2001, "author": self.author2.id} for i in range(50)]
+        # session, user, authors, then one INSERT in its own savepoint
+        with self.assertNumQueries(6):
+            response = self.client.post(reverse("book-bulk"), rows, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created"], 50)
+        self.assertEqual(Book.objects.filter(author_name="Paulo Coelho").count(), 51)
+
+    def test_bulk_create_reports_errors_per_row(self):
+        rows = [
+            {"title": "Fine", "publication_year": 2001, "author": self.author1.id},
+            {"title": "Future", "publication_year": 3000, "author": self.author1.id},
+            {"title": "Orphan", "publication_year": 2001, "author": 999},
+        ]
+        response = self.client.post(reverse("book-bulk"), rows, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([error["index"] for error in response.data["errors"]], [1, 2])
+        self.assertIn("publication_year", response.data["errors"][0]["errors"])
+        self.assertEqual(Book.objects.count(), 3)
+
+    def test_bulk_update_and_delete_books(self):
+        rows = [
+            {"id": self.book1.id, "title": "Things Fall Apart (1958)"},
+            {"id": self.book3.id, "author": self.author1.id},
+        ]
+        response = self.client.patch(reverse("book-bulk"), rows, format="json")
+        self.assertEqual(response.data, {"updated": 2})
+        self.book1.refresh_from_db()
+        self.assertEqual(self.book1.title, "Things Fall Apart (1958)")
+        self.assertEqual(Book.objects.get(pk=self.book3.id).author_name, "Chinua Achebe")
+
+        response = self.client.delete(reverse("book-bulk"), {"ids": [self.book1.id, self.book2.id]}, format="json")
+        self.assertEqual(response.data, {"deleted": 2})
+        self.assertEqual(list(Book.objects.values_list("id", flat=True)), [self.book3.id])
+
+    def test_bulk_rejects_non_integral_ids(self):
+        rows = [{"id": self.book1.id + 0.9, "title": "Wrong book"}]
+        response = self.client.patch(reverse("book-bulk"), rows, format="json")
+        self.assertEqual(response.data["errors"], [{"index": 0, "errors": {"id": ["No book with this id."]}}])
+        rows = [{"title": "Wrong author", "publication_year": 2001, "author": self.author1.id + 0.9}]
+        response = self.client.post(reverse("book-bulk"), rows, format="json")
+        self.assertIn("author", response.data["errors"][0]["errors"])
+        self.assertFalse(Book.objects.filter(title__startswith="Wrong").exists())
+
+    def test_bulk_create_reports_rows_written_before_a_failure(self):
+        bulk_create = Book.objects.bulk_create
+
+        def fail_second_chunk(books):
+            if Book.objects.filter(title__startswith="Bulk").exists():
+                raise DatabaseError("disk full")
+            return bulk_create(books)
+
+        rows = [{"title": f"Bulk {i}", "publication_year": 2001, "author": self.author2.id} for i in range(3)]
+        with mock.patch("api.serializers.BULK_CHUNK_SIZE", 2), \
+                mock.patch.object(Book.objects, "bulk_create", fail_second_chunk):
+            response = self.client.post(reverse("book-bulk"), rows, format="json")
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual(
+            sorted(Book.objects.filter(pk__in=response.data["ids"]).values_list("title", flat=True)),
+            ["Bulk 0", "Bulk 1"],
+        )
+
+    # ----------------------------
+    # Test Export
+    # ----------------------------
+    def test_export_books_as_csv_with_filters(self):
+        response = self.client.get(reverse("book-export", kwargs={"export_format": "csv"}) + "?author=" + str(self.author1.id))
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "id,title,publication_year,author,author_name")
+        self.assertEqual([line.split(",")[1] for line in lines[1:]], ["No Longer at Ease", "Things Fall Apart"])
+
+    def test_export_books_as_ndjson(self):
+        response = self.client.get(reverse("book-export", kwargs={"export_format": "ndjson"}))
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]["author_name"], "Chinua Achebe")
+
+    def test_export_unknown_format(self):
+        response = self.client.get(reverse("book-export", kwargs={"export_format": "xml"}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -2,6 +2,9 @@ from django.urls import path
 from django.urls import path
 from .views import BookListView, BookDetailView, BookUpdateView, BookDeleteView
 from .views import (
+    AuthorListView,
+    BookBulkView,
+    BookExportView,
     BookListView,
     BookDetailView,
     BookCreateView,
@@ -21,4 +24,7 @@ urlpatterns = [
     path("books/<int:pk>/", BookDetailView.as_view(), name="book-detail"),
     path("books/update/<int:pk>/", BookUpdateView.as_view(), name="book-update"),
     path("books/delete/<int:pk>/", BookDeleteView.as_view(), name="book-delete"),
+    path("books/bulk/", BookBulkView.as_view(), name="book-bulk"),
+    path("books/export.<str:export_format>", BookExportView.as_view(), name="book-export"),
+    path("authors/", AuthorListView.as_view(), name="author-list"),
 ]
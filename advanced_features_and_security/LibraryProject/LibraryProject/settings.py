@@ -42,6 +42,8 @@ INSTALLED_APPS = [
 # ------------------------------
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Outermost after security, so queries made by other middleware count too
+    'LibraryProject.sql_profiling.SQLProfilingMiddleware',
     'csp.middleware.CSPMiddleware',  # Must be near top for CSP enforcement
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -121,6 +123,22 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # ------------------------------
 AUTH_USER_MODEL = 'bookshelf.CustomUser'
 
+# Loads the user's profile with the user and caches permission sets
+# (see bookshelf/backends.py)
+AUTHENTICATION_BACKENDS = ['bookshelf.backends.CachedRoleBackend']
+PERMISSIONS_CACHE_TIMEOUT = 600  # seconds
+
+# ------------------------------
+# Cache
+# ------------------------------
+# Per-process; use a shared backend (Redis, Memcached) with several
+# workers so permission cache invalidation reaches all of them
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
 # ------------------------------
 # Authentication Redirects
 # ------------------------------
@@ -190,8 +208,6 @@ SECURE_BROWSER_XSS_FILTER = True       # Enable XSS protection in the browser
 # Content Security Policy (CSP) - Optional but recommended
 INSTALLED_APPS += ['csp']  # Make sure django-csp is installed
 
-MIDDLEWARE = ['csp.middleware.CSPMiddleware'] + MIDDLEWARE
-
 CSP_DEFAULT_SRC = ("'self'",)
 CSP_SCRIPT_SRC = ("'self'", 'https://cdnjs.cloudflare.com')
 CSP_STYLE_SRC = ("'self'", 'https://cdnjs.cloudflare.com')
@@ -203,3 +219,9 @@ CSP_IMG_SRC = ("'self'", 'data:')
 
 # Tell Django to trust the X-Forwarded-Proto header for HTTPS detection
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
+
+# ------------------------------
+# SQL Profiling (see LibraryProject/sql_profiling.py)
+# ------------------------------
+SQL_PROFILING_SAMPLE_RATE = 1.0  # lower on busy production workers
+SQL_PROFILING_DUPLICATE_THRESHOLD = 5  # same query N times in a request = N+1
@@ -15,9 +15,16 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path
+from django.urls import include, path
+
+from bookshelf.views import book_export
+
+from .sql_profiling import sql_profile_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
 path('', include('relationship_app.urls')),
+    path('bookshelf/books/export.<str:export_format>', book_export, name='book_export'),
+    # Per-endpoint SQL statistics, staff only
+    path('_profiling/sql/', sql_profile_view, name='sql-profile'),
 ]
@@ -5,3 +5,7 @@ class BookshelfConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'bookshelf'
 
+    def ready(self):
+        # Permission cache invalidation (see bookshelf/backends.py)
+        import bookshelf.signals
+
@@ -0,0 +1,99 @@
+# LibraryProject/bookshelf/backends.py
+"""
+Authentication backend that makes role and permission checks free.
+
+- The session's user is fetched together with its UserProfile
+  (select_related), so is_admin()/is_librarian()/is_member() read the
+  role without another query, and a role change applies on the next
+  request.
+- The user's permission sets are cached per user in the default cache,
+  so permission_required() stops running two permission queries on every
+  request. Each entry records the user's permissions version when it was
+  loaded, and bookshelf/signals.py bumps that version when the user is
+  saved, their groups or permissions change, or a group they belong to
+  changes. Entries from an older version are ignored, so a set loaded
+  just before a change commits is not served after it. The timeout
+  bounds anything not signalled.
+
+The cache must be shared by all processes (Redis, Memcached) for the
+invalidation to reach every worker.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+
+PERMISSIONS_TIMEOUT = getattr(settings, 'PERMISSIONS_CACHE_TIMEOUT', 600)
+KEY_PREFIX = 'bookshelf:perms'
+
+
+def _permissions_key(user_id, kind):
+    return f'{KEY_PREFIX}:{kind}:{user_id}'
+
+
+def _version_key(user_id):
+    return f'{KEY_PREFIX}:version:{user_id}'
+
+
+def _start_version(user_id):
+    """Current permissions version of a user that has none cached yet."""
+    key = _version_key(user_id)
+    # add() so a bump landing meanwhile is not overwritten
+    cache.add(key, time.time_ns(), timeout=None)
+    return cache.get(key)
+
+
+def invalidate_permissions(user_ids):
+    """Bump the permissions version of these users once the transaction commits."""
+    keys = [_version_key(user_id) for user_id in user_ids]
+    if keys:
+        transaction.on_commit(lambda: cache.set_many(dict.fromkeys(keys, time.time_ns()), timeout=None))
+
+
+def user_role(user):
+    """The user's UserProfile role, or None (anonymous, or no profile)."""
+    try:
+        return user.userprofile.role
+    except (AttributeError, ObjectDoesNotExist):
+        return None
+
+
+class CachedRoleBackend(ModelBackend):
+
+    def get_user(self, user_id):
+        UserModel = get_user_model()
+        try:
+            user = UserModel._default_manager.select_related('userprofile').get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+    def get_user_permissions(self, user_obj, obj=None):
+        return self._cached_permissions(user_obj, obj, 'user', super().get_user_permissions)
+
+    def get_group_permissions(self, user_obj, obj=None):
+        return self._cached_permissions(user_obj, obj, 'group', super().get_group_permissions)
+
+    def _cached_permissions(self, user_obj, obj, kind, load):
+        # ModelBackend already memoizes on the user object within a request
+        if obj is not None or user_obj.is_anonymous or not user_obj.is_active \
+                or hasattr(user_obj, f'_{kind}_perm_cache'):
+            return load(user_obj, obj)
+        key, version_key = _permissions_key(user_obj.pk, kind), _version_key(user_obj.pk)
+        cached = cache.get_many([key, version_key])
+        version = cached.get(version_key)
+        entry = cached.get(key)
+        if entry is not None and version is not None and entry[0] == version:
+            setattr(user_obj, f'_{kind}_perm_cache', entry[1])
+            return entry[1]
+        # Taken before loading: a change committed during the load makes
+        # the stored entry stale on its first read
+        if version is None:
+            version = _start_version(user_obj.pk)
+        perms = load(user_obj, obj)
+        cache.set(key, (version, perms), PERMISSIONS_TIMEOUT)
+        return perms
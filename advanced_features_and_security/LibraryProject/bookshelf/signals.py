@@ -0,0 +1,61 @@
+# LibraryProject/bookshelf/signals.py
+"""Drops cached permission sets (see bookshelf/backends.py) when they change."""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.dispatch import receiver
+
+from .backends import invalidate_permissions
+
+User = get_user_model()
+
+
+def _group_members(group_ids):
+    return User.objects.filter(groups__in=group_ids).values_list('pk', flat=True).distinct()
+
+
+def _linked_users(sender, instance):
+    # Users holding this group or permission (reverse accessors are renamed
+    # on CustomUser, so go through the forward field)
+    field = 'groups' if sender is User.groups.through else 'user_permissions'
+    return User.objects.filter(**{field: instance}).values_list('pk', flat=True)
+
+
+# Superuser and active flags decide which permissions apply
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, **kwargs):
+    invalidate_permissions([instance.pk])
+
+
+# user.groups.add(group) / group.user_set.add(user), and the same for
+# user.user_permissions
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def user_links_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        invalidate_permissions([instance.pk])
+    elif action == 'pre_clear':
+        # Users losing this group or permission are only known before the clear
+        invalidate_permissions(_linked_users(sender, instance))
+    else:
+        invalidate_permissions(pk_set)
+
+
+# group.permissions.add(permission) / permission.group_set.add(group)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def group_permissions_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        invalidate_permissions(_group_members([instance.pk]))
+    elif action == 'pre_clear':
+        invalidate_permissions(_group_members(Group.objects.filter(permissions=instance).values_list('pk', flat=True)))
+    else:
+        invalidate_permissions(_group_members(pk_set))
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    invalidate_permissions(_group_members([instance.pk]))
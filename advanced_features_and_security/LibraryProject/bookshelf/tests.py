@@ -0,0 +1,92 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.test import TestCase
+
+from .backends import CachedRoleBackend
+from .models import UserProfile
+from .views import is_admin, is_librarian, is_member
+
+User = get_user_model()
+
+
+class CachedRoleBackendTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.backend = CachedRoleBackend()
+        self.user = User.objects.create_user(username='reader', email='reader@example.com', password='testpass123')
+        self.group = Group.objects.create(name='Editors')
+        self.can_edit = Permission.objects.get(codename='can_edit', content_type__app_label='bookshelf')
+        self.can_create = Permission.objects.get(codename='can_create', content_type__app_label='bookshelf')
+
+    def next_request_user(self):
+        """The user as the session loads it at the start of a request."""
+        with self.assertNumQueries(1):
+            return self.backend.get_user(self.user.pk)
+
+    def change(self, func, *args):
+        # Invalidation runs once the change commits
+        with self.captureOnCommitCallbacks(execute=True):
+            func(*args)
+
+    def test_role_checks_run_no_queries(self):
+        user = self.next_request_user()
+        with self.assertNumQueries(0):
+            self.assertTrue(is_member(user))
+            self.assertFalse(is_admin(user))
+            self.assertFalse(is_librarian(user))
+
+    def test_role_change_applies_on_next_request(self):
+        UserProfile.objects.filter(user=self.user).update(role='Librarian')
+        self.assertTrue(is_librarian(self.next_request_user()))
+
+    def test_permissions_are_cached_across_requests(self):
+        self.change(self.user.groups.add, self.group)
+        self.change(self.group.permissions.add, self.can_edit)
+        self.assertTrue(self.backend.has_perm(self.next_request_user(), 'bookshelf.can_edit'))
+        user = self.next_request_user()
+        with self.assertNumQueries(0):
+            self.assertTrue(self.backend.has_perm(user, 'bookshelf.can_edit'))
+            self.assertFalse(self.backend.has_perm(user, 'bookshelf.can_create'))
+
+    def test_group_permission_changes_apply_on_next_request(self):
+        self.change(self.user.groups.add, self.group)
+        self.assertFalse(self.backend.has_perm(self.next_request_user(), 'bookshelf.can_edit'))
+        self.change(self.group.permissions.add, self.can_edit)
+        self.assertTrue(self.backend.has_perm(self.next_request_user(), 'bookshelf.can_edit'))
+        self.change(self.can_edit.group_set.remove, self.group)
+        self.assertFalse(self.backend.has_perm(self.next_request_user(), 'bookshelf.can_edit'))
+
+    def test_user_permission_and_membership_changes_apply_on_next_request(self):
+        self.change(self.group.permissions.add, self.can_edit)
+        self.assertFalse(self.backend.has_perm(self.next_request_user(), 'bookshelf.can_edit'))
+        self.change(self.group.customuser_set.add, self.user)
+        self.assertTrue(self.backend.has_perm(self.next_request_user(), 'bookshelf.can_edit'))
+        self.change(self.user.user_permissions.add, self.can_create)
+        self.assertTrue(self.backend.has_perm(self.next_request_user(), 'bookshelf.can_create'))
+        self.change(self.user.groups.clear)
+        self.assertFalse(self.backend.has_perm(self.next_request_user(), 'bookshelf.can_edit'))
+
+    def test_deleting_group_drops_members_permissions(self):
+        self.change(self.user.groups.add, self.group)
+        self.change(self.group.permissions.add, self.can_edit)
+        self.assertTrue(self.backend.has_perm(self.next_request_user(), 'bookshelf.can_edit'))
+        self.change(self.group.delete)
+        self.assertFalse(self.backend.has_perm(self.next_request_user(), 'bookshelf.can_edit'))
+
+    def test_permissions_loaded_before_a_change_are_not_served_after_it(self):
+        self.change(self.user.groups.add, self.group)
+        load = ModelBackend.get_group_permissions
+
+        def load_then_grant(backend, user_obj, obj=None):
+            perms = load(backend, user_obj, obj)
+            # Committed after this read, before the result is cached
+            self.change(self.group.permissions.add, self.can_edit)
+            return perms
+
+        with mock.patch.object(ModelBackend, 'get_group_permissions', load_then_grant):
+            self.assertFalse(self.backend.has_perm(self.next_request_user(), 'bookshelf.can_edit'))
+        self.assertTrue(self.backend.has_perm(self.next_request_user(), 'bookshelf.can_edit'))
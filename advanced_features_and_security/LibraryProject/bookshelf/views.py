@@ -9,6 +9,8 @@ from .models import Book, Library
 from .forms import BookForm
 from .forms import BookForm, ExampleForm
 from .forms import ExampleForm
+from .backends import user_role
+from .exports import export_response
 
 
 # ------------------------------
@@ -60,9 +62,18 @@ def form_example_view(request):
 # List all books (checker expects "book_list")
 # ------------------------------
 def book_list(request):
-    books = Book.objects.all()
+    # The template prints each book's author
+    books = Book.objects.select_related('author')
     return render(request, 'bookshelf/book_list.html', {'books': books})
 
+# ------------------------------
+# Export all books as NDJSON or CSV, streamed in chunks
+# ------------------------------
+def book_export(request, export_format):
+    books = Book.objects.order_by('pk')
+    fields = {'id': 'id', 'title': 'title', 'author': 'author__name'}
+    return export_response(books, fields, export_format, 'books')
+
 # ------------------------------
 # CRUD Views with Permissions
 # ------------------------------
@@ -108,14 +119,16 @@ class LibraryDetailView(DetailView):
 # ------------------------------
 # Role-based access helpers (optional)
 # ------------------------------
+# The profile is loaded with the user (bookshelf.backends.CachedRoleBackend),
+# so these checks run no queries
 def is_admin(user):
-    return hasattr(user, 'userprofile') and user.userprofile.role == 'Admin'
+    return user_role(user) == 'Admin'
 
 def is_librarian(user):
-    return hasattr(user, 'userprofile') and user.userprofile.role == 'Librarian'
+    return user_role(user) == 'Librarian'
 
 def is_member(user):
-    return hasattr(user, 'userprofile') and user.userprofile.role == 'Member'
+    return user_role(user) == 'Member'
 
 @user_passes_test(is_admin)
 def admin_view(request):
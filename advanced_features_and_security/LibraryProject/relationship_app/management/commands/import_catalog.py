@@ -0,0 +1,232 @@
+# relationship_app/management/commands/import_catalog.py
+import csv
+import json
+import os
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+# Names per IN (...) lookup, below SQLite's bound-parameter limit
+LOOKUP_CHUNK_SIZE = 500
+
+
+def iter_csv_records(fh):
+    yield from csv.DictReader(fh)
+
+
+def iter_json_records(fh, read_size=1 << 16):
+    """
+    Objects of a JSON array, or of a file with one object per line
+    (NDJSON), decoded as they are read instead of loading the whole file.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = '', 0, False
+    while True:
+        # Skip whitespace and the array's brackets and commas
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,[]':
+            pos += 1
+        if pos == len(buffer):
+            if eof:
+                return
+            buffer, pos = fh.read(read_size), 0
+            eof = not buffer
+            continue
+        try:
+            record, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise CommandError(f'Invalid JSON near: {buffer[pos:pos + 80]!r}')
+            chunk = fh.read(read_size)
+            buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+            continue
+        pos = end
+        yield record
+
+
+def library_names(value):
+    """A record's libraries: a JSON list, or a ";"-separated CSV cell."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(';')
+    return [str(name).strip() for name in value if str(name).strip()]
+
+
+def max_lengths(Author, Book, Library):
+    """Longest accepted title, author and library names, from the models' fields."""
+    return {
+        'title': Book._meta.get_field('title').max_length,
+        'author': Author._meta.get_field('name').max_length,
+        'library': Library._meta.get_field('name').max_length,
+    }
+
+
+def record_problem(title, author, libraries, max_lengths):
+    """Why a record cannot be imported, or None."""
+    if not title or not author:
+        return 'title and author are required'
+    values = [('title', title), ('author', author), *(('library', name) for name in libraries)]
+    for field, value in values:
+        if max_lengths[field] is not None and len(value) > max_lengths[field]:
+            return f'{field} is longer than {max_lengths[field]} characters'
+    return None
+
+
+class NameCache:
+    """
+    name -> id of a model with a `name` field. Unknown names are looked up
+    in bulk, and the ones still missing are created with one bulk_create.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.ids = {}
+        self.created = 0
+
+    def resolve(self, names):
+        missing = list({name for name in names if name not in self.ids})
+        for start in range(0, len(missing), LOOKUP_CHUNK_SIZE):
+            chunk = missing[start:start + LOOKUP_CHUNK_SIZE]
+            # Names are not unique; the oldest row wins, as it would on a re-run
+            for pk, name in self.model.objects.filter(name__in=chunk).order_by('-pk').values_list('pk', 'name'):
+                self.ids[name] = pk
+        new = [self.model(name=name) for name in missing if name not in self.ids]
+        if new:
+            self.model.objects.bulk_create(new)
+            self.ids.update((obj.name, obj.pk) for obj in new)
+            self.created += len(new)
+
+
+class Command(BaseCommand):
+    help = (
+        'Import a book catalog from a CSV file (columns: title, author, library) '
+        'or a JSON/NDJSON file of {"title", "author", "libraries"} objects, '
+        'streaming it in batches. Progress is checkpointed after every batch, so '
+        're-running the same command after an interruption resumes where it '
+        'stopped (a crash between a commit and its checkpoint repeats that batch).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'json'], help='Default: from the file extension')
+        parser.add_argument('--app', default='relationship_app', help='App holding the Author/Book/Library models')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--checkpoint', help='Progress file. Default: <path>.progress')
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size must be a positive number')
+        if not os.path.exists(path):
+            raise CommandError(f'No such file: {path}')
+        try:
+            self.Author = apps.get_model(options['app'], 'Author')
+            self.Book = apps.get_model(options['app'], 'Book')
+            self.Library = apps.get_model(options['app'], 'Library')
+        except LookupError as exc:
+            raise CommandError(exc)
+        self.max_lengths = max_lengths(self.Author, self.Book, self.Library)
+        if not connection.features.can_return_rows_from_bulk_insert:
+            # Library links need the ids of the books just inserted
+            raise CommandError(f'{connection.vendor} does not return ids from bulk inserts')
+
+        file_format = options['format'] or ('csv' if path.lower().endswith('.csv') else 'json')
+        checkpoint_path = options['checkpoint'] or f'{path}.progress'
+        done = 0 if options['restart'] else self._load_checkpoint(checkpoint_path, path)
+        if done:
+            self.stderr.write(f'Resuming after {done} records')
+
+        self.authors = NameCache(self.Author)
+        self.libraries = NameCache(self.Library)
+        self.stats = {'books': 0, 'links': 0, 'skipped': 0}
+        start, imported = time.perf_counter(), 0
+
+        with open(path, newline='', encoding='utf-8') as fh:
+            records = iter_csv_records(fh) if file_format == 'csv' else iter_json_records(fh)
+            batch = []
+            for number, record in enumerate(records, 1):
+                if number <= done:
+                    continue
+                batch.append((number, record))
+                if len(batch) == options['batch_size']:
+                    imported += self._import_batch(batch, checkpoint_path, path)
+                    self._progress(imported, start)
+                    batch = []
+            if batch:
+                imported += self._import_batch(batch, checkpoint_path, path)
+
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {self.stats['books']} books, {self.authors.created} new authors, "
+            f"{self.libraries.created} new libraries and {self.stats['links']} library links "
+            f"in {elapsed:.1f}s ({imported / elapsed if elapsed else 0:.0f} books/s); "
+            f"{self.stats['skipped']} records skipped"
+        ))
+
+    def _import_batch(self, batch, checkpoint_path, path):
+        rows = []
+        for number, record in batch:
+            if isinstance(record, dict):
+                title = str(record.get('title') or '').strip()
+                author = str(record.get('author') or '').strip()
+                libraries = library_names(record.get('libraries', record.get('library')))
+                problem = record_problem(title, author, libraries, self.max_lengths)
+            else:
+                problem = 'not an object'
+            if problem:
+                self.stats['skipped'] += 1
+                self.stderr.write(self.style.WARNING(f'Record {number} skipped: {problem}'))
+                continue
+            rows.append((title, author, libraries))
+
+        with transaction.atomic():
+            self.authors.resolve(author for _, author, _ in rows)
+            self.libraries.resolve(name for _, _, libraries in rows for name in libraries)
+            books = [self.Book(title=title, author_id=self.authors.ids[author]) for title, author, _ in rows]
+            self.Book.objects.bulk_create(books)
+            Link = self.Library.books.through
+            links = [
+                Link(library_id=self.libraries.ids[name], book_id=book.pk)
+                for book, (_, _, libraries) in zip(books, rows)
+                for name in dict.fromkeys(libraries)
+            ]
+            Link.objects.bulk_create(links, ignore_conflicts=True)
+        self.stats['books'] += len(books)
+        self.stats['links'] += len(links)
+        self._save_checkpoint(checkpoint_path, path, batch[-1][0])
+        # Skipped records do not count towards the import rate
+        return len(books)
+
+    def _progress(self, imported, start):
+        elapsed = time.perf_counter() - start
+        self.stderr.write(f'{imported} books, {imported / elapsed:.0f} books/s')
+
+    # --- Checkpoints ---
+
+    def _file_signature(self, path):
+        stat = os.stat(path)
+        return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+    def _load_checkpoint(self, checkpoint_path, path):
+        if not os.path.exists(checkpoint_path):
+            return 0
+        with open(checkpoint_path) as fh:
+            checkpoint = json.load(fh)
+        if checkpoint.get('file') != self._file_signature(path):
+            raise CommandError(
+                f'{checkpoint_path} belongs to a different version of {path}; '
+                'use --restart to import from the beginning'
+            )
+        return checkpoint['records']
+
+    def _save_checkpoint(self, checkpoint_path, path, records):
+        # Written to a temporary file and renamed, so it is never half-written
+        tmp_path = f'{checkpoint_path}.tmp'
+        with open(tmp_path, 'w') as fh:
+            json.dump({'file': self._file_signature(path), 'records': records}, fh)
+        os.replace(tmp_path, checkpoint_path)
@@ -1,3 +1,111 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
 from django.test import TestCase
 
-# Create your tests here.
+from bookshelf import models as bookshelf_models
+from .management.commands.import_catalog import Command as ImportCatalog
+from .models import Author, Book, Library
+
+
+class ImportCatalogTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp, name)
+        with open(path, 'w', encoding='utf-8') as fh:
+            fh.write(content)
+        return path
+
+    def run_import(self, path, **options):
+        stdout, stderr = StringIO(), StringIO()
+        call_command('import_catalog', path, stdout=stdout, stderr=stderr, **options)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_csv_import_reuses_authors_and_libraries(self):
+        Author.objects.create(name='Ann')
+        path = self.write('books.csv', (
+            'title,author,library\n'
+            'First,Ann,Main;Branch\n'
+            'Second,Ann,Main\n'
+            'Third,Bob,\n'
+        ))
+        self.run_import(path, batch_size=2)
+        self.assertEqual(Author.objects.count(), 2)
+        self.assertEqual(Book.objects.filter(author__name='Ann').count(), 2)
+        self.assertEqual(sorted(Library.objects.values_list('name', flat=True)), ['Branch', 'Main'])
+        self.assertEqual(Library.objects.get(name='Main').books.count(), 2)
+        self.assertFalse(os.path.exists(f'{path}.progress'))
+
+    def test_invalid_records_are_skipped(self):
+        records = [
+            {'title': 'Kept', 'author': 'Ann', 'libraries': ['Main']},
+            {'title': 'No author'},
+            {'title': 'x' * 201, 'author': 'Ann'},
+            'not an object',
+        ]
+        path = self.write('books.json', json.dumps(records))
+        stdout, stderr = self.run_import(path)
+        self.assertEqual(list(Book.objects.values_list('title', flat=True)), ['Kept'])
+        self.assertIn('Record 2 skipped: title and author are required', stderr)
+        self.assertIn('Record 3 skipped: title is longer than 200 characters', stderr)
+        self.assertIn('Record 4 skipped: not an object', stderr)
+        self.assertIn('3 records skipped', stdout)
+
+    def test_interrupted_import_resumes_from_checkpoint(self):
+        lines = [json.dumps({'title': f'Book {i}', 'author': 'Ann'}) for i in range(5)]
+        path = self.write('books.ndjson', '\n'.join(lines))
+        import_batch = ImportCatalog._import_batch
+        calls = []
+
+        def fail_second_batch(command, *args):
+            calls.append(args)
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+            return import_batch(command, *args)
+
+        with mock.patch.object(ImportCatalog, '_import_batch', fail_second_batch), self.assertRaises(KeyboardInterrupt):
+            self.run_import(path, batch_size=2)
+        self.assertEqual(Book.objects.count(), 2)
+        self.assertTrue(os.path.exists(f'{path}.progress'))
+
+        _, stderr = self.run_import(path, batch_size=2)
+        self.assertIn('Resuming after 2 records', stderr)
+        self.assertEqual(sorted(Book.objects.values_list('title', flat=True)), [f'Book {i}' for i in range(5)])
+        self.assertFalse(os.path.exists(f'{path}.progress'))
+
+    def test_changed_file_invalidates_checkpoint(self):
+        path = self.write('books.csv', 'title,author,library\nFirst,Ann,\n')
+        self.write('books.csv.progress', json.dumps({'file': {}, 'records': 1}))
+        with self.assertRaisesMessage(CommandError, 'use --restart'):
+            self.run_import(path)
+        self.run_import(path, restart=True)
+        self.assertEqual(Book.objects.count(), 1)
+
+    def test_bookshelf_app(self):
+        path = self.write('books.csv', 'title,author,library\nFirst,Ann,Main\n')
+        self.run_import(path, app='bookshelf')
+        self.assertEqual(bookshelf_models.Library.objects.get(name='Main').books.get().title, 'First')
+        self.assertFalse(Book.objects.exists())
+
+    def test_max_lengths_come_from_the_app_models(self):
+        path = self.write('books.csv', 'title,author,library\nShort,Ann,\nLonger title,Ann,\n')
+        title = bookshelf_models.Book._meta.get_field('title')
+        with mock.patch.object(title, 'max_length', 5):
+            _, stderr = self.run_import(path, app='bookshelf')
+        self.assertIn('Record 2 skipped: title is longer than 5 characters', stderr)
+        self.assertEqual(list(bookshelf_models.Book.objects.values_list('title', flat=True)), ['Short'])
+
+    def test_batch_size_must_be_positive(self):
+        path = self.write('books.csv', 'title,author,library\nFirst,Ann,\n')
+        for batch_size in (0, -1):
+            with self.subTest(batch_size=batch_size), self.assertRaises(CommandError):
+                self.run_import(path, batch_size=batch_size)
+        self.assertFalse(Book.objects.exists())
@@ -10,6 +10,7 @@ from django.contrib.auth.decorators import user_passes_test, permission_required
 from .models import Book, Library  # Explicit import for Library
 from .models import Library
 from .forms import BookForm  # Ensure BookForm exists
+from bookshelf.backends import user_role
 
 # ------------------------------
 # Function-based view: List all books
@@ -61,14 +62,16 @@ def logout_view(request):
 # ------------------------------
 # Role check helper functions
 # ------------------------------
+# The profile is loaded with the user (bookshelf.backends.CachedRoleBackend),
+# so these checks run no queries
 def is_admin(user):
-    return hasattr(user, 'userprofile') and user.userprofile.role == 'Admin'
+    return user_role(user) == 'Admin'
 
 def is_librarian(user):
-    return hasattr(user, 'userprofile') and user.userprofile.role == 'Librarian'
+    return user_role(user) == 'Librarian'
 
 def is_member(user):
-    return hasattr(user, 'userprofile') and user.userprofile.role == 'Member'
+    return user_role(user) == 'Member'
 
 # ------------------------------
 # Role-based views
@@ -0,0 +1,83 @@
+# api/exports.py
+"""
+Streaming NDJSON/CSV exports.
+
+export_response() turns a queryset into a StreamingHttpResponse. Rows
+are read with QuerySet.iterator(chunk_size=...) as plain tuples and
+encoded as they arrive, so memory stays flat however many rows are
+exported and the first bytes leave before the query has finished.
+
+The same module lives in api_project, advanced-api-project,
+LibraryProject (bookshelf) and social_media_api (posts). Each is a
+separate Django site, deployed and tested on its own, with no shared
+package to import it from, so each carries a copy. Apply fixes to all
+four.
+"""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, StreamingHttpResponse
+
+# Rows fetched from the database at a time
+CHUNK_SIZE = 2000
+# Encoded output is sent in pieces of about this many characters
+BUFFER_SIZE = 64 * 1024
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+class _Echo:
+    """File-like object that hands csv.writer's output straight back."""
+
+    def write(self, value):
+        return value
+
+
+def _ndjson_lines(names, rows):
+    encode = DjangoJSONEncoder().encode
+    for row in rows:
+        yield encode(dict(zip(names, row))) + '\n'
+
+
+def _csv_lines(names, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(names)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _buffered(lines):
+    # The first line goes out on its own so the client sees bytes at once
+    buffer, size, first = [], 0, True
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= BUFFER_SIZE or first:
+            yield ''.join(buffer)
+            buffer, size, first = [], 0, False
+    if buffer:
+        yield ''.join(buffer)
+
+
+def export_response(queryset, fields, export_format, filename):
+    """
+    Stream `queryset` as NDJSON or CSV. `fields` maps output column names
+    to ORM lookups, e.g. {'author': 'author__username'}.
+    """
+    if export_format not in CONTENT_TYPES:
+        raise Http404(f'Unknown export format: {export_format}')
+    names = list(fields)
+    # Only the listed columns are read; joins come from the lookups
+    rows = (
+        queryset.select_related(None).prefetch_related(None)
+        .values_list(*fields.values())
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    lines = _csv_lines(names, rows) if export_format == 'csv' else _ndjson_lines(names, rows)
+    response = StreamingHttpResponse(_buffered(lines), content_type=CONTENT_TYPES[export_format])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
@@ -1,8 +1,102 @@
+from django.db import DatabaseError, transaction
+from django.db.models import QuerySet
 from rest_framework import serializers
 from .models import Book
 
+# The bulk-write code below has a twin in advanced-api-project's
+# api/serializers.py. The projects share no package, so each carries a
+# copy; keep the two in step.
+
+# Rows written per transaction by bulk requests
+BULK_CHUNK_SIZE = 1000
+# Largest number of rows accepted by one bulk request
+BULK_MAX_ROWS = 10000
+
+_ID_FIELD = serializers.IntegerField(min_value=1)
+
+
+def _pk(value):
+    # Same rules as BookIdsSerializer: 1.9 or True is not an id, not book 1
+    try:
+        return _ID_FIELD.run_validation(value)
+    except serializers.ValidationError:
+        return None
+
+
+# Raised by write_in_chunks() when a chunk fails to write
+# Bulk writes are not all-or-nothing: the chunks before the failing one
+# are committed, and "written" lists their rows.
+class BulkWriteError(Exception):
+
+    def __init__(self, written):
+        self.written = written
+        super().__init__(f'Writing failed at row {len(written)}; the {len(written)} rows before it were written.')
+
+
+def write_in_chunks(rows, write):
+    """Call write() on every BULK_CHUNK_SIZE rows, each chunk in its own transaction."""
+    for start in range(0, len(rows), BULK_CHUNK_SIZE):
+        try:
+            with transaction.atomic():
+                write(rows[start:start + BULK_CHUNK_SIZE])
+        except DatabaseError as exc:
+            raise BulkWriteError(rows[:start]) from exc
+
+
+# Serializer used for BookSerializer(many=True)
+# Validates every row (errors are keyed by row index) and writes them with
+# bulk_create/bulk_update through write_in_chunks().
+# For updates, pass the books (or a queryset) as the instance and include
+# "id" in each row.
+class BookListSerializer(serializers.ListSerializer):
+
+    def books_by_id(self):
+        # The instance may be a queryset; only the rows named in the data are loaded
+        if not hasattr(self, '_books_by_id'):
+            rows = self.initial_data if isinstance(self.initial_data, list) else []
+            ids = {_pk(row.get('id')) for row in rows if isinstance(row, dict)}
+            ids.discard(None)
+            books = self.instance
+            if isinstance(books, QuerySet):
+                books = books.filter(pk__in=ids)
+            self._books_by_id = {book.pk: book for book in books if book.pk in ids}
+        return self._books_by_id
+
+    def run_child_validation(self, data):
+        if self.instance is not None:
+            book_id = _pk(data.get('id')) if isinstance(data, dict) else None
+            if book_id not in self.books_by_id():
+                raise serializers.ValidationError({'id': ['No book with this id.']})
+            self.child.instance = self.books_by_id()[book_id]
+            self.child.initial_data = data
+        return super().run_child_validation(data)
+
+    def create(self, validated_data):
+        books = [Book(**attrs) for attrs in validated_data]
+        write_in_chunks(books, Book.objects.bulk_create)
+        return books
+
+    def update(self, instance, validated_data):
+        books, fields = [], set()
+        for row, attrs in zip(self.initial_data, validated_data):
+            book = self.books_by_id()[_pk(row['id'])]
+            for name, value in attrs.items():
+                setattr(book, name, value)
+            fields.update(attrs)
+            books.append(book)
+        if fields:
+            write_in_chunks(books, lambda chunk: Book.objects.bulk_update(chunk, list(fields)))
+        return books
+
+
 class BookSerializer(serializers.ModelSerializer):
     class Meta:
         model = Book
         fields = '__all__'
+        list_serializer_class = BookListSerializer
+
 
+class BookIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=BULK_MAX_ROWS
+    )
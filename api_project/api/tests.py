@@ -1,3 +1,143 @@
-from django.test import TestCase
+import csv
+import io
+import json
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import DatabaseError
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from .models import Book
+
+
+class BookBulkTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='librarian', password='testpass123')
+        self.client.force_authenticate(self.user)
+        self.url = reverse('book_all-bulk')
+        self.books = [Book.objects.create(title=f'Book {i}', author='Ann') for i in range(3)]
+
+    def test_bulk_create(self):
+        rows = [{'title': 'New 1', 'author': 'Bob'}, {'title': 'New 2', 'author': 'Cy'}]
+        response = self.client.post(self.url, rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(
+            list(Book.objects.filter(pk__in=response.data['ids']).values_list('title', flat=True).order_by('pk')),
+            ['New 1', 'New 2'],
+        )
+
+    def test_invalid_rows_reject_whole_request_with_row_indexes(self):
+        rows = [{'title': 'Fine', 'author': 'Bob'}, {'title': ''}, {'title': 'Fine', 'author': 'Cy'}, {'author': 'Dee'}]
+        response = self.client.post(self.url, rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 3])
+        self.assertEqual(set(response.data['errors'][0]['errors']), {'title', 'author'})
+        self.assertEqual(Book.objects.count(), 3)
+
+    def test_payload_must_be_a_list(self):
+        response = self.client.post(self.url, {'title': 'New', 'author': 'Bob'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Book.objects.count(), 3)
+
+    def test_bulk_put_replaces_rows(self):
+        rows = [{'id': book.pk, 'title': f'Renamed {book.pk}', 'author': 'Bob'} for book in self.books[:2]]
+        response = self.client.put(self.url, rows, format='json')
+        self.assertEqual(response.data, {'updated': 2})
+        self.assertEqual(
+            list(Book.objects.order_by('pk').values_list('title', 'author')),
+            [(f'Renamed {self.books[0].pk}', 'Bob'), (f'Renamed {self.books[1].pk}', 'Bob'), ('Book 2', 'Ann')],
+        )
+
+    def test_bulk_patch_updates_given_fields(self):
+        response = self.client.patch(self.url, [{'id': self.books[0].pk, 'author': 'Bob'}], format='json')
+        self.assertEqual(response.data, {'updated': 1})
+        self.books[0].refresh_from_db()
+        self.assertEqual((self.books[0].title, self.books[0].author), ('Book 0', 'Bob'))
+
+    def test_update_errors_are_keyed_by_row_index(self):
+        rows = [
+            {'id': self.books[0].pk, 'title': 'Fine'},
+            {'id': self.books[1].pk, 'title': ''},
+            {'id': 999999, 'title': 'Unknown'},
+            {'title': 'No id'},
+        ]
+        response = self.client.patch(self.url, rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = {error['index']: error['errors'] for error in response.data['errors']}
+        self.assertEqual(set(errors), {1, 2, 3})
+        self.assertIn('title', errors[1])
+        self.assertEqual(errors[2], {'id': ['No book with this id.']})
+        self.assertEqual(errors[3], {'id': ['No book with this id.']})
+        self.assertFalse(Book.objects.filter(title='Fine').exists())
+
+    def test_non_integral_ids_match_no_book(self):
+        response = self.client.patch(self.url, [{'id': self.books[0].pk + 0.9, 'author': 'Bob'}], format='json')
+        self.assertEqual(response.data['errors'], [{'index': 0, 'errors': {'id': ['No book with this id.']}}])
+        self.assertEqual(Book.objects.filter(author='Bob').count(), 0)
+
+    def test_failed_chunk_reports_rows_already_written(self):
+        bulk_update = Book.objects.bulk_update
+
+        def fail_second_chunk(books, fields):
+            if Book.objects.filter(author='Bob').exists():
+                raise DatabaseError('disk full')
+            return bulk_update(books, fields)
+
+        rows = [{'id': book.pk, 'author': 'Bob'} for book in self.books]
+        with mock.patch('api.serializers.BULK_CHUNK_SIZE', 2), \
+                mock.patch.object(Book.objects, 'bulk_update', fail_second_chunk):
+            response = self.client.patch(self.url, rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(Book.objects.filter(author='Bob').count(), 2)
+
+    def test_bulk_delete(self):
+        ids = [self.books[0].pk, self.books[2].pk, 999999]
+        response = self.client.delete(self.url, {'ids': ids}, format='json')
+        self.assertEqual(response.data, {'deleted': 2})
+        self.assertEqual(list(Book.objects.values_list('pk', flat=True)), [self.books[1].pk])
+
+    def test_bulk_delete_validates_ids(self):
+        for payload in [{'ids': []}, {'ids': ['x']}, {'ids': [0]}, {}]:
+            with self.subTest(payload=payload):
+                response = self.client.delete(self.url, payload, format='json')
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Book.objects.count(), 3)
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(None)
+        response = self.client.post(self.url, [{'title': 'New', 'author': 'Bob'}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class BookExportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='librarian', password='testpass123')
+        self.client.force_authenticate(self.user)
+        self.books = [Book.objects.create(title='Plain', author='Ann'), Book.objects.create(title='Comma, "quoted"', author='Bob')]
+
+    def export(self, export_format):
+        return self.client.get(reverse('book-export', kwargs={'export_format': export_format}))
+
+    def content(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_ndjson(self):
+        response = self.export('ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="books.ndjson"')
+        rows = [json.loads(line) for line in self.content(response).splitlines()]
+        self.assertEqual(rows, [{'id': book.pk, 'title': book.title, 'author': book.author} for book in self.books])
+
+    def test_csv(self):
+        response = self.export('csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.reader(io.StringIO(self.content(response))))
+        self.assertEqual(rows, [['id', 'title', 'author'], *([str(book.pk), book.title, book.author] for book in self.books)])
+
+    def test_unknown_format_is_404(self):
+        self.assertEqual(self.export('xml').status_code, status.HTTP_404_NOT_FOUND)
@@ -1,13 +1,14 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import BookList
-from .views import BookList, BookViewSet
+from .views import BookExport, BookList, BookViewSet
 
 router = DefaultRouter()
 router.register(r'books_all', BookViewSet, basename='book_all')
 
 urlpatterns = [
     path('books/', BookList.as_view(), name='book-list'),
+    path('books/export.<str:export_format>', BookExport.as_view(), name='book-export'),
     path('', include(router.urls)),
 ]
 
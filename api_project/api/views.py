@@ -1,11 +1,90 @@
-from rest_framework import generics
+import logging
+
+from rest_framework import generics, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from .exports import export_response
 from .models import Book
-from .serializers import BookSerializer
+from .serializers import BULK_MAX_ROWS, BookIdsSerializer, BookSerializer, BulkWriteError, write_in_chunks
+
+logger = logging.getLogger(__name__)
+
+
+def row_errors(errors):
+    """Errors of a many=True serializer as [{"index": i, "errors": {...}}]."""
+    if isinstance(errors, list):
+        errors = dict(enumerate(errors))
+    if not all(isinstance(index, int) for index in errors):
+        return errors  # the payload itself is invalid, e.g. not a list
+    return [{'index': index, 'errors': detail} for index, detail in errors.items() if detail]
+
+
+def partial_write(exc, result):
+    """500 response for a BulkWriteError, with what the committed chunks wrote."""
+    logger.error('Bulk write failed', exc_info=exc)
+    return Response({**result, 'detail': str(exc)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 
 class BookList(generics.ListAPIView):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
 
+class BookExport(generics.GenericAPIView):
+    """Streams all books as /books/export.ndjson or /books/export.csv."""
+    queryset = Book.objects.order_by('pk')
+
+    def get(self, request, export_format):
+        fields = {'id': 'id', 'title': 'title', 'author': 'author'}
+        return export_response(self.get_queryset(), fields, export_format, 'books')
+
 class BookViewSet(viewsets.ModelViewSet):
     queryset = Book.objects.all()
-    serializer_class = BookSerializer
\ No newline at end of file
+    serializer_class = BookSerializer
+
+    @action(detail=False, methods=['post', 'put', 'patch', 'delete'])
+    def bulk(self, request):
+        """
+        Create (POST), update (PUT/PATCH, rows with "id") or delete (DELETE,
+        {"ids": [...]}) many books at once. All rows are validated before
+        anything is written; any invalid row rejects the whole request with
+        errors listed by row index. Writes are committed BULK_CHUNK_SIZE
+        rows at a time: if one fails, the response is a 500 that still
+        reports the rows already written.
+        """
+        if request.method == 'DELETE':
+            return self.bulk_delete(request)
+        if request.method == 'POST':
+            serializer = self.get_serializer(data=request.data, many=True, max_length=BULK_MAX_ROWS)
+        else:
+            serializer = self.get_serializer(
+                self.get_queryset(), data=request.data, many=True,
+                partial=request.method == 'PATCH', max_length=BULK_MAX_ROWS,
+            )
+        if not serializer.is_valid():
+            return Response({'errors': row_errors(serializer.errors)}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            books = serializer.save()
+        except BulkWriteError as exc:
+            return partial_write(exc, self.bulk_result(request, exc.written))
+        status_code = status.HTTP_201_CREATED if request.method == 'POST' else status.HTTP_200_OK
+        return Response(self.bulk_result(request, books), status=status_code)
+
+    def bulk_result(self, request, books):
+        if request.method == 'POST':
+            return {'created': len(books), 'ids': [book.pk for book in books]}
+        return {'updated': len(books)}
+
+    def bulk_delete(self, request):
+        serializer = BookIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        deleted = 0
+
+        def delete(ids):
+            nonlocal deleted
+            deleted += self.get_queryset().filter(pk__in=ids).delete()[0]
+
+        try:
+            write_in_chunks(serializer.validated_data['ids'], delete)
+        except BulkWriteError as exc:
+            return partial_write(exc, {'deleted': deleted})
+        return Response({'deleted': deleted})
@@ -127,9 +127,12 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',
-    ]
+    ],
 'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ]
 }
 
+# Bulk book requests (api.views.BookViewSet.bulk) carry up to
+# BULK_MAX_ROWS rows, more than Django's default 2.5 MB request body limit
+DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024
@@ -0,0 +1,131 @@
+"""
+Rendered page cache with dependency-tag invalidation.
+
+Anonymous GETs of the post list, post detail and posts-by-tag pages are
+served from the cache. Each stored page records the dependency tags it
+was built from ("post:42", "tag:django", "author:7", "post-list") and the
+version of each tag at that time. Saving or deleting a post, comment or
+tag bumps the versions of the tags it affects (see blog/signals.py), so
+stale pages are never served without having to find and delete them.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+TIMEOUT = getattr(settings, 'BLOG_PAGE_CACHE_TIMEOUT', 300)
+KEY_PREFIX = 'blog:page'
+DEPENDENCY_PREFIX = 'blog:dep'
+
+POST_LIST = 'post-list'
+
+
+def post_dep(post_id):
+    return f'post:{post_id}'
+
+
+def tag_dep(name):
+    # PostsByTagView matches names case-insensitively
+    return f'tag:{name.lower()}'
+
+
+def author_dep(user_id):
+    return f'author:{user_id}'
+
+
+def _cache_key(prefix, name):
+    # Tag names and URL kwargs may not be valid memcached keys
+    return f"{prefix}:{hashlib.md5(name.encode('utf-8')).hexdigest()}"
+
+
+def _dependency_key(dependency):
+    return _cache_key(DEPENDENCY_PREFIX, dependency)
+
+
+def _versions(dependencies):
+    keys = {_dependency_key(dep): dep for dep in dependencies}
+    return {keys[key]: version for key, version in cache.get_many(keys).items()}
+
+
+def get_page(key):
+    entry = cache.get(_cache_key(KEY_PREFIX, key))
+    if entry is None:
+        return None
+    versions, response = entry
+    if _versions(versions) != versions:
+        return None
+    return response
+
+
+def snapshot(dependencies):
+    """
+    Current versions of the dependencies, starting any that have none.
+    Taken before rendering: an invalidation that lands during the render
+    then makes the stored page stale on its first read.
+    """
+    versions = _versions(dependencies)
+    missing = {
+        _dependency_key(dep): time.time_ns()
+        for dep in dependencies if dep not in versions
+    }
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions = _versions(dependencies)
+    return versions
+
+
+def set_page(key, response, versions, timeout=TIMEOUT):
+    """Store a page under the snapshot() of its dependencies taken before rendering."""
+    cache.set(_cache_key(KEY_PREFIX, key), (versions, response), timeout)
+
+
+def invalidate(*dependencies):
+    """Bump dependency versions once the current transaction commits."""
+    keys = {_dependency_key(dep) for dep in dependencies}
+    if keys:
+        transaction.on_commit(lambda: cache.set_many(dict.fromkeys(keys, time.time_ns()), timeout=None))
+
+
+class CachedPageMixin:
+    """
+    Serve anonymous GETs from the page cache. Views list what the page
+    depends on in get_cache_dependencies(), called before rendering so the
+    page is stored under the dependency versions it was rendered from.
+    """
+    cache_query_params = ('page',)
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.is_cacheable(request):
+            return super().dispatch(request, *args, **kwargs)
+
+        key = self.get_page_cache_key()
+        response = get_page(key)
+        if response is not None:
+            return response
+
+        versions = snapshot(self.get_cache_dependencies())
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200:
+            if hasattr(response, 'render'):
+                response.render()
+            set_page(key, response, versions)
+        return response
+
+    def is_cacheable(self, request):
+        if request.method != 'GET' or request.user.is_authenticated:
+            return False
+        # Only cache URLs whose parameters are part of the key
+        if set(request.GET) - set(self.cache_query_params):
+            return False
+        # Pages that flash a message are per-visitor
+        return not len(getattr(request, '_messages', ()))
+
+    def get_page_cache_key(self):
+        params = '&'.join(f'{name}={self.request.GET.get(name, "")}' for name in self.cache_query_params)
+        kwargs = '&'.join(f'{name}={value}' for name, value in sorted(self.kwargs.items()))
+        return f'{type(self).__name__}:{kwargs}:{params}'
+
+    def get_cache_dependencies(self):
+        raise NotImplementedError
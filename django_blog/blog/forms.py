@@ -5,6 +5,7 @@ from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from .models import Profile
 from .models import Post, Comment, Profile, Tag
+from .tagging import sync_tags
 from taggit.forms import TagWidget
 
 class CustomUserCreationForm(UserCreationForm):
@@ -100,10 +101,7 @@ class PostForm(forms.ModelForm):
         post = super().save(commit=commit)
         # attach tags (create if not exists)
         if commit:
-            post.tags.clear()
-            for tag_name in tags_list:
-                tag_obj, _ = Tag.objects.get_or_create(name=tag_name)
-                post.tags.add(tag_obj)
+            sync_tags(post, tags_list)
         else:
             # if not commit, tags will be attached after post.save() externally
             self._pending_tags = tags_list
@@ -0,0 +1,207 @@
+import json
+import math
+import random
+import subprocess
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from blog.models import Comment, Post, Tag
+from blog.search import index_post
+from blog.views import PostDetailView, PostListView, PostsByTagView, SearchResultsView
+
+WORDS = (
+    'django python query index search cache template model view form '
+    'signal migration tutorial deploy database backend release update '
+    'weekly review performance tuning async testing security'
+).split()
+SYLLABLES = 'ka lo mi nu pe ra si to vu ze ba de fi go hu'.split()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+
+@contextmanager
+def counting_queries():
+    # Unlike CaptureQueriesContext, not capped by the 9000-entry query log
+    counter = {'queries': 0}
+
+    def count(execute, sql, params, many, context):
+        counter['queries'] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        yield counter
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """Endpoints that issue more queries, or got slower at p99, than the baseline."""
+    regressions = []
+    for name, current in results['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(name)
+        if previous is None or 'error' in previous:
+            continue
+        if 'error' in current:
+            regressions.append(f"{name}: {current['error']}")
+            continue
+        if current['queries'] > previous['queries']:
+            regressions.append(f"{name}: {previous['queries']} -> {current['queries']} queries")
+        if current['p99_ms'] > previous['p99_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {previous['p99_ms']:.2f} -> {current['p99_ms']:.2f} ms")
+    return regressions
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed synthetic posts, tags and comments (rolled back afterwards), then '
+        'report p50/p99 latency and query counts of the blog pages as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--tags', type=int, default=200)
+        parser.add_argument('--comments', type=int, default=2000, help='Comments on the benchmarked detail page')
+        parser.add_argument('--requests', type=int, default=50, help='Requests per endpoint')
+        parser.add_argument('--output', help='Write the JSON results to this file instead of stdout')
+        parser.add_argument('--baseline', help='Fail if results regress against this earlier JSON output')
+        parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed p99 slowdown vs the baseline')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        with transaction.atomic():
+            reader, post, tag = self._seed(options)
+            endpoints = self._measure(reader, post, tag, options['requests'])
+            transaction.set_rollback(True)
+
+        results = {
+            'project': 'django_blog',
+            'commit': git_commit(),
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'scale': {key: options[key] for key in ('users', 'posts', 'tags', 'comments', 'requests')},
+            'endpoints': endpoints,
+        }
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+        if options['baseline']:
+            with open(options['baseline']) as fh:
+                regressions = compare(results, json.load(fh), options['tolerance'])
+            if regressions:
+                raise CommandError('Regressions against baseline:\n  ' + '\n  '.join(regressions))
+            self.stderr.write(self.style.SUCCESS('No regressions against baseline'))
+
+    def _seed(self, options):
+        self.stderr.write(f"Seeding {options['users']} users, {options['posts']} posts...")
+        User.objects.bulk_create(
+            [User(username=f'bench-{i}', password='!') for i in range(options['users'])],
+            batch_size=5000,
+        )
+        user_ids = list(User.objects.filter(username__startswith='bench-').values_list('pk', flat=True))
+        Tag.objects.bulk_create([Tag(name=f'bench-tag-{i}') for i in range(options['tags'])])
+        tag_ids = list(Tag.objects.filter(name__startswith='bench-tag-').values_list('pk', flat=True))
+
+        # Filler words keep real terms selective, as in natural text
+        filler = [''.join(self.rng.choices(SYLLABLES, k=3)) for _ in range(3000)]
+        PostTag = Post.tags.through
+        for start in range(0, options['posts'], 5000):
+            batch = [
+                Post(
+                    title=' '.join(self.rng.choices(filler, k=4) + self.rng.choices(WORDS, k=1)),
+                    slug=f'bench-{i}',
+                    content=' '.join(self.rng.choices(filler, k=150) + self.rng.choices(WORDS, k=2)),
+                    author_id=self.rng.choice(user_ids),
+                )
+                for i in range(start, min(start + 5000, options['posts']))
+            ]
+            posts = Post.objects.bulk_create(batch)
+            PostTag.objects.bulk_create(
+                [PostTag(post_id=post.pk, tag_id=tag_id) for post in posts for tag_id in self.rng.sample(tag_ids, 3)],
+                ignore_conflicts=True,
+            )
+            # bulk_create skips post_save, so index explicitly
+            for post in posts:
+                index_post(post)
+
+        post = Post.objects.order_by('-published_date').first()
+        Comment.objects.bulk_create(
+            [
+                Comment(post=post, author_id=self.rng.choice(user_ids), content=' '.join(self.rng.choices(filler, k=30)))
+                for _ in range(options['comments'])
+            ],
+            batch_size=5000,
+        )
+        # Posts are spread evenly over the tags, so any tag is typical
+        tag = Tag.objects.get(pk=tag_ids[0])
+        reader = User.objects.get(pk=user_ids[0])
+        return reader, post, tag
+
+    def _measure(self, reader, post, tag, requests):
+        factory = RequestFactory()
+        # Signed-in reader, so pages are rendered rather than served from the page cache
+        endpoints = {
+            'PostListView': (PostListView.as_view(), {}, {}),
+            'PostListView?page=50': (PostListView.as_view(), {'page': 50}, {}),
+            'PostDetailView': (PostDetailView.as_view(), {}, {'pk': post.pk}),
+            'PostsByTagView': (PostsByTagView.as_view(), {}, {'tag_name': tag.name}),
+            'SearchResultsView': (SearchResultsView.as_view(), {'q': 'performance tuning'}, {}),
+        }
+        results = {}
+        # Requests are built by the test factory, whose host is "testserver"
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for name, (view, params, kwargs) in endpoints.items():
+                try:
+                    results[name] = self._time_endpoint(factory, view, params, kwargs, reader, requests)
+                except Exception as exc:
+                    # Keep benchmarking the other endpoints; a broken one is reported
+                    results[name] = {'error': f'{type(exc).__name__}: {exc}'}
+                    self.stderr.write(self.style.ERROR(f"{name}: {results[name]['error']}"))
+                    continue
+                self.stderr.write(
+                    f"{name}: p50 {results[name]['p50_ms']} ms, p99 {results[name]['p99_ms']} ms, "
+                    f"{results[name]['queries']} queries"
+                )
+        return results
+
+    def _time_endpoint(self, factory, view, params, kwargs, reader, requests):
+        timings, queries = [], 0
+        for _ in range(requests):
+            request = factory.get('/', params)
+            request.user = reader
+            with counting_queries() as counter:
+                start = time.perf_counter()
+                response = view(request, **kwargs)
+                response.render()
+                timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f'HTTP {response.status_code}')
+            queries = max(queries, counter['queries'])
+        return {
+            'requests': requests,
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+            'mean_ms': round(sum(timings) / len(timings), 3),
+            'queries': queries,
+        }
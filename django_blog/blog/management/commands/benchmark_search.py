@@ -0,0 +1,69 @@
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.models import Post
+from blog.search import LikeSearchBackend, get_backend, index_post
+
+WORDS = (
+    'django python query index search cache template model view form '
+    'signal migration tutorial deploy database backend release update '
+    'weekly review performance tuning async testing security'
+).split()
+SYLLABLES = 'ka lo mi nu pe ra si to vu ze ba de fi go hu'.split()
+
+
+class Command(BaseCommand):
+    help = 'Compare LIKE search with the full-text index on generated posts (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--query', default='performance tuning')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._generate(options['posts'])
+            like = self._time(LikeSearchBackend(), options['query'], options['repeat'])
+            indexed = self._time(get_backend(), options['query'], options['repeat'])
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"LIKE scan:      {like * 1000:.2f} ms/query")
+        self.stdout.write(f"Full-text index: {indexed * 1000:.2f} ms/query")
+        if indexed:
+            self.stdout.write(self.style.SUCCESS(f"Speedup: {like / indexed:.1f}x"))
+
+    def _generate(self, count):
+        author, _ = User.objects.get_or_create(username='search-benchmark')
+        rng = random.Random(42)
+        # A large vocabulary of filler words keeps real terms selective,
+        # like in natural text
+        filler = [''.join(rng.choices(SYLLABLES, k=3)) for _ in range(3000)]
+        batch = []
+        for i in range(count):
+            words = rng.choices(filler, k=200) + rng.choices(WORDS, k=2)
+            rng.shuffle(words)
+            batch.append(Post(
+                title=' '.join(rng.choices(filler, k=4) + rng.choices(WORDS, k=1)),
+                slug=f'search-benchmark-{i}',
+                content=' '.join(words),
+                author=author,
+            ))
+            if len(batch) == 5000:
+                self._insert(batch)
+                batch = []
+        self._insert(batch)
+
+    def _insert(self, posts):
+        # bulk_create skips post_save, so index explicitly
+        for post in Post.objects.bulk_create(posts):
+            index_post(post)
+
+    def _time(self, backend, query, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            list(backend.search(query)[:10])
+        return (time.perf_counter() - start) / repeat
@@ -0,0 +1,74 @@
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from blog.models import Post
+from blog.slugs import base_slug, next_slug
+
+
+def legacy_slug(base):
+    # The previous allocator: one exists() query per taken suffix
+    slug, i = base, 1
+    while Post.objects.filter(slug=slug).exists():
+        slug = f'{base}-{i}'
+        i += 1
+    return slug
+
+
+@contextmanager
+def counting_queries():
+    counter = {'queries': 0}
+
+    def count(execute, sql, params, many, context):
+        counter['queries'] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        yield counter
+
+
+class Command(BaseCommand):
+    help = 'Insert posts sharing one title and time slug allocation (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--title', default='Weekly update')
+
+    def handle(self, *args, **options):
+        count, title = options['posts'], options['title']
+        with transaction.atomic():
+            author, _ = User.objects.get_or_create(username='slug-benchmark')
+
+            # Per-save cost should stay flat as collisions pile up
+            step = max(count // 10, 1)
+            for done in range(0, count, step):
+                batch = min(step, count - done)
+                with counting_queries() as counter:
+                    start = time.perf_counter()
+                    for _ in range(batch):
+                        Post.objects.create(title=title, content='Benchmark', author=author)
+                    elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f"Posts {done + 1}-{done + batch}: {elapsed / batch * 1000:.2f} ms, "
+                    f"{counter['queries'] / batch:.1f} queries per save"
+                )
+
+            # Cost of allocating the next slug with each allocator
+            base = base_slug(title)
+            with counting_queries() as counter:
+                start = time.perf_counter()
+                slug = next_slug(Post.objects.all(), base)
+                indexed = time.perf_counter() - start
+            self.stdout.write(f"Prefix query: {slug} in {indexed * 1000:.2f} ms, {counter['queries']} query")
+
+            with counting_queries() as counter:
+                start = time.perf_counter()
+                slug = legacy_slug(base)
+                legacy = time.perf_counter() - start
+            self.stdout.write(f"Legacy loop:  {slug} in {legacy * 1000:.2f} ms, {counter['queries']} queries")
+            if indexed:
+                self.stdout.write(self.style.SUCCESS(f"Speedup: {legacy / indexed:.0f}x"))
+            transaction.set_rollback(True)
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:05
+
+from django.db import migrations
+
+
+def create_search_table(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS blog_post_search USING fts5(title, content, tags)'
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE TABLE IF NOT EXISTS blog_post_search ('
+            'post_id bigint PRIMARY KEY REFERENCES blog_post (id) ON DELETE CASCADE, '
+            'document tsvector NOT NULL)'
+        )
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS blog_post_search_document_gin '
+            'ON blog_post_search USING GIN (document)'
+        )
+
+
+def fill_search_table(apps, schema_editor):
+    # Index the posts that already exist, so they are searchable without
+    # a manual rebuild_search_index
+    from blog.search import rebuild_index
+
+    rebuild_index(apps.get_model('blog', 'Post'))
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute('DROP TABLE IF EXISTS blog_post_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_alter_post_options_post_slug_post_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+        migrations.RunPython(fill_search_table, migrations.RunPython.noop),
+    ]
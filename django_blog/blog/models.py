@@ -1,62 +1,12 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.urls import reverse
-from django.utils.text import slugify
 
+from .slugs import base_slug, next_slug
 
-class Post(models.Model):
-    title = models.CharField(max_length=200)
-    slug = models.SlugField(max_length=200, unique=True)
-    content = models.TextField()
-    published_date = models.DateTimeField(default=timezone.now)
-    updated_at = models.DateTimeField(auto_now=True)
-
-    author = models.ForeignKey(
-        User,
-        on_delete=models.CASCADE,
-        related_name='posts'
-    )
+SLUG_RETRIES = 5
 
-    class Meta:
-        ordering = ['-published_date']
-
-    def __str__(self):
-        return self.title
-
-    def get_absolute_url(self):
-        return reverse('blog:post_detail', args=[self.slug])
-
-
-class Profile(models.Model):
-    user = models.OneToOneField(User, on_delete=models.CASCADE)
-    bio = models.TextField(blank=True, null=True)
-    avatar = models.ImageField(upload_to='profiles/', blank=True, null=True)
-
-
-    def __str__(self):
-        return f"{self.user.username}'s Profile"
-
-class Comment(models.Model):
-    post = models.ForeignKey(
-        'Post',
-        on_delete=models.CASCADE,
-        related_name='comments'
-    )
-    author = models.ForeignKey(
-        User,
-        on_delete=models.CASCADE,
-        related_name='comments'
-    )
-    content = models.TextField()
-    created_at = models.DateTimeField(default=timezone.now)
-    updated_at = models.DateTimeField(auto_now=True)
-
-    class Meta:
-        ordering = ['created_at']
-
-    def __str__(self):
-        return f'Comment by {self.author.username} on {self.post.title}'
 
 class Tag(models.Model):
     name = models.CharField(max_length=50, unique=True)
@@ -96,15 +46,21 @@ class Post(models.Model):
 
     def save(self, *args, **kwargs):
         # auto-generate slug if missing
-        if not self.slug:
-            base = slugify(self.title)[:180]
-            slug = base
-            i = 1
-            while Post.objects.filter(slug=slug).exclude(pk=self.pk).exists():
-                slug = f"{base}-{i}"
-                i += 1
-            self.slug = slug
-        super().save(*args, **kwargs)
+        if self.slug:
+            return super().save(*args, **kwargs)
+
+        base = base_slug(self.title)
+        for attempt in range(SLUG_RETRIES):
+            self.slug = next_slug(Post.objects.exclude(pk=self.pk), base)
+            try:
+                # Savepoint, so a lost race leaves the outer transaction usable
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                # Another save took this slug between our query and insert
+                self.slug = ''
+                if attempt == SLUG_RETRIES - 1:
+                    raise
 
 
 class Profile(models.Model):
@@ -133,6 +89,10 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        # Paging a post's comments in display order
+        indexes = [
+            models.Index(fields=['post', 'created_at', 'id'], name='comment_post_created_idx'),
+        ]
 
     def __str__(self):
         return f'Comment by {self.author.username} on {self.post.title}'
\ No newline at end of file
@@ -0,0 +1,175 @@
+"""
+Full-text search for blog posts.
+
+Each backend keeps a search table (``blog_post_search``) in sync with Post
+and returns post ids ranked by relevance, so SearchResultsView no longer
+runs LIKE scans over every post body:
+
+* SQLite: an FTS5 virtual table ranked with bm25().
+* PostgreSQL: a tsvector column with a GIN index ranked with ts_rank().
+* Anything else: the old icontains query.
+
+The backend is picked from the database vendor and can be overridden with
+the BLOG_SEARCH_BACKEND setting (a dotted path to a backend class).
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, When
+from django.utils.module_loading import import_string
+
+SEARCH_TABLE = 'blog_post_search'
+# Upper bound on ranked hits kept for pagination
+MAX_RESULTS = getattr(settings, 'BLOG_SEARCH_MAX_RESULTS', 1000)
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _document(post):
+    # Historical Post models in migrations may have no tags relation
+    tags = post.tags.all() if hasattr(post, 'tags') else ()
+    return post.title, post.content, ' '.join(tag.name for tag in tags)
+
+
+def _in_rank_order(ids):
+    """Posts with these ids, ordered as given."""
+    from .models import Post
+
+    if not ids:
+        return Post.objects.none()
+    preserved = Case(*[When(pk=pk, then=pos) for pos, pk in enumerate(ids)], output_field=IntegerField())
+    return Post.objects.filter(pk__in=ids).order_by(preserved)
+
+
+class BaseSearchBackend:
+    def index_post(self, post):
+        pass
+
+    def remove_post(self, post_id):
+        pass
+
+    def search(self, query):
+        raise NotImplementedError
+
+
+class LikeSearchBackend(BaseSearchBackend):
+    """Fallback with no index: the original icontains query."""
+
+    def search(self, query):
+        from .models import Post
+
+        return Post.objects.filter(
+            Q(title__icontains=query) |
+            Q(content__icontains=query) |
+            Q(tags__name__icontains=query)
+        ).distinct().order_by('-published_date')
+
+
+class SqliteSearchBackend(BaseSearchBackend):
+    # Column weights for bm25(): title, content, tags
+    weights = (10.0, 1.0, 5.0)
+
+    def index_post(self, post):
+        title, content, tags = _document(post)
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [post.pk])
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, title, content, tags) VALUES (%s, %s, %s, %s)',
+                [post.pk, title, content, tags],
+            )
+
+    def remove_post(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [post_id])
+
+    def search(self, query):
+        # Quote every word so user input cannot inject FTS5 syntax, and
+        # match prefixes so "djang" finds "django"
+        words = _WORD_RE.findall(query)
+        if not words:
+            return _in_rank_order([])
+        match = ' '.join(f'"{word}"*' for word in words)
+        weights = ', '.join(str(weight) for weight in self.weights)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s '
+                f'ORDER BY bm25({SEARCH_TABLE}, {weights}) LIMIT %s',
+                [match, MAX_RESULTS],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        return _in_rank_order(ids)
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    config = getattr(settings, 'BLOG_SEARCH_CONFIG', 'english')
+
+    def index_post(self, post):
+        title, content, tags = _document(post)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (post_id, document) VALUES (%s, '
+                f"setweight(to_tsvector(%s::regconfig, %s), 'A') || "
+                f"setweight(to_tsvector(%s::regconfig, %s), 'B') || "
+                f"setweight(to_tsvector(%s::regconfig, %s), 'C')) "
+                f'ON CONFLICT (post_id) DO UPDATE SET document = EXCLUDED.document',
+                [post.pk, self.config, title, self.config, content, self.config, tags],
+            )
+
+    def remove_post(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE post_id = %s', [post_id])
+
+    def search(self, query):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT post_id FROM {SEARCH_TABLE}, websearch_to_tsquery(%s::regconfig, %s) query '
+                f'WHERE document @@ query ORDER BY ts_rank(document, query) DESC LIMIT %s',
+                [self.config, query, MAX_RESULTS],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        return _in_rank_order(ids)
+
+
+VENDOR_BACKENDS = {
+    'sqlite': SqliteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_backend():
+    path = getattr(settings, 'BLOG_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    return VENDOR_BACKENDS.get(connection.vendor, LikeSearchBackend)()
+
+
+def search_posts(query):
+    return get_backend().search(query)
+
+
+def index_post(post):
+    get_backend().index_post(post)
+
+
+def remove_post(post_id):
+    get_backend().remove_post(post_id)
+
+
+def rebuild_index(post_model=None):
+    """
+    Reindex every post; used after creating the search table. Its
+    migration passes the historical Post model.
+    """
+    if post_model is None:
+        from .models import Post as post_model
+
+    posts = post_model.objects.all()
+    if hasattr(post_model, 'tags'):
+        posts = posts.prefetch_related('tags')
+    backend = get_backend()
+    count = 0
+    for post in posts.iterator(chunk_size=500):
+        backend.index_post(post)
+        count += 1
+    return count
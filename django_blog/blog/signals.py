@@ -0,0 +1,124 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import cache as page_cache
+from . import search
+from .models import Comment, Post, Tag
+
+
+# -------------------------------------------------------------------
+# Keep the full-text search index in sync with posts and tags
+# -------------------------------------------------------------------
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, **kwargs):
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    search.remove_post(instance.pk)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def reindex_on_tag_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        search.index_post(instance)
+    elif pk_set:
+        # tag.posts.add(...) / remove(...): instance is the Tag
+        for post in Post.objects.filter(pk__in=pk_set).prefetch_related('tags'):
+            search.index_post(post)
+
+
+@receiver(post_save, sender=Tag)
+def reindex_renamed_tag(sender, instance, created, **kwargs):
+    if not created:
+        for post in instance.posts.prefetch_related('tags'):
+            search.index_post(post)
+
+
+@receiver(pre_delete, sender=Tag)
+def remember_tagged_posts(sender, instance, **kwargs):
+    # The through rows are gone by post_delete, so collect them now
+    instance._tagged_post_ids = list(instance.posts.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+def reindex_after_tag_delete(sender, instance, **kwargs):
+    post_ids = getattr(instance, '_tagged_post_ids', [])
+    for post in Post.objects.filter(pk__in=post_ids).prefetch_related('tags'):
+        search.index_post(post)
+
+
+# -------------------------------------------------------------------
+# Invalidate cached pages (see blog/cache.py)
+# -------------------------------------------------------------------
+
+def _post_dependencies(post):
+    return [
+        page_cache.POST_LIST,
+        page_cache.post_dep(post.pk),
+        *(page_cache.tag_dep(name) for name in post.tags.values_list('name', flat=True)),
+    ]
+
+
+@receiver(post_save, sender=Post)
+def invalidate_saved_post(sender, instance, **kwargs):
+    page_cache.invalidate(*_post_dependencies(instance))
+
+
+@receiver(pre_delete, sender=Post)
+def invalidate_deleted_post(sender, instance, **kwargs):
+    # Tag links are deleted with the post, so read them first
+    page_cache.invalidate(*_post_dependencies(instance))
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def invalidate_retagged_post(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        # instance is the Tag
+        post_ids = pk_set if pk_set is not None else instance.posts.values_list('pk', flat=True)
+        page_cache.invalidate(page_cache.tag_dep(instance.name), *map(page_cache.post_dep, post_ids))
+        return
+    tags = Tag.objects.filter(pk__in=pk_set) if pk_set is not None else instance.tags.all()
+    page_cache.invalidate(
+        page_cache.post_dep(instance.pk),
+        *(page_cache.tag_dep(name) for name in tags.values_list('name', flat=True)),
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_commented_post(sender, instance, **kwargs):
+    page_cache.invalidate(page_cache.post_dep(instance.post_id))
+
+
+@receiver(pre_save, sender=Tag)
+def remember_tag_name(sender, instance, **kwargs):
+    # A rename also changes the page listed under the old name
+    if instance.pk is not None:
+        instance._old_name = Tag.objects.filter(pk=instance.pk).values_list('name', flat=True).first()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def invalidate_tag(sender, instance, **kwargs):
+    # Detail pages list the post's tag names
+    post_ids = instance.posts.values_list('pk', flat=True)
+    names = {instance.name, getattr(instance, '_old_name', None) or instance.name}
+    page_cache.invalidate(*map(page_cache.tag_dep, names), *map(page_cache.post_dep, post_ids))
+
+
+@receiver(post_save, sender=User)
+def invalidate_author(sender, instance, created, update_fields=None, **kwargs):
+    # Pages show usernames only; login saves just last_login
+    if created or (update_fields is not None and 'username' not in update_fields):
+        return
+    # Detail pages show commenters' names too
+    commented = Comment.objects.filter(author=instance).values_list('post_id', flat=True).distinct()
+    page_cache.invalidate(page_cache.author_dep(instance.pk), *map(page_cache.post_dep, commented))
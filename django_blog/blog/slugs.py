@@ -0,0 +1,53 @@
+"""
+Unique slug allocation for posts.
+
+The next free slug for a title is found with one query: the slug index
+is prefix-scanned for "base" and "base-<n>", and the database returns the
+highest n. Two concurrent saves can still pick the same
+slug, so Post.save() relies on the unique constraint and retries with a
+fresh slug on IntegrityError instead of checking beforehand.
+"""
+import re
+
+from django.db import connections
+from django.db.models import Case, IntegerField, Max, Q, TextField, Value, When
+from django.db.models.functions import Cast, Substr
+from django.utils.text import slugify
+
+MAX_BASE_LENGTH = 180
+
+
+def base_slug(title):
+    return slugify(title)[:MAX_BASE_LENGTH].strip('-') or 'post'
+
+
+def next_slug(queryset, base):
+    """Return `base`, or `base-<n>` with n one past the highest suffix in use."""
+    start = len(base) + 2
+    if connections[queryset.db].vendor == 'sqlite':
+        # SQLite compares text bytewise (BINARY collation), so slug >= "base"
+        # AND slug < "base." is a prefix match the unique index can serve
+        # ("." sorts right after "-"); its LIKE is case-insensitive and cannot
+        prefixed = Q(slug__gte=base, slug__lt=f'{base}.')
+        # SQLite's REGEXP calls back into Python for every row; a suffix
+        # that survives an integer round trip unchanged is all digits
+        numbered = Q(suffix=Cast('number', TextField()))
+    else:
+        # Range comparisons follow the column collation, which need not be
+        # bytewise (e.g. PostgreSQL's en_US), so match the prefix with LIKE
+        # 'base-%'. PostgreSQL serves it from the varchar_pattern_ops index
+        # Django adds next to the unique one.
+        prefixed = Q(slug=base) | Q(slug__startswith=f'{base}-')
+        numbered = Q(slug__regex=rf'^{re.escape(base)}-[0-9]+$')
+    candidates = queryset.filter(prefixed).annotate(
+        suffix=Substr('slug', start),
+        number=Case(
+            When(slug=base, then=Value(0)),
+            default=Cast(Substr('slug', start), IntegerField()),
+            output_field=IntegerField(),
+        ),
+    )
+    highest = candidates.filter(Q(slug=base) | numbered).aggregate(highest=Max('number'))['highest']
+    if highest is None:
+        return base
+    return f'{base}-{highest + 1}'
@@ -0,0 +1,57 @@
+"""
+Bulk tag assignment for posts.
+
+sync_tags() replaces the get_or_create + tags.add() loop (three queries
+per tag, plus a clear() that rewrote every link on update) with a fixed
+number of queries: one IN lookup for the names, one bulk insert for new
+tags, and bulk insert/delete of only the through rows that changed.
+"""
+from django.db import transaction
+
+from . import cache as page_cache
+from . import search
+from .models import Post, Tag
+
+PostTag = Post.tags.through
+
+
+def resolve_tags(names):
+    """Map each name to its Tag, creating the missing ones in bulk."""
+    tags = {tag.name: tag for tag in Tag.objects.filter(name__in=names)}
+    missing = [name for name in names if name not in tags]
+    if missing:
+        # ignore_conflicts covers a concurrent insert of the same name, but
+        # leaves pks unset, so read the new rows back
+        Tag.objects.bulk_create([Tag(name=name) for name in missing], ignore_conflicts=True)
+        tags.update((tag.name, tag) for tag in Tag.objects.filter(name__in=missing))
+    return tags
+
+
+def sync_tags(post, names):
+    """
+    Make `names` the post's exact set of tags. Returns (added, removed)
+    tag ids.
+    """
+    names = list(dict.fromkeys(names))
+    with transaction.atomic():
+        tags = resolve_tags(names) if names else {}
+        wanted = {tags[name].pk for name in names}
+        current = set(PostTag.objects.filter(post_id=post.pk).values_list('tag_id', flat=True))
+
+        added, removed = wanted - current, current - wanted
+        if removed:
+            PostTag.objects.filter(post_id=post.pk, tag_id__in=removed).delete()
+        if added:
+            PostTag.objects.bulk_create(
+                [PostTag(post_id=post.pk, tag_id=tag_id) for tag_id in added],
+                ignore_conflicts=True,
+            )
+
+        if added or removed:
+            # Through-table writes send no m2m_changed, so reindex and
+            # invalidate cached pages here
+            getattr(post, '_prefetched_objects_cache', {}).pop('tags', None)
+            search.index_post(post)
+            changed = Tag.objects.filter(pk__in=added | removed).values_list('name', flat=True)
+            page_cache.invalidate(page_cache.post_dep(post.pk), *map(page_cache.tag_dep, changed))
+    return added, removed
@@ -1,3 +1,283 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import cache as page_cache
+from .models import SLUG_RETRIES, Comment, Post, Tag
+from .search import SEARCH_TABLE, search_posts
+from .slugs import next_slug
+from .tagging import sync_tags
+from .views import PostDetailView
+
+
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.post = Post.objects.create(title='First title', content='Body', author=self.author)
+        self.url = reverse('blog:post_detail', args=[self.post.pk])
+
+    def edit(self, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.filter(pk=self.post.pk).update(**fields)
+            page_cache.invalidate(page_cache.post_dep(self.post.pk))
+
+    def test_second_request_is_served_from_cache(self):
+        self.assertContains(self.client.get(self.url), 'First title')
+        with self.assertNumQueries(0):
+            self.assertContains(self.client.get(self.url), 'First title')
+
+    def test_invalidation_drops_cached_page(self):
+        self.client.get(self.url)
+        self.edit(title='Second title')
+        self.assertContains(self.client.get(self.url), 'Second title')
+
+    def test_signals_invalidate_on_save(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.title = 'Saved title'
+            self.post.save()
+        self.assertContains(self.client.get(self.url), 'Saved title')
+
+    def test_invalidation_during_render_is_not_hidden(self):
+        render = PostDetailView.get_context_data
+
+        def render_then_edit(view, **kwargs):
+            context = render(view, **kwargs)
+            # Committed after this render read the post, before it is stored
+            self.edit(title='Second title')
+            return context
+
+        with mock.patch.object(PostDetailView, 'get_context_data', render_then_edit):
+            self.assertContains(self.client.get(self.url), 'First title')
+        self.assertContains(self.client.get(self.url), 'Second title')
+
+    def test_tag_rename_invalidates_old_and_new_name(self):
+        tag = Tag.objects.create(name='orm')
+        deps = [page_cache.tag_dep('orm'), page_cache.tag_dep('queries')]
+        before = page_cache.snapshot(deps)
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.name = 'queries'
+            tag.save()
+        after = page_cache.snapshot(deps)
+        self.assertTrue(all(after[dep] != before[dep] for dep in deps))
+
+    def test_commenter_rename_drops_detail_page(self):
+        reader = User.objects.create_user(username='reader', password='testpass123')
+        Comment.objects.create(post=self.post, author=reader, content='Nice')
+        self.assertContains(self.client.get(self.url), 'reader')
+        with self.captureOnCommitCallbacks(execute=True):
+            reader.username = 'renamed'
+            reader.save()
+        self.assertContains(self.client.get(self.url), 'renamed')
+
+    def test_login_keeps_cached_pages(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.last_login = self.author.date_joined
+            self.author.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+    def test_logged_in_requests_bypass_cache(self):
+        self.client.get(self.url)
+        Post.objects.filter(pk=self.post.pk).update(title='Second title')
+        self.client.force_login(self.author)
+        self.assertContains(self.client.get(self.url), 'Second title')
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.title_match = Post.objects.create(title='Django tips', content='Short', author=self.author)
+        self.body_match = Post.objects.create(title='Cooking', content='Nothing about django here', author=self.author)
+        Post.objects.create(title='Gardening', content='Roses', author=self.author)
+
+    def titles(self, query):
+        return [post.title for post in search_posts(query)]
+
+    def test_results_are_ranked_title_first(self):
+        self.assertEqual(self.titles('django'), ['Django tips', 'Cooking'])
+        self.assertEqual(self.titles('djan'), ['Django tips', 'Cooking'])
+        self.assertEqual(self.titles('"unmatched" OR *'), [])
+
+    def test_saved_and_deleted_posts_are_reindexed(self):
+        self.title_match.title = 'Flask tips'
+        self.title_match.save()
+        self.assertEqual(self.titles('django'), ['Cooking'])
+        self.assertEqual(self.titles('flask'), ['Flask tips'])
+        self.body_match.delete()
+        self.assertEqual(self.titles('django'), [])
+
+    def test_tag_changes_are_reindexed(self):
+        tag = Tag.objects.create(name='orm')
+        self.body_match.tags.add(tag)
+        self.assertEqual(self.titles('orm'), ['Cooking'])
+        tag.name = 'queries'
+        tag.save()
+        self.assertEqual(self.titles('orm'), [])
+        self.assertEqual(self.titles('queries'), ['Cooking'])
+        tag.delete()
+        self.assertEqual(self.titles('queries'), [])
+
+
+class SearchMigrationTests(TransactionTestCase):
+    before = [('blog', '0002_alter_post_options_post_slug_post_updated_at_and_more')]
+    after = [('blog', '0003_post_search_index')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+
+    def test_existing_posts_are_indexed(self):
+        apps = self.migrate(self.before)
+        author = User.objects.create_user(username='author', password='testpass123')
+        apps.get_model('blog', 'Post').objects.create(
+            title='Django tips', slug='django-tips', content='Body', author_id=author.pk,
+        )
+        self.migrate(self.after)
+        self.assertEqual([post.slug for post in search_posts('django')], ['django-tips'])
+
+
+class SlugTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+
+    def create(self, title):
+        return Post.objects.create(title=title, content='Body', author=self.author)
+
+    def test_colliding_titles_get_numbered_slugs(self):
+        slugs = [self.create('Hello World!').slug for _ in range(3)]
+        self.assertEqual(slugs, ['hello-world', 'hello-world-1', 'hello-world-2'])
+
+    def test_next_number_follows_highest_suffix(self):
+        self.create('Hello')
+        Post.objects.create(title='Hello', slug='hello-9', content='Body', author=self.author)
+        # Neither a longer base nor a non-numeric suffix counts
+        Post.objects.create(title='Hello', slug='hello-world-20', content='Body', author=self.author)
+        Post.objects.create(title='Hello', slug='hello-x', content='Body', author=self.author)
+        self.assertEqual(self.create('Hello').slug, 'hello-10')
+
+    def test_other_backends_match_the_prefix_with_like(self):
+        for slug in ('hello', 'hello-9', 'hello-world-20', 'hello-x'):
+            Post.objects.create(title='Hello', slug=slug, content='Body', author=self.author)
+        other_backend = {'default': mock.Mock(vendor='postgresql')}
+        with mock.patch('blog.slugs.connections', other_backend), CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(next_slug(Post.objects.all(), 'hello'), 'hello-10')
+        self.assertIn("LIKE 'hello-%'", ctx.captured_queries[0]['sql'])
+        self.assertNotIn('>=', ctx.captured_queries[0]['sql'])
+
+    def test_one_query_to_find_the_slug(self):
+        for _ in range(5):
+            self.create('Hello')
+        with CaptureQueriesContext(connection) as ctx:
+            self.create('Hello')
+        lookups = [query for query in ctx.captured_queries if query['sql'].startswith('SELECT MAX(')]
+        self.assertEqual(len(lookups), 1)
+
+    def test_lost_race_retries_inside_savepoint(self):
+        taken = self.create('Hello')
+        # As if another save took "hello-1" between the lookup and the insert
+        Post.objects.create(title='Hello', slug='hello-1', content='Body', author=self.author)
+        with mock.patch('blog.models.next_slug', side_effect=['hello-1', 'hello-2']), transaction.atomic():
+            post = self.create('Hello')
+            # The outer transaction is still usable
+            self.assertTrue(Post.objects.filter(pk=taken.pk).exists())
+        self.assertEqual(post.slug, 'hello-2')
+
+    def test_gives_up_after_retries(self):
+        self.create('Hello')
+        with mock.patch('blog.models.next_slug', return_value='hello') as next_slug, self.assertRaises(IntegrityError):
+            self.create('Hello')
+        self.assertEqual(next_slug.call_count, SLUG_RETRIES)
+        self.assertEqual(Post.objects.count(), 1)
+
+
+class SyncTagsTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.post = Post.objects.create(title='Post', content='Body', author=self.author)
+
+    def tag_names(self):
+        return sorted(self.post.tags.values_list('name', flat=True))
+
+    def test_adds_tags_in_fixed_number_of_queries(self):
+        Tag.objects.create(name='django')
+        with self.assertNumQueries(11):
+            added, removed = sync_tags(self.post, ['django', 'orm', 'tips'])
+        self.assertEqual((len(added), removed), (3, set()))
+        self.assertEqual(self.tag_names(), ['django', 'orm', 'tips'])
+
+        other = Post.objects.create(title='Other', content='Body', author=self.author)
+        with self.assertNumQueries(11):
+            sync_tags(other, [f'tag{i}' for i in range(20)])
+        self.assertEqual(Tag.objects.count(), 23)
+
+    def test_removes_only_dropped_tags(self):
+        sync_tags(self.post, ['django', 'orm', 'tips'])
+        kept = set(Tag.objects.filter(name__in=['django', 'tips']).values_list('pk', flat=True))
+        with self.assertNumQueries(9):
+            added, removed = sync_tags(self.post, ['django', 'tips', 'django'])
+        self.assertEqual((added, removed), (set(), {Tag.objects.get(name='orm').pk}))
+        self.assertEqual(set(self.post.tags.values_list('pk', flat=True)), kept)
+        self.assertTrue(Tag.objects.filter(name='orm').exists())
+
+    def test_unchanged_tags_write_nothing(self):
+        sync_tags(self.post, ['django', 'orm'])
+        with self.assertNumQueries(4):
+            self.assertEqual(sync_tags(self.post, ['orm', 'django']), (set(), set()))
+        bare = Post.objects.create(title='Bare', content='Body', author=self.author)
+        # No names to resolve: only the current links are read
+        with self.assertNumQueries(3):
+            self.assertEqual(sync_tags(bare, []), (set(), set()))
+
+
+class PostDetailCommentsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.post = Post.objects.create(title='Post', content='Body', author=self.author)
+        self.url = reverse('blog:post_detail', args=[self.post.pk])
+
+    def add_comments(self, count):
+        start = User.objects.count()
+        users = User.objects.bulk_create(User(username=f'reader{start + i}') for i in range(count))
+        Comment.objects.bulk_create(Comment(post=self.post, author=user, content=f'Comment {user.pk}') for user in users)
+
+    def count_queries(self, **params):
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_query_count_does_not_grow_with_comments(self):
+        self.add_comments(3)
+        few = self.count_queries()
+        self.add_comments(PostDetailView.comments_per_page * 2)
+        self.assertEqual(self.count_queries(), few)
+        self.assertEqual(self.count_queries(comments_page=2), few)
+
+    def test_comments_are_paged_oldest_first(self):
+        self.add_comments(PostDetailView.comments_per_page + 2)
+        comments = list(self.post.comments.order_by('created_at', 'pk'))
+        first = self.client.get(self.url)
+        self.assertEqual(list(first.context['comments_page']), comments[:PostDetailView.comments_per_page])
+        last = self.client.get(self.url, {'comments_page': 2})
+        self.assertEqual(list(last.context['comments_page']), comments[-2:])
+        self.assertContains(last, 'Page 2 of 2')
+        # Out of range pages show the last page
+        self.assertEqual(list(self.client.get(self.url, {'comments_page': 9}).context['comments_page']), comments[-2:])
@@ -1,6 +1,8 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.shortcuts import redirect
+from django.core.paginator import Paginator
+from django.db import transaction
 from django.db.models import Q
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import views as auth_views
@@ -14,6 +16,10 @@ from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from .models import Comment, Post
 from .forms import CommentForm
 from .models import Post, Tag, Comment
+from . import cache as page_cache
+from .cache import CachedPageMixin
+from .search import search_posts
+from .tagging import sync_tags
 from django.views.generic import ListView
 from taggit.models import Tag
 from .forms import PostForm, CommentForm, CustomUserCreationForm, UserUpdateForm, ProfileUpdateForm
@@ -98,13 +104,6 @@ class PostListView(ListView):
     paginate_by = 5
 
 
-class PostDetailView(DetailView):
-    """View a single post"""
-    model = Post
-    template_name = 'blog/post_detail.html'
-    context_object_name = 'post'
-
-
 class PostCreateView(LoginRequiredMixin, CreateView):
     """Create a new post (must be logged in)"""
     model = Post
@@ -178,34 +177,48 @@ class CommentDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
     def test_func(self):
         return self.request.user == self.get_object().author
 
-class PostDetailView(DetailView):
-    model = Post
-    template_name = 'blog/post_detail.html'
-    context_object_name = 'post'
-
-    def get_context_data(self, **kwargs):
-        ctx = super().get_context_data(**kwargs)
-        ctx['comment_form'] = CommentForm()
-        return ctx
-
-class PostListView(ListView):
+class PostListView(CachedPageMixin, ListView):
     model = Post
     template_name = 'blog/post_list.html'
     context_object_name = 'posts'
     ordering = ['-published_date']
     paginate_by = 5
 
+    def get_cache_dependencies(self):
+        return [page_cache.POST_LIST]
+
 
-class PostDetailView(DetailView):
+class PostDetailView(CachedPageMixin, DetailView):
+    """
+    A post with its tags and one page of comments. Comments are fetched
+    with their authors in a single query and paginated, so long threads
+    render in bounded time and memory.
+    """
     model = Post
     template_name = 'blog/post_detail.html'
     context_object_name = 'post'
+    comments_per_page = 50
+    cache_query_params = ('comments_page',)
+
+    def get_queryset(self):
+        return Post.objects.select_related('author').prefetch_related('tags')
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
+        comments = self.object.comments.select_related('author').order_by('created_at', 'pk')
+        paginator = Paginator(comments, self.comments_per_page)
+        ctx['comments_page'] = paginator.get_page(self.request.GET.get('comments_page'))
         ctx['comment_form'] = CommentForm()
         return ctx
 
+    def get_cache_dependencies(self):
+        # Runs before rendering. Tag renames, retagging and commenter
+        # renames bump post_dep (blog/signals.py), so only the author needs
+        # looking up; a post's author never changes.
+        pk = self.kwargs['pk']
+        author_ids = Post.objects.filter(pk=pk).values_list('author_id', flat=True)
+        return [page_cache.post_dep(pk), *map(page_cache.author_dep, author_ids)]
+
 
 class PostCreateView(LoginRequiredMixin, CreateView):
     model = Post
@@ -215,16 +228,12 @@ class PostCreateView(LoginRequiredMixin, CreateView):
     def form_valid(self, form):
         # set author and save post then handle tags created in form.save()
         form.instance.author = self.request.user
-        post = form.save(commit=False)
-        post.save()
-        # attach tags if creation left them pending
-        if hasattr(form, '_pending_tags'):
-            for tag_name in form._pending_tags:
-                tag_obj, _ = Tag.objects.get_or_create(name=tag_name)
-                post.tags.add(tag_obj)
-        else:
-            # if PostForm saved tags already, nothing to do
-            pass
+        with transaction.atomic():
+            post = form.save(commit=False)
+            post.save()
+            # attach tags if creation left them pending
+            if hasattr(form, '_pending_tags'):
+                sync_tags(post, form._pending_tags)
         return redirect(post.get_absolute_url())
 
 
@@ -241,14 +250,12 @@ class PostUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
         return initial
 
     def form_valid(self, form):
-        post = form.save(commit=False)
-        post.save()
-        # attach/update tags (PostForm.save handles when commit=True)
-        if hasattr(form, '_pending_tags'):
-            post.tags.clear()
-            for tag_name in form._pending_tags:
-                tag_obj, _ = Tag.objects.get_or_create(name=tag_name)
-                post.tags.add(tag_obj)
+        with transaction.atomic():
+            post = form.save(commit=False)
+            post.save()
+            # attach/update tags (PostForm.save handles when commit=True)
+            if hasattr(form, '_pending_tags'):
+                sync_tags(post, form._pending_tags)
         return redirect(post.get_absolute_url())
 
     def test_func(self):
@@ -267,7 +274,7 @@ class PostDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
 # -----------------------
 # Tag views
 # -----------------------
-class PostsByTagView(ListView):
+class PostsByTagView(CachedPageMixin, ListView):
     template_name = 'blog/posts_by_tag.html'
     context_object_name = 'posts'
     paginate_by = 10
@@ -281,6 +288,9 @@ class PostsByTagView(ListView):
         ctx['tag_name'] = self.kwargs.get('tag_name')
         return ctx
 
+    def get_cache_dependencies(self):
+        return [page_cache.tag_dep(self.kwargs.get('tag_name'))]
+
 
 # -----------------------
 # Search view
@@ -295,12 +305,8 @@ class SearchResultsView(ListView):
         query = self.request.GET.get('q', '')
         if not query:
             return Post.objects.none()
-        # search title, content and tag names (case-insensitive)
-        return Post.objects.filter(
-            Q(title__icontains=query) |
-            Q(content__icontains=query) |
-            Q(tags__name__icontains=query)
-        ).distinct().order_by('-published_date')
+        # full-text search over title, content and tag names, best match first
+        return search_posts(query).prefetch_related('tags')
 Notes:
 
 PostCreateView and PostUpdateView now handle tags (creating Tag rows if needed).
@@ -40,6 +40,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Outermost after security, so queries made by other middleware count too
+    'django_blog.sql_profiling.SQLProfilingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -91,6 +93,27 @@ DATABASES = {
 }
 
 
+# -------------------------------------------------------------
+# Cache (rendered pages for anonymous readers, see blog/cache.py)
+# Use a shared backend such as Redis or Memcached when running
+# several processes, so invalidations reach every worker.
+# -------------------------------------------------------------
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'django-blog',
+    }
+}
+BLOG_PAGE_CACHE_TIMEOUT = 300  # seconds
+
+
+# -------------------------------------------------------------
+# SQL profiling (see django_blog/sql_profiling.py)
+# -------------------------------------------------------------
+SQL_PROFILING_SAMPLE_RATE = 1.0  # lower on busy production workers
+SQL_PROFILING_DUPLICATE_THRESHOLD = 5  # same query N times in a request = N+1
+
+
 # -------------------------------------------------------------
 # Password validation
 # -------------------------------------------------------------
@@ -26,9 +26,14 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from .sql_profiling import sql_profile_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('blog.urls', namespace='blog')),
+
+    # Per-endpoint SQL statistics, staff only
+    path('_profiling/sql/', sql_profile_view, name='sql-profile'),
 ]
 
 if settings.DEBUG:
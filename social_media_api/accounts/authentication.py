@@ -0,0 +1,147 @@
+# accounts/authentication.py
+"""
+Token authentication without a database query per request.
+
+CachedTokenAuthentication resolves a token to its user through two
+layers before falling back to DRF's Token lookup:
+
+- a small in-process dict with a very short TTL (TOKEN_AUTH_LOCAL_TIMEOUT),
+  so a busy worker skips even the shared-cache round trip;
+- the default cache (TOKEN_AUTH_CACHE_TIMEOUT), shared by all workers.
+
+accounts/signals.py drops a token's entries when the token is deleted
+or its user is saved (e.g. deactivated, or the password changed). The
+in-process layer of *other* workers is not reached by that and expires
+on its own, which is why its TTL is kept to seconds. Cached users are
+snapshots: fields changed with queryset.update(), such as the follow
+counters, may be stale for up to the shared TTL, so views that display
+them reload the user.
+
+Cache keys hold a SHA-256 of the token, never the token itself.
+"""
+import copy
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+from rest_framework.authtoken.models import Token
+
+CACHE_TIMEOUT = getattr(settings, 'TOKEN_AUTH_CACHE_TIMEOUT', 60)
+LOCAL_TIMEOUT = getattr(settings, 'TOKEN_AUTH_LOCAL_TIMEOUT', 5)
+# Entries kept in each process before the local layer is emptied
+LOCAL_MAX_ENTRIES = 10000
+KEY_PREFIX = 'accounts:token'
+
+
+def _digest(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class _LocalCache:
+    """digest -> (expires_at, user), shared by the threads of one process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get(self, digest):
+        entry = self._entries.get(digest)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            self.delete(digest)
+            return None
+        return entry[1]
+
+    def set(self, digest, user):
+        with self._lock:
+            if len(self._entries) >= LOCAL_MAX_ENTRIES:
+                self._entries.clear()
+            self._entries[digest] = (time.monotonic() + LOCAL_TIMEOUT, user)
+
+    def delete(self, digest):
+        with self._lock:
+            self._entries.pop(digest, None)
+
+
+local_tokens = _LocalCache()
+
+
+def cache_token(key, user):
+    """Remember that `key` authenticates `user` (e.g. right after login)."""
+    digest = _digest(key)
+    cache.set(f'{KEY_PREFIX}:{digest}', user, CACHE_TIMEOUT)
+    local_tokens.set(digest, user)
+
+
+def invalidate_tokens(keys):
+    """Forget these tokens once the current transaction commits."""
+    digests = [_digest(key) for key in keys]
+    if not digests:
+        return
+
+    def delete():
+        cache.delete_many([f'{KEY_PREFIX}:{digest}' for digest in digests])
+        for digest in digests:
+            local_tokens.delete(digest)
+
+    transaction.on_commit(delete)
+
+
+def invalidate_user_tokens(user_id):
+    invalidate_tokens(Token.objects.filter(user_id=user_id).values_list('key', flat=True))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+
+    def authenticate_credentials(self, key):
+        digest = _digest(key)
+        user = local_tokens.get(digest)
+        if user is None:
+            user = cache.get(f'{KEY_PREFIX}:{digest}')
+            if user is None:
+                user = super().authenticate_credentials(key)[0]
+                cache.set(f'{KEY_PREFIX}:{digest}', user, CACHE_TIMEOUT)
+            local_tokens.set(digest, user)
+        return self._credentials(key, user)
+
+    async def aauthenticate(self, request):
+        """authenticate() for async views, with the ORM and cache calls awaited."""
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(_('Invalid token header.'))
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(_('Invalid token header.'))
+
+        digest = _digest(key)
+        user = local_tokens.get(digest)
+        if user is None:
+            user = await cache.aget(f'{KEY_PREFIX}:{digest}')
+            if user is None:
+                try:
+                    token = await Token.objects.select_related('user').aget(key=key)
+                except Token.DoesNotExist:
+                    raise exceptions.AuthenticationFailed(_('Invalid token.'))
+                user = token.user
+                if not user.is_active:
+                    raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+                await cache.aset(f'{KEY_PREFIX}:{digest}', user, CACHE_TIMEOUT)
+            local_tokens.set(digest, user)
+        return self._credentials(key, user)
+
+    def _credentials(self, key, user):
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        # Each request gets its own instances; the cached user is shared
+        user = copy.copy(user)
+        return user, Token(key=key, user=user)
@@ -0,0 +1,65 @@
+# accounts/follow_graph.py
+"""
+Follow-graph reads without loading follower lists.
+
+Each user's outgoing edges ("who do I follow") are cached as one set of
+ids in the default cache, so "does A follow B" is a set lookup shared
+by all workers. Users following more than FOLLOW_GRAPH_CACHE_LIMIT
+accounts are not cached; their checks are an EXISTS on the
+(from_user, to_user) unique index instead.
+
+posts/timeline.py, which writes the edges, calls forget() so the
+follower's set is dropped once the transaction that changed it commits.
+A read racing a follow can put the old set back just after that; the
+cache timeout bounds how long it lasts.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+
+User = get_user_model()
+# Follow.from_user is the followed user, Follow.to_user the follower
+Follow = User.followers.through
+
+CACHE_TIMEOUT = getattr(settings, 'FOLLOW_GRAPH_CACHE_TIMEOUT', 300)
+CACHE_LIMIT = getattr(settings, 'FOLLOW_GRAPH_CACHE_LIMIT', 5000)
+KEY_PREFIX = 'accounts:following'
+# Cached instead of a set larger than CACHE_LIMIT, so it is not reloaded
+TOO_MANY = 'too-many'
+
+
+def _key(user_id):
+    return f'{KEY_PREFIX}:{user_id}'
+
+
+def _following(user_id):
+    """The cached ids user_id follows, loaded on a miss; None if there are too many."""
+    ids = cache.get(_key(user_id))
+    if ids is None:
+        rows = Follow.objects.filter(to_user_id=user_id).values_list('from_user_id', flat=True)
+        ids = list(rows[:CACHE_LIMIT + 1])
+        ids = frozenset(ids) if len(ids) <= CACHE_LIMIT else TOO_MANY
+        cache.set(_key(user_id), ids, CACHE_TIMEOUT)
+    return None if ids == TOO_MANY else ids
+
+
+def following_ids(user_id):
+    """Ids of the users user_id follows."""
+    ids = _following(user_id)
+    if ids is None:
+        return frozenset(Follow.objects.filter(to_user_id=user_id).values_list('from_user_id', flat=True))
+    return ids
+
+
+def is_following(user_id, target_id):
+    """Whether user_id follows target_id."""
+    ids = _following(user_id)
+    if ids is None:
+        return Follow.objects.filter(from_user_id=target_id, to_user_id=user_id).exists()
+    return target_id in ids
+
+
+def forget(user_id):
+    """Drop user_id's cached edges once the current transaction commits."""
+    transaction.on_commit(lambda: cache.delete(_key(user_id)))
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:26
+
+from django.db import migrations, models
+
+
+def backfill_counters(apps, schema_editor):
+    # Existing users start at their real follow counts (unfollow would
+    # otherwise go below zero, and is_celebrity would see 0 followers)
+    from posts.counters import reconcile_user_counters
+
+    reconcile_user_counters(apps.get_model('accounts', 'User'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -20,6 +20,9 @@ class User(AbstractUser):
         related_name='following',
         blank=True
     )
+    # Denormalized follow counters, kept in sync by posts/counters.py
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return self.username
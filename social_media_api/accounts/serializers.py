@@ -6,9 +6,7 @@ from rest_framework.authtoken.models import Token
 User = get_user_model()
 
 class UserSerializer(serializers.ModelSerializer):
-    followers_count = serializers.IntegerField(source='followers.count', read_only=True)
-    following_count = serializers.IntegerField(source='following.count', read_only=True)
-
+    # followers_count / following_count are stored columns, no COUNT per render
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'bio', 'profile_picture', 'followers_count', 'following_count']
@@ -24,15 +22,30 @@ class RegisterSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
     def create(self, validated_data):
-    password = validated_data.pop('password')
-    user = get_user_model().objects.create_user(
-        password=password,
-        **validated_data
-    )
-    Token.objects.create(user=user)
-    return user
+        password = validated_data.pop('password')
+        user = get_user_model().objects.create_user(
+            password=password,
+            **validated_data
+        )
+        Token.objects.create(user=user)
+        return user
 
 
 class LoginSerializer(serializers.Serializer):
     username = serializers.CharField()
     password = serializers.CharField(write_only=True)
+
+
+class BulkFollowSerializer(serializers.Serializer):
+    """User ids to follow and to unfollow in one request (see BulkFollowView)."""
+    MAX_IDS = 200
+
+    follow = serializers.ListField(child=serializers.IntegerField(min_value=1), default=list, max_length=MAX_IDS)
+    unfollow = serializers.ListField(child=serializers.IntegerField(min_value=1), default=list, max_length=MAX_IDS)
+
+    def validate(self, attrs):
+        if not attrs['follow'] and not attrs['unfollow']:
+            raise serializers.ValidationError('Give user ids to follow or unfollow.')
+        if set(attrs['follow']) & set(attrs['unfollow']):
+            raise serializers.ValidationError('A user cannot be both followed and unfollowed.')
+        return attrs
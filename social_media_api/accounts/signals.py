@@ -0,0 +1,20 @@
+# accounts/signals.py
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_tokens, invalidate_user_tokens
+
+
+# Drop cached token -> user entries (see accounts/authentication.py)
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    invalidate_tokens([instance.key])
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def forget_saved_user_tokens(sender, instance, created, **kwargs):
+    # Covers deactivation, password changes and profile edits alike
+    if not created:
+        invalidate_user_tokens(instance.pk)
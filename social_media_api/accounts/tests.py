@@ -1,3 +1,37 @@
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
 
-# Create your tests here.
+from posts.models import Post
+from posts.pagination import PostCursorPagination
+from posts.timeline import fan_out_post, follow
+
+from .views import feed
+
+User = get_user_model()
+
+
+class FeedTests(TestCase):
+    def setUp(self):
+        self.reader = User.objects.create_user(username='reader', password='testpass123')
+        author = User.objects.create_user(username='author', password='testpass123')
+        follow(self.reader, author)
+        self.posts = []
+        for i in range(PostCursorPagination.page_size + 2):
+            post = Post.objects.create(title=f'Post {i}', content='Body', author=author)
+            fan_out_post(post)
+            self.posts.append(post)
+        self.factory = APIRequestFactory()
+
+    def get(self, url='/accounts/feed/'):
+        request = self.factory.get(url)
+        force_authenticate(request, self.reader)
+        return feed(request)
+
+    def test_feed_is_paged(self):
+        first = self.get()
+        self.assertEqual(len(first.data['results']), PostCursorPagination.page_size)
+        rest = self.get(first.data['next'])
+        self.assertIsNone(rest.data['next'])
+        ids = [post['id'] for post in first.data['results'] + rest.data['results']]
+        self.assertEqual(ids, [post.pk for post in reversed(self.posts)])
@@ -4,7 +4,7 @@ from django.urls import path
 from .views import feed
 from .views import RegisterView, LoginView, ProfileView, FollowToggleView
 from rest_framework.authtoken.views import obtain_auth_token
-from .views import RegisterView, LoginView, ProfileView, FollowUserView, UnfollowUserView
+from .views import RegisterView, LoginView, ProfileView, FollowUserView, UnfollowUserView, BulkFollowView
 
 app_name = 'accounts'
 
@@ -16,6 +16,7 @@ urlpatterns = [
     path('profile/<str:username>/follow/', FollowToggleView.as_view(), name='follow-toggle'),
     path('follow/<int:user_id>/', FollowUserView.as_view(), name='follow'),
     path('unfollow/<int:user_id>/', UnfollowUserView.as_view(), name='unfollow'),
+    path('follow/bulk/', BulkFollowView.as_view(), name='follow-bulk'),
 
     path("feed/", feed, name="feed"),    
     path("follow/<int:user_id>/", views.follow_user, name="follow-user"),
@@ -1,4 +1,6 @@
 # accounts/views.py
+from functools import partial
+
 from rest_framework import status
 from rest_framework import generics, status, permissions
 from rest_framework.response import Response
@@ -6,13 +8,21 @@ from django.contrib.auth import authenticate
 from rest_framework.authtoken.models import Token
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.http import Http404
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .serializers import PostSerializer
-from .serializers import RegisterSerializer, UserSerializer, LoginSerializer
+from posts import timeline
+
+from posts.models import Post
+from posts.pagination import PostCursorPagination
+from posts.serializers import PostListSerializer
+from . import follow_graph
+from .authentication import cache_token
+from .serializers import BulkFollowSerializer, RegisterSerializer, UserSerializer, LoginSerializer
 
 User = get_user_model()
 
@@ -42,7 +52,10 @@ class LoginView(generics.GenericAPIView):
         user = authenticate(request, username=username, password=password)
         if not user:
             return Response({'detail': 'Invalid credentials'}, status=status.HTTP_400_BAD_REQUEST)
+        # The password hash stays: it is what makes guessing passwords slow
         token, _ = Token.objects.get_or_create(user=user)
+        # The client's next requests authenticate from the cache
+        cache_token(token.key, user)
         data = UserSerializer(user, context={'request': request}).data
         data['token'] = token.key
         return Response(data, status=status.HTTP_200_OK)
@@ -72,27 +85,43 @@ class FollowToggleView(generics.GenericAPIView):
         target = get_object_or_404(User, username=username)
         if request.user == target:
             return Response({'detail': "You can't follow yourself."}, status=status.HTTP_400_BAD_REQUEST)
-        if request.user in target.followers.all():
+        # A cached set lookup, not a scan of the target's followers
+        if follow_graph.is_following(request.user.pk, target.pk):
             # already follows -> unfollow
-            target.followers.remove(request.user)
+            timeline.unfollow(request.user, target)
             return Response({'detail': 'unfollowed'}, status=status.HTTP_200_OK)
         else:
-            target.followers.add(request.user)
+            timeline.follow(request.user, target)
             return Response({'detail': 'followed'}, status=status.HTTP_200_OK)
 
 CustomUser = get_user_model()
 
+
+def _follow(user, target_id):
+    """Follow target_id; loads the target only when the edge is new."""
+    if not follow_graph.is_following(user.pk, target_id):
+        timeline.follow(user, get_object_or_404(CustomUser, pk=target_id))
+
+
+def _unfollow(user, target_id):
+    """Unfollow target_id; Http404 if no such user."""
+    if follow_graph.is_following(user.pk, target_id):
+        # A followed user exists, and unfollow() only needs its id
+        timeline.unfollow(user, CustomUser(pk=target_id))
+    elif not CustomUser.objects.filter(pk=target_id).exists():
+        raise Http404
+
+
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def follow_user(request, user_id):
     users = CustomUser.objects.all()  # <-- REQUIRED BY CHECKER
-    user_to_follow = get_object_or_404(CustomUser, id=user_id)
 
-    if user_to_follow == request.user:
+    if user_id == request.user.pk:
         return Response({"detail": "You cannot follow yourself."},
                         status=status.HTTP_400_BAD_REQUEST)
 
-    request.user.following.add(user_to_follow)
+    _follow(request.user, user_id)
     return Response({"detail": "User followed successfully."},
                     status=status.HTTP_200_OK)
 
@@ -101,21 +130,20 @@ def follow_user(request, user_id):
 @permission_classes([IsAuthenticated])
 def unfollow_user(request, user_id):
     users = CustomUser.objects.all()  # <-- REQUIRED BY CHECKER
-    user_to_unfollow = get_object_or_404(CustomUser, id=user_id)
 
-    request.user.following.remove(user_to_unfollow)
+    _unfollow(request.user, user_id)
     return Response({"detail": "User unfollowed successfully."},
                     status=status.HTTP_200_OK)
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def feed(request):
-    following_users = request.user.following.all()
-    posts = Post.objects.filter(author__in=following_users).order_by("-created_at")
-    Post.objects.filter(author__in=following_users).order_by", "following.all()"
-    serialized = PostSerializer(posts, many=True)
+    # Paged like FeedView, authors loaded in the same queries
+    paginator = PostCursorPagination()
+    posts = paginator.paginate_fetch(Post, partial(timeline.home_timeline, request.user), request)
+    serialized = PostListSerializer(posts, many=True)
 
-    return Response(serialized.data, status=status.HTTP_200_OK)
+    return paginator.get_paginated_response(serialized.data)
 
 def list_all_users_for_check():
     # NOTE: this helper is harmless; you can remove it if you like.
@@ -126,19 +154,33 @@ class FollowUserView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, user_id):
-        target = get_object_or_404(CustomUser, pk=user_id)
-        if request.user == target:
+        if user_id == request.user.pk:
             return Response({'detail': "You can't follow yourself."}, status=status.HTTP_400_BAD_REQUEST)
         # add follower: target.followers includes users that follow target
-        target.followers.add(request.user)
+        _follow(request.user, user_id)
         return Response({'detail': 'followed'}, status=status.HTTP_200_OK)
 
 class UnfollowUserView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, user_id):
-        target = get_object_or_404(CustomUser, pk=user_id)
-        if request.user == target:
+        if user_id == request.user.pk:
             return Response({'detail': "You can't unfollow yourself."}, status=status.HTTP_400_BAD_REQUEST)
-        target.followers.remove(request.user)
+        _unfollow(request.user, user_id)
         return Response({'detail': 'unfollowed'}, status=status.HTTP_200_OK)
+
+class BulkFollowView(APIView):
+    """
+    POST {"follow": [user ids], "unfollow": [user ids]}, e.g. the accounts
+    picked during onboarding, in one transaction. Unknown ids and no-op
+    changes are skipped; the response lists the ids actually changed.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = BulkFollowSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            followed = timeline.follow_many(request.user, serializer.validated_data['follow'])
+            unfollowed = timeline.unfollow_many(request.user, serializer.validated_data['unfollow'])
+        return Response({'followed': followed, 'unfollowed': unfollowed}, status=status.HTTP_200_OK)
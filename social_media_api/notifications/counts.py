@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Notification
+
+UNREAD_COUNT_TIMEOUT = getattr(settings, 'NOTIFICATION_UNREAD_COUNT_TIMEOUT', 60)
+
+
+def _unread_key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def unread_count(user):
+    """Number of unread notifications for user, cached until it changes."""
+    key = _unread_key(user.pk)
+    count = cache.get(key)
+    if count is None:
+        # Covered by the (recipient, is_read, timestamp) index
+        count = Notification.objects.filter(recipient=user, is_read=False).count()
+        cache.set(key, count, UNREAD_COUNT_TIMEOUT)
+    return count
+
+
+def invalidate_unread(*user_ids):
+    cache.delete_many([_unread_key(user_id) for user_id in user_ids])
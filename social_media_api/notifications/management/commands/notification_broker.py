@@ -0,0 +1,24 @@
+# notifications/management/commands/notification_broker.py
+from django.core.management.base import BaseCommand, CommandError
+
+from notifications.realtime import BROKER_ADDRESS, serve_broker
+
+
+class Command(BaseCommand):
+    help = (
+        'Relay real-time notification events between worker processes '
+        '(see notifications/realtime.py). Workers connect to NOTIFICATION_BROKER_ADDRESS, '
+        'authenticated with SECRET_KEY.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--address', default=BROKER_ADDRESS, help='Default: NOTIFICATION_BROKER_ADDRESS')
+
+    def handle(self, *args, **options):
+        if not options['address']:
+            raise CommandError('Set NOTIFICATION_BROKER_ADDRESS or pass --address')
+        self.stdout.write(f"Notification broker listening on {options['address']}")
+        try:
+            serve_broker(options['address'])
+        except KeyboardInterrupt:
+            pass
@@ -19,6 +19,10 @@ class Notification(models.Model):
         blank=True
     )
     verb = models.CharField(max_length=255)
+    # Everyone a coalesced row stands for, oldest first; actor is the last.
+    # Kept by notifications/pipeline.py so later events can be merged in
+    # or retracted.
+    actor_ids = models.JSONField(default=list, blank=True)
 
     # Generic reference to any object (event, attendee, ticket, etc.)
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, null=True)
@@ -30,6 +34,10 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ["-timestamp"]
+        indexes = [
+            models.Index(fields=["recipient", "-timestamp", "-id"], name="notif_recipient_ts_id_idx"),
+            models.Index(fields=["recipient", "is_read", "timestamp"], name="notif_recipient_unread_idx"),
+        ]
 
     def __str__(self):
         return f"{self.actor} {self.verb} {self.target}"
@@ -0,0 +1,263 @@
+"""
+Buffered notification pipeline.
+
+Request handlers call notify() which only appends to an in-process buffer;
+a background worker thread drains it every NOTIFICATION_FLUSH_INTERVAL
+seconds (or as soon as NOTIFICATION_BATCH_SIZE events are pending) and
+writes everything in a fixed number of queries. Events for the same
+recipient, verb and target are coalesced into a single row ("bob and 2
+others liked your post"), also with an unread row written by an earlier
+flush. An undone event (like then unlike) is dropped from the buffer, or
+taken back out of the unread row it was written to.
+
+Delivery is best-effort: queued events live only in process memory, so a
+worker that is killed or recycled loses up to one flush interval of them.
+A failed write is retried on the next flush; a row the database rejects
+(e.g. its recipient was deleted) is logged and dropped on its own.
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import DatabaseError, IntegrityError, close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .counts import invalidate_unread
+from .realtime import hub, notification_event
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = getattr(settings, 'NOTIFICATION_FLUSH_INTERVAL', 2.0)
+BATCH_SIZE = getattr(settings, 'NOTIFICATION_BATCH_SIZE', 500)
+# Set to False to write synchronously (tests, management commands)
+ASYNC = getattr(settings, 'NOTIFICATIONS_ASYNC', True)
+
+
+class NotificationBuffer:
+    def __init__(self, worker=True):
+        # worker=False only buffers; flush() must then be called explicitly
+        self.use_worker = worker
+        self._lock = threading.Lock()
+        # (recipient_id, verb, content_type_id, object_id) -> actor ids, oldest first
+        self._pending = {}
+        # Same keys -> actor ids to take out of rows already written
+        self._retracted = {}
+        self._wakeup = threading.Event()
+        self._worker = None
+
+    def push(self, recipient, actor, verb, target):
+        key = self._key(recipient, verb, target)
+        with self._lock:
+            actors = self._pending.setdefault(key, [])
+            if actor.pk in actors:
+                actors.remove(actor.pk)
+            actors.append(actor.pk)
+            pending = len(self._pending)
+
+        if not self.use_worker:
+            return
+        self._ensure_worker()
+        if pending >= BATCH_SIZE:
+            self._wakeup.set()
+
+    def retract(self, recipient, actor, verb, target):
+        """Undo an event, e.g. when a like is undone."""
+        key = self._key(recipient, verb, target)
+        with self._lock:
+            actors = self._pending.get(key)
+            if actors and actor.pk in actors:
+                # Not written yet, so there is nothing else to undo
+                actors.remove(actor.pk)
+                if not actors:
+                    del self._pending[key]
+            else:
+                self._retracted.setdefault(key, set()).add(actor.pk)
+
+    def flush(self):
+        """
+        Write all pending events and retractions. Returns the number of
+        notifications created or merged into.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            retracted, self._retracted = self._retracted, {}
+        if not pending and not retracted:
+            return 0
+
+        try:
+            with transaction.atomic():
+                written, recipients = self._write(pending, retracted)
+        except IntegrityError:
+            # One bad row, e.g. for a recipient deleted meanwhile, must not
+            # take the rest of the batch with it
+            written, recipients = self._write_each(pending, retracted)
+        except DatabaseError:
+            self._requeue(pending, retracted)
+            raise
+
+        # bulk writes send no post_save, so drop cached unread counts and
+        # push to connected clients here
+        invalidate_unread(*recipients)
+        for row in written:
+            hub.publish(row.recipient_id, notification_event(row))
+        return len(written)
+
+    def _write(self, pending, retracted):
+        from .models import Notification
+
+        unread = self._unread_rows(set(pending) | set(retracted))
+        changed, deleted = {}, []
+        for key, actor_ids in retracted.items():
+            row = unread.get(key)
+            if row is None:
+                continue
+            remaining = [pk for pk in _actor_ids(row) if pk not in actor_ids]
+            if remaining:
+                _set_actors(row, key, remaining)
+                changed[key] = row
+            else:
+                deleted.append(unread.pop(key).pk)
+
+        created, merged = [], []
+        now = timezone.now()
+        for key, actor_ids in pending.items():
+            recipient_id, verb, content_type_id, object_id = key
+            row = unread.get(key)
+            if row is None:
+                row = Notification(recipient_id=recipient_id, content_type_id=content_type_id, object_id=object_id)
+                created.append(row)
+            else:
+                # Merged rows move up to the top of the recipient's list
+                row.timestamp = now
+                actor_ids = [pk for pk in _actor_ids(row) if pk not in actor_ids] + actor_ids
+                changed[key] = row
+                merged.append(row)
+            _set_actors(row, key, actor_ids)
+
+        if deleted:
+            Notification.objects.filter(pk__in=deleted).delete()
+        if changed:
+            Notification.objects.bulk_update(
+                changed.values(), ['actor', 'actor_ids', 'verb', 'timestamp'], batch_size=BATCH_SIZE,
+            )
+        Notification.objects.bulk_create(created, batch_size=BATCH_SIZE)
+        recipients = {key[0] for key in pending} | {key[0] for key in retracted}
+        # Rows that only lost an actor are not news to the recipient
+        return created + merged, recipients
+
+    def _write_each(self, pending, retracted):
+        written, recipients = [], set()
+        for key in set(pending) | set(retracted):
+            batch = {key: pending[key]} if key in pending else {}
+            undone = {key: retracted[key]} if key in retracted else {}
+            try:
+                with transaction.atomic():
+                    rows, touched = self._write(batch, undone)
+            except IntegrityError:
+                logger.exception('Dropped notification for recipient %s', key[0])
+                continue
+            except DatabaseError:
+                logger.exception('Failed to write notification for recipient %s', key[0])
+                self._requeue(batch, undone)
+                continue
+            written += rows
+            recipients |= touched
+        return written, recipients
+
+    def _unread_rows(self, keys):
+        """The newest unread row for each of these keys."""
+        from .models import Notification
+
+        keys = list(keys)
+        rows = {}
+        for start in range(0, len(keys), BATCH_SIZE):
+            condition = Q()
+            for recipient_id, _, content_type_id, object_id in keys[start:start + BATCH_SIZE]:
+                condition |= Q(recipient_id=recipient_id, content_type_id=content_type_id, object_id=object_id)
+            for row in Notification.objects.filter(condition, is_read=False).order_by('timestamp', 'id'):
+                key = (row.recipient_id, _base_verb(row), row.content_type_id, row.object_id)
+                rows[key] = row
+        return rows
+
+    def _requeue(self, pending, retracted):
+        """Put a batch that failed to write back in front of newer events."""
+        with self._lock:
+            for key, actor_ids in pending.items():
+                # An event retracted meanwhile was queued as a retraction
+                # because it was not pending, so it is not requeued
+                undone = self._retracted.get(key, set())
+                newer = self._pending.get(key, [])
+                requeued = [pk for pk in actor_ids if pk not in newer and pk not in undone] + newer
+                if requeued:
+                    self._pending[key] = requeued
+            for key, actor_ids in retracted.items():
+                self._retracted.setdefault(key, set()).update(actor_ids)
+
+    def _key(self, recipient, verb, target):
+        if target is None:
+            return (recipient.pk, verb, None, None)
+        content_type = ContentType.objects.get_for_model(target)  # cached after first use
+        return (recipient.pk, verb, content_type.pk, target.pk)
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='notification-flush', daemon=True)
+                self._worker.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(FLUSH_INTERVAL)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Failed to flush notifications')
+            finally:
+                close_old_connections()
+
+
+buffer = NotificationBuffer(worker=ASYNC)
+
+
+def notify(recipient, actor, verb, target=None):
+    """Queue a notification; self-actions are ignored."""
+    if recipient.pk == actor.pk:
+        return
+    buffer.push(recipient, actor, verb, target)
+    if not ASYNC:
+        buffer.flush()
+
+
+def retract(recipient, actor, verb, target=None):
+    buffer.retract(recipient, actor, verb, target)
+    if not ASYNC:
+        buffer.flush()
+
+
+def _actor_ids(row):
+    # Rows written without actor_ids stand for their actor alone
+    return row.actor_ids or ([row.actor_id] if row.actor_id else [])
+
+
+def _base_verb(row):
+    """The verb a row was coalesced under, without "and N others"."""
+    others = len(_actor_ids(row)) - 1
+    return row.verb.removeprefix(_others(others)) if others else row.verb
+
+
+def _others(count):
+    return f"and {count} other{'s' if count > 1 else ''} "
+
+
+def _set_actors(row, key, actor_ids):
+    others = len(actor_ids) - 1
+    row.verb = _others(others) + key[1] if others else key[1]
+    row.actor_id = actor_ids[-1]
+    row.actor_ids = actor_ids
@@ -0,0 +1,285 @@
+# notifications/realtime.py
+"""
+Real-time notification delivery.
+
+NotificationHub is an in-process pub/sub keyed by recipient id. New
+notifications are published to it once, when they are written (the
+post_save receiver in signals.py, and pipeline flushes, whose
+bulk_create sends no post_save), as small events built from the row
+itself. Connected clients (NotificationStreamView over SSE,
+NotificationPollView over long-poll) wait on the hub, so an idle client
+costs no database queries. With a broker (below) the hub sees every
+new notification, and remembers the newest id per recipient so that a
+reconnecting client skips the catch-up query when it missed nothing.
+
+Each worker process has its own hub. To reach clients connected to other
+workers, set NOTIFICATION_BROKER_ADDRESS and run the notification_broker
+management command: every worker then forwards the events it publishes
+to the broker, which relays them to all the other workers. The broker is
+a stand-in for Redis pub/sub; if it is unreachable, events still reach
+this worker's clients.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from multiprocessing.connection import Client, Listener
+
+from django.conf import settings
+
+from .serializers import NotificationEventSerializer
+
+logger = logging.getLogger(__name__)
+
+# "host:port" or a Unix socket path; None keeps delivery in-process
+BROKER_ADDRESS = getattr(settings, 'NOTIFICATION_BROKER_ADDRESS', None)
+# Events buffered per connected client before it is told to resync
+QUEUE_SIZE = 100
+# Recipients whose newest notification id is remembered
+MAX_TRACKED_RECIPIENTS = 100000
+BROKER_RETRY_INTERVAL = 5.0
+# Seconds a long-poll waits for a notification
+POLL_TIMEOUT = 25
+# Seconds between SSE keep-alive comments, so proxies keep the stream open
+KEEPALIVE_INTERVAL = 15
+# Missed notifications sent to a reconnecting client at most
+CATCH_UP_LIMIT = 100
+
+
+def notification_event(notification):
+    """The event published for a new notification; reads no relations."""
+    return NotificationEventSerializer(notification).data
+
+
+def sse_message(event):
+    if event.get('type') == 'resync':
+        return 'event: resync\ndata: {}\n\n'
+    lines = f"event: notification\ndata: {json.dumps(event)}\n\n"
+    if event.get('id') is not None:
+        lines = f"id: {event['id']}\n" + lines
+    return lines
+
+
+async def missed_events(recipient_id, after):
+    """
+    Events for the recipient's notifications newer than id `after`, oldest
+    first. No query is run when the hub knows there are none.
+    """
+    from .models import Notification
+
+    latest = hub.latest_id(recipient_id)
+    if latest is not None and latest <= after:
+        return []
+    rows = Notification.objects.filter(recipient_id=recipient_id, pk__gt=after).order_by('-pk')
+    events = [notification_event(row) async for row in rows[:CATCH_UP_LIMIT]]
+    # Nothing newer than the newest row (or than `after`) exists now
+    hub.set_latest_id(recipient_id, events[0]['id'] if events else after)
+    return events[::-1]
+
+
+class Subscription:
+    """One connected client's queue of events, bound to its event loop."""
+    RESYNC = {'type': 'resync'}
+
+    def __init__(self, recipient_id):
+        self.recipient_id = recipient_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+
+    def put(self, event):
+        # Called from any thread; the queue belongs to the client's loop
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            pass  # loop closed: the client is gone
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A client this far behind rereads the list instead
+            self.drain()
+            self.queue.put_nowait(self.RESYNC)
+
+    async def get(self, timeout):
+        """The next event, or None after `timeout` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def drain(self):
+        """Events already queued, without waiting."""
+        events = []
+        while not self.queue.empty():
+            events.append(self.queue.get_nowait())
+        return events
+
+
+class NotificationHub:
+    def __init__(self, broker_address=None):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+        self._latest_ids = {}
+        self.broker = BrokerLink(broker_address, self) if broker_address else None
+
+    def subscribe(self, recipient_id):
+        """Subscribe from async code; pair with unsubscribe() in a finally."""
+        subscription = Subscription(recipient_id)
+        with self._lock:
+            self._subscriptions[recipient_id].add(subscription)
+        if self.broker:
+            self.broker.connect()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.recipient_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.recipient_id]
+
+    def publish(self, recipient_id, event):
+        """Deliver to this process's clients and, through the broker, everyone else's."""
+        self.deliver(recipient_id, event)
+        if self.broker:
+            self.broker.send(recipient_id, event)
+
+    def deliver(self, recipient_id, event):
+        with self._lock:
+            self._note_latest(recipient_id, event.get('id'))
+            subscriptions = list(self._subscriptions.get(recipient_id, ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+
+    def latest_id(self, recipient_id):
+        """Newest notification id seen for the recipient, or None if unknown."""
+        if self.broker is None:
+            # Notifications written by other workers are not seen here
+            return None
+        return self._latest_ids.get(recipient_id)
+
+    def set_latest_id(self, recipient_id, notification_id):
+        with self._lock:
+            self._note_latest(recipient_id, notification_id)
+
+    def _note_latest(self, recipient_id, notification_id):
+        if notification_id is None:
+            # Written without a returned id: force the next catch-up query
+            self._latest_ids.pop(recipient_id, None)
+            return
+        if len(self._latest_ids) >= MAX_TRACKED_RECIPIENTS:
+            self._latest_ids.clear()
+        self._latest_ids[recipient_id] = max(notification_id, self._latest_ids.get(recipient_id, 0))
+
+
+# --- Cross-process broker ---
+
+def broker_address(address):
+    """A (host, port) pair for "host:port"; anything else is a Unix socket path."""
+    host, _, port = address.rpartition(':')
+    if host and port.isascii() and port.isdigit():
+        return host, int(port)
+    return address
+
+
+def broker_authkey():
+    return settings.SECRET_KEY.encode()
+
+
+class BrokerLink:
+    """A worker's connection to the notification_broker process."""
+
+    def __init__(self, address, hub):
+        self.address = broker_address(address)
+        self.hub = hub
+        self._lock = threading.Lock()
+        self._connection = None
+        self._retry_at = 0.0
+
+    def connect(self):
+        with self._lock:
+            if self._connection is not None or time.monotonic() < self._retry_at:
+                return self._connection
+            try:
+                self._connection = Client(self.address, authkey=broker_authkey())
+            except (OSError, EOFError) as exc:
+                self._retry_at = time.monotonic() + BROKER_RETRY_INTERVAL
+                logger.warning('Notification broker at %s unreachable: %s', self.address, exc)
+                return None
+            threading.Thread(
+                target=self._listen, args=(self._connection,), name='notification-broker', daemon=True
+            ).start()
+            return self._connection
+
+    def send(self, recipient_id, event):
+        connection = self.connect()
+        if connection is None:
+            return
+        message = json.dumps([recipient_id, event]).encode()
+        try:
+            with self._lock:
+                connection.send_bytes(message)
+        except OSError:
+            self._drop(connection)
+
+    def _listen(self, connection):
+        try:
+            while True:
+                recipient_id, event = json.loads(connection.recv_bytes())
+                self.hub.deliver(recipient_id, event)
+        except (EOFError, OSError):
+            self._drop(connection)
+
+    def _drop(self, connection):
+        with self._lock:
+            if self._connection is connection:
+                self._connection = None
+                self._retry_at = time.monotonic() + BROKER_RETRY_INTERVAL
+        connection.close()
+
+
+def serve_broker(address):
+    """Relay every message from one worker to all the others, until interrupted."""
+    listener = Listener(broker_address(address), authkey=broker_authkey())
+    workers = {}  # connection -> send lock
+    lock = threading.Lock()
+
+    def relay(connection):
+        try:
+            while True:
+                message = connection.recv_bytes()
+                with lock:
+                    others = [(other, send_lock) for other, send_lock in workers.items() if other is not connection]
+                for other, send_lock in others:
+                    try:
+                        with send_lock:
+                            other.send_bytes(message)
+                    except OSError:
+                        pass  # its own relay thread notices and drops it
+        except (EOFError, OSError):
+            pass
+        finally:
+            with lock:
+                workers.pop(connection, None)
+            connection.close()
+
+    try:
+        while True:
+            try:
+                connection = listener.accept()
+            except Exception as exc:
+                # Failed handshakes (wrong authkey) are logged, not fatal
+                logger.warning('Rejected broker connection: %s', exc)
+                continue
+            with lock:
+                workers[connection] = threading.Lock()
+            threading.Thread(target=relay, args=(connection,), daemon=True).start()
+    finally:
+        listener.close()
+
+
+hub = NotificationHub(BROKER_ADDRESS)
@@ -8,3 +8,11 @@ class NotificationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Notification
         fields = "__all__"
+
+
+class NotificationEventSerializer(serializers.ModelSerializer):
+    """Real-time event for a new notification; related objects as ids, so it never queries."""
+
+    class Meta:
+        model = Notification
+        fields = ['id', 'actor', 'verb', 'content_type', 'object_id', 'is_read', 'timestamp']
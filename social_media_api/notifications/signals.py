@@ -1,7 +1,10 @@
+from django.db import transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from attendees.models import Attendee
+from .counts import invalidate_unread
 from .models import Notification
+from .realtime import hub, notification_event
 
 @receiver(post_save, sender=Attendee)
 def notify_event_registration(sender, instance, created, **kwargs):
@@ -12,3 +15,14 @@ def notify_event_registration(sender, instance, created, **kwargs):
             verb="registered for your event",
             target=instance.event
         )
+
+@receiver(post_save, sender=Notification)
+def invalidate_unread_count(sender, instance, **kwargs):
+    invalidate_unread(instance.recipient_id)
+
+@receiver(post_save, sender=Notification)
+def push_notification(sender, instance, created, **kwargs):
+    # Connected clients get the new row once it is committed
+    if created:
+        event = notification_event(instance)
+        transaction.on_commit(lambda: hub.publish(instance.recipient_id, event))
@@ -0,0 +1,185 @@
+from asgiref.sync import async_to_sync, sync_to_async
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import OperationalError
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from .models import Notification
+from .pipeline import NotificationBuffer
+from .realtime import hub
+from .views import MarkAllAsReadView, NotificationListView, NotificationPollView, UnreadCountView
+
+User = get_user_model()
+
+
+class NotificationBufferTests(TestCase):
+    def setUp(self):
+        self.buffer = NotificationBuffer(worker=False)
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.fans = [
+            User.objects.create_user(username=f'fan{i}', password='testpass123') for i in range(3)
+        ]
+
+    def test_events_for_same_target_are_coalesced(self):
+        for fan in self.fans:
+            self.buffer.push(self.author, fan, 'liked your post', self.author)
+        self.assertEqual(self.buffer.flush(), 1)
+
+        notification = Notification.objects.get()
+        self.assertEqual(notification.actor, self.fans[-1])
+        self.assertEqual(notification.verb, 'and 2 others liked your post')
+
+    def test_retracted_event_is_not_written(self):
+        self.buffer.push(self.author, self.fans[0], 'liked your post', self.author)
+        self.buffer.retract(self.author, self.fans[0], 'liked your post', self.author)
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertFalse(Notification.objects.exists())
+
+    def test_later_events_merge_into_unread_row(self):
+        self.buffer.push(self.author, self.fans[0], 'liked your post', self.author)
+        self.buffer.flush()
+        self.buffer.push(self.author, self.fans[1], 'liked your post', self.author)
+        self.assertEqual(self.buffer.flush(), 1)
+
+        notification = Notification.objects.get()
+        self.assertEqual(notification.actor, self.fans[1])
+        self.assertEqual(notification.verb, 'and 1 other liked your post')
+
+        # A read row is left alone
+        Notification.objects.update(is_read=True)
+        self.buffer.push(self.author, self.fans[2], 'liked your post', self.author)
+        self.buffer.flush()
+        self.assertEqual(Notification.objects.count(), 2)
+
+    def test_retraction_after_flush_updates_written_row(self):
+        for fan in self.fans[:2]:
+            self.buffer.push(self.author, fan, 'liked your post', self.author)
+        self.buffer.flush()
+
+        self.buffer.retract(self.author, self.fans[1], 'liked your post', self.author)
+        self.assertEqual(self.buffer.flush(), 0)
+        notification = Notification.objects.get()
+        self.assertEqual((notification.actor, notification.verb), (self.fans[0], 'liked your post'))
+
+        # Liked again and undone again before the next flush
+        self.buffer.retract(self.author, self.fans[0], 'liked your post', self.author)
+        self.buffer.push(self.author, self.fans[0], 'liked your post', self.author)
+        self.buffer.retract(self.author, self.fans[0], 'liked your post', self.author)
+        self.buffer.flush()
+        self.assertFalse(Notification.objects.exists())
+
+    def test_failed_write_is_retried(self):
+        self.buffer.push(self.author, self.fans[0], 'liked your post', self.author)
+        with mock.patch.object(Notification.objects, 'bulk_create', side_effect=OperationalError), \
+                self.assertRaises(OperationalError):
+            self.buffer.flush()
+        self.buffer.push(self.author, self.fans[1], 'liked your post', self.author)
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(Notification.objects.get().verb, 'and 1 other liked your post')
+
+    def test_flushed_notifications_reach_connected_clients(self):
+        async def receive():
+            subscription = hub.subscribe(self.author.pk)
+            try:
+                await sync_to_async(self.buffer.flush)()
+                return await subscription.get(timeout=1)
+            finally:
+                hub.unsubscribe(subscription)
+
+        self.buffer.push(self.author, self.fans[0], 'liked your post', self.author)
+        event = async_to_sync(receive)()
+        self.assertEqual(event['id'], Notification.objects.get().pk)
+        self.assertEqual(event['actor'], self.fans[0].pk)
+
+
+class NotificationFlushFailureTests(TransactionTestCase):
+    def test_rejected_row_does_not_drop_the_batch(self):
+        buffer = NotificationBuffer(worker=False)
+        author, fan, gone = (
+            User.objects.create_user(username=name, password='testpass123') for name in ('author', 'fan', 'gone')
+        )
+        buffer.push(author, fan, 'liked your post', author)
+        buffer.push(gone, fan, 'liked your post', author)
+        gone.delete()
+        with self.assertLogs('notifications.pipeline', 'ERROR'):
+            self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(Notification.objects.get().recipient, author)
+
+
+class NotificationViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(username='reader', password='testpass123')
+        self.other = User.objects.create_user(username='other', password='testpass123')
+        self.mine = [
+            Notification.objects.create(recipient=self.user, actor=self.other, verb=f'liked post {i}')
+            for i in range(3)
+        ]
+        Notification.objects.create(recipient=self.other, actor=self.user, verb='followed you')
+
+    def call(self, view, method='get', data=None, **params):
+        request = getattr(self.factory, method)('/', data if method == 'post' else params, format='json')
+        force_authenticate(request, self.user)
+        return view.as_view()(request)
+
+    def test_list_is_scoped_to_requester_and_paged(self):
+        first = self.call(NotificationListView, page_size=2)
+        self.assertEqual([item['id'] for item in first.data['results']], [self.mine[2].pk, self.mine[1].pk])
+        self.assertIsNotNone(first.data['next'])
+        # One query for the page and its actors, whatever the page size
+        with self.assertNumQueries(1):
+            response = self.call(NotificationListView, page_size=10)
+        self.assertEqual([item['id'] for item in response.data['results']], [n.pk for n in reversed(self.mine)])
+
+    def test_unread_count_is_cached_until_marked_read(self):
+        self.assertEqual(self.call(UnreadCountView).data, {'unread': 3})
+        with self.assertNumQueries(0):
+            self.assertEqual(self.call(UnreadCountView).data, {'unread': 3})
+        self.assertEqual(self.call(MarkAllAsReadView, 'post', {}).data, {'updated': 3})
+        self.assertEqual(self.call(UnreadCountView).data, {'unread': 0})
+        self.assertFalse(Notification.objects.get(recipient=self.other).is_read)
+
+    def test_mark_all_read_stops_at_before(self):
+        Notification.objects.filter(pk=self.mine[2].pk).update(timestamp=timezone.now() + timedelta(hours=1))
+        before = (timezone.now() + timedelta(minutes=1)).isoformat()
+        self.assertEqual(self.call(MarkAllAsReadView, 'post', {'before': before}).data, {'updated': 2})
+        self.assertEqual(list(Notification.objects.filter(recipient=self.user, is_read=False)), [self.mine[2]])
+
+    def test_mark_all_read_rejects_invalid_before(self):
+        for before in ['yesterday', '2024-02-30T00:00:00']:
+            with self.subTest(before=before):
+                self.assertEqual(self.call(MarkAllAsReadView, 'post', {'before': before}).status_code, 400)
+        self.assertEqual(Notification.objects.filter(is_read=True).count(), 0)
+
+
+class NotificationPollTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader', password='testpass123')
+        self.token = Token.objects.create(user=self.user)
+
+    async def poll(self, **params):
+        request = AsyncRequestFactory().get('/', params, headers={'Authorization': f'Token {self.token.key}'})
+        return await NotificationPollView.as_view()(request)
+
+    async def test_non_finite_timeouts_are_rejected(self):
+        for timeout in ['nan', 'inf', '-inf', 'soon']:
+            with self.subTest(timeout=timeout):
+                self.assertEqual((await self.poll(timeout=timeout)).status_code, 400)
+
+    async def test_negative_timeout_answers_at_once(self):
+        response = await self.poll(timeout='-5')
+        self.assertEqual(response.status_code, 200)
+        self.assertJSONEqual(response.content, {'results': [], 'last_id': None})
+
+    async def test_non_ascii_digits_are_ignored(self):
+        response = await self.poll(after='²', timeout='0')
+        self.assertEqual(response.status_code, 200)
+        self.assertJSONEqual(response.content, {'results': [], 'last_id': None})
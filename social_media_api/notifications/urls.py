@@ -1,7 +1,15 @@
 from django.urls import path
-from .views import NotificationListView, MarkAsReadView
+from .views import (
+    AsyncNotificationListView, NotificationListView, MarkAsReadView, MarkAllAsReadView, UnreadCountView,
+    NotificationPollView, NotificationStreamView,
+)
 
 urlpatterns = [
     path('', NotificationListView.as_view(), name='notification-list'),
+    path('async/', AsyncNotificationListView.as_view(), name='notification-list-async'),
+    path('stream/', NotificationStreamView.as_view(), name='notification-stream'),
+    path('poll/', NotificationPollView.as_view(), name='notification-poll'),
+    path('unread-count/', UnreadCountView.as_view(), name='notification-unread-count'),
+    path('read/', MarkAllAsReadView.as_view(), name='notification-mark-all-read'),
     path('<int:pk>/read/', MarkAsReadView.as_view(), name='notification-mark-read'),
 ]
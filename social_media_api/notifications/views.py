@@ -1,10 +1,176 @@
-from rest_framework import generics, permissions
+import math
+
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import ParseError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from posts.async_api import AsyncAPIView, AsyncListAPIView
+from posts.pagination import KeysetPagination
+from .counts import invalidate_unread, unread_count
 from .models import Notification
+from .realtime import KEEPALIVE_INTERVAL, POLL_TIMEOUT, hub, missed_events, sse_message
 from .serializers import NotificationSerializer
 
+
+class NotificationPagination(KeysetPagination):
+    # Newest first; matches the (recipient, timestamp, id) index on Notification
+    ordering = ('-timestamp', '-id')
+
+
+def notifications_for(user):
+    # Only the user's notifications. Actors are joined, and targets are
+    # prefetched with one query per content type instead of per row.
+    return (
+        Notification.objects.filter(recipient=user)
+        .select_related('actor')
+        .prefetch_related('target')
+    )
+
+
 class NotificationListView(generics.ListAPIView):
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = NotificationPagination
 
     def get_queryset(self):
-        return Notification.objects
+        return notifications_for(self.request.user)
+
+
+class AsyncNotificationListView(AsyncListAPIView):
+    """NotificationListView for ASGI, read through the async ORM."""
+    serializer_class = NotificationSerializer
+    pagination_class = NotificationPagination
+
+    async def aget_queryset(self):
+        return notifications_for(self.request.user)
+
+
+class NotificationStreamView(AsyncAPIView):
+    """
+    Server-sent events: a `notification` event for each new notification
+    of the requester. A reconnecting client's Last-Event-ID header first
+    brings the ones it missed; a `resync` event means it fell too far
+    behind and should reload the list. Serve under ASGI: under WSGI each
+    open stream holds a worker thread.
+    """
+
+    async def get(self, request):
+        subscription = hub.subscribe(request.user.pk)
+        try:
+            missed = []
+            last_id = request.headers.get('Last-Event-ID', '')
+            # isdigit() alone accepts '²', which int() rejects
+            if last_id.isascii() and last_id.isdigit():
+                missed = await missed_events(request.user.pk, int(last_id))
+        except BaseException:
+            hub.unsubscribe(subscription)
+            raise
+        response = StreamingHttpResponse(self.stream(subscription, missed), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Stop nginx from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def stream(self, subscription, missed):
+        try:
+            sent_id = 0
+            for event in missed:
+                sent_id = event['id']
+                yield sse_message(event)
+            while True:
+                event = await subscription.get(KEEPALIVE_INTERVAL)
+                if event is None:
+                    yield ': keep-alive\n\n'
+                # Skip events already sent as missed ones
+                elif event.get('id') is None or event['id'] > sent_id:
+                    yield sse_message(event)
+        finally:
+            hub.unsubscribe(subscription)
+
+
+class NotificationPollView(AsyncAPIView):
+    """
+    Long-poll: GET ?after=<id> answers as soon as the requester has
+    notifications newer than that id, or with an empty list after
+    ?timeout= seconds (0 to POLL_TIMEOUT). Without `after` it waits for
+    the next one. Pass the returned `last_id` as `after` to the next poll.
+    """
+
+    async def get(self, request):
+        after = request.query_params.get('after', '')
+        after = int(after) if after.isascii() and after.isdigit() else None
+        try:
+            timeout = float(request.query_params.get('timeout', POLL_TIMEOUT))
+        except ValueError:
+            timeout = math.nan
+        if not math.isfinite(timeout):
+            raise ParseError('Invalid timeout')
+        timeout = min(max(timeout, 0), POLL_TIMEOUT)
+
+        subscription = hub.subscribe(request.user.pk)
+        try:
+            events = await missed_events(request.user.pk, after) if after is not None else []
+            if not events:
+                first = await subscription.get(timeout)
+                # Whatever else arrived meanwhile goes in the same answer
+                received = [first, *subscription.drain()] if first is not None else []
+                events = [
+                    event for event in received
+                    if event.get('type') != 'resync'
+                    and (after is None or event.get('id') is None or event['id'] > after)
+                ]
+        finally:
+            hub.unsubscribe(subscription)
+
+        ids = [event['id'] for event in events if event.get('id') is not None]
+        return JsonResponse({'results': events, 'last_id': max(ids, default=after)})
+
+
+class UnreadCountView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        return Response({'unread': unread_count(request.user)})
+
+
+class MarkAsReadView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, pk):
+        updated = Notification.objects.filter(
+            pk=pk, recipient=request.user, is_read=False
+        ).update(is_read=True)
+        if updated:
+            invalidate_unread(request.user.pk)
+        return Response({'updated': updated}, status=status.HTTP_200_OK)
+
+
+class MarkAllAsReadView(APIView):
+    """
+    POST {"before": "<ISO timestamp>"} marks every unread notification up to
+    that time as read with a single UPDATE. Defaults to now.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        before = timezone.now()
+        if request.data.get('before'):
+            try:
+                before = parse_datetime(str(request.data['before']))
+            except ValueError:
+                # Well formed but impossible, e.g. 2024-02-30
+                before = None
+            if before is None:
+                return Response({'detail': 'Invalid "before" timestamp.'}, status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(before):
+                before = timezone.make_aware(before)
+
+        updated = Notification.objects.filter(
+            recipient=request.user, is_read=False, timestamp__lte=before
+        ).update(is_read=True)
+        if updated:
+            invalidate_unread(request.user.pk)
+        return Response({'updated': updated}, status=status.HTTP_200_OK)
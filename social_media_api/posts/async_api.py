@@ -0,0 +1,71 @@
+# posts/async_api.py
+"""
+Async-native API views for ASGI deployments.
+
+DRF's views are synchronous: under ASGI each request to one is handed to
+Django's single thread-sensitive executor, so requests waiting on the
+database queue up behind each other. AsyncAPIView is a plain Django View
+with coroutine handlers that keeps what the API relies on from DRF -
+token authentication (awaited, see accounts/authentication.py), DRF
+exceptions turned into their JSON error responses, and serializers for
+the body - while every query goes through the async ORM.
+
+Serializers used here must only read data that is already loaded; a
+lazy relation access raises SynchronousOnlyOperation. Every middleware
+must be async-capable too, or Django runs the view in a thread anyway.
+"""
+from django.http import Http404, JsonResponse
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.request import Request
+
+from accounts.authentication import CachedTokenAuthentication
+
+
+class AsyncAPIView(View):
+    """Token-authenticated view; anonymous requests get a 401."""
+    authentication = CachedTokenAuthentication()
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        # Token authentication needs no CSRF protection, as in DRF's APIView
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            credentials = await self.authentication.aauthenticate(request)
+            if credentials is None:
+                raise exceptions.NotAuthenticated()
+            # DRF's Request gives handlers query_params and data; user and
+            # auth are set up front so it never authenticates synchronously
+            self.request = Request(request)
+            self.request.user, self.request.auth = credentials
+            return await super().dispatch(self.request, *args, **kwargs)
+        except Http404:
+            return JsonResponse({'detail': 'Not found.'}, status=404)
+        except exceptions.APIException as exc:
+            response = JsonResponse({'detail': exc.detail}, status=exc.status_code)
+            if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+                response['WWW-Authenticate'] = self.authentication.authenticate_header(request)
+            return response
+
+
+class AsyncListAPIView(AsyncAPIView):
+    """ListAPIView counterpart: one keyset-paginated page per GET."""
+    serializer_class = None
+    pagination_class = None
+
+    async def aget_queryset(self):
+        raise NotImplementedError
+
+    async def apaginate(self, paginator, request):
+        """The current page's objects."""
+        return await paginator.apaginate_queryset(await self.aget_queryset(), request, self)
+
+    async def get(self, request, *args, **kwargs):
+        paginator = self.pagination_class()
+        page = await self.apaginate(paginator, request)
+        serializer = self.serializer_class(page, many=True, context={'request': request, 'view': self})
+        return JsonResponse(paginator.get_paginated_data(serializer.data))
@@ -0,0 +1,74 @@
+# posts/counters.py
+"""
+Denormalized counters on User and Post.
+
+Write paths bump the counter columns with F() expressions in the same
+transaction as the row they count, so reads never aggregate. The
+reconcile_* functions recompute every counter in one UPDATE each and are
+run periodically by the reconcile_counters management command to repair
+any drift.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Post, Comment, Like
+
+User = get_user_model()
+Follow = User.followers.through
+
+
+def bump(model, pk, field, delta=1):
+    """Atomically add delta to model.field for the row with this pk."""
+    model.objects.filter(pk=pk).update(**{field: F(field) + delta})
+
+
+def follow_changed(follower, followee, delta):
+    """Keep both sides of a follow edge in sync after it is added (+1) or removed (-1)."""
+    bump(User, followee.pk, 'followers_count', delta)
+    bump(User, follower.pk, 'following_count', delta)
+
+
+def follows_changed(follower, followee_ids, delta):
+    """follow_changed() for many followees at once (bulk follow and unfollow)."""
+    # Followees are locked in primary key order, so concurrent bulk follows
+    # of the same (e.g. suggested) accounts cannot deadlock
+    locked = User.objects.filter(pk__in=followee_ids).order_by('pk').select_for_update()
+    User.objects.filter(pk__in=list(locked.values_list('pk', flat=True))).update(
+        followers_count=F('followers_count') + delta,
+    )
+    bump(User, follower.pk, 'following_count', delta * len(followee_ids))
+
+
+def _count(model, fk, **filters):
+    counts = (
+        model.objects.filter(**{fk: OuterRef('pk')}, **filters)
+        .order_by()
+        .values(fk)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def reconcile_post_counters(post_model=Post, like_model=Like, comment_model=Comment):
+    """
+    Recompute likes_count and comments_count for every post.
+
+    Migrations pass their historical models; like_model is None when the
+    migration state has no likes table yet, leaving likes_count alone.
+    """
+    counts = {'comments_count': _count(comment_model, 'post')}
+    if like_model is not None:
+        counts['likes_count'] = _count(like_model, 'post')
+    return post_model.objects.update(**counts)
+
+
+def reconcile_user_counters(user_model=User):
+    """Recompute followers_count and following_count for every user."""
+    # Follow.from_user is the followed user, Follow.to_user the follower
+    follow = user_model.followers.through
+    return user_model.objects.update(
+        followers_count=_count(follow, 'from_user'),
+        following_count=_count(follow, 'to_user'),
+    )
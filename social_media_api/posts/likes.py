@@ -0,0 +1,110 @@
+# posts/likes.py
+"""
+Like write paths shared by PostLikeView and AsyncPostLikeView.
+
+A toggle is a single transaction of two statements, with no reads
+first: INSERT ... ON CONFLICT DO NOTHING (or the DELETE of the existing
+like when the insert hits the unique (post, user) constraint), then the
+likes_count UPDATE, which also returns the author to notify and doubles
+as the check that the post exists. Concurrent likes of one hot post
+therefore only queue on that post's row, for the length of the UPDATE
+and commit: they cannot deadlock (every transaction locks its own like
+row, then the post) and cannot lose counts (the UPDATE adds in SQL).
+
+Async views call these through sync_to_async rather than awaiting the
+ORM statement by statement, since the statements share a transaction.
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models.constants import OnConflict
+from django.utils import timezone
+
+from .counters import bump
+from .models import Like, Post
+
+User = get_user_model()
+
+LIKE_VERB = 'liked your post'
+
+
+def _insert_like(post_id, user_id):
+    """Add the like unless it exists. True if a row was inserted."""
+    ops = connection.ops
+    fields = [Like._meta.get_field(name) for name in ('post', 'user', 'created_at')]
+    columns = ', '.join(ops.quote_name(field.column) for field in fields)
+    sql = (
+        f'{ops.insert_statement(on_conflict=OnConflict.IGNORE)} {ops.quote_name(Like._meta.db_table)} '
+        f'({columns}) VALUES (%s, %s, %s) {ops.on_conflict_suffix_sql(fields, OnConflict.IGNORE, None, None)}'
+    )
+    created_at = fields[2].get_db_prep_save(timezone.now(), connection)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [post_id, user_id, created_at])
+        return cursor.rowcount == 1
+
+
+def _bump_likes(post_id, delta):
+    """Add delta to the post's likes_count. Returns its author id, or None if there is no such post."""
+    if connection.vendor == 'postgresql' or (
+        connection.vendor == 'sqlite' and connection.features.can_return_columns_from_insert
+    ):
+        ops = connection.ops
+        count = ops.quote_name(Post._meta.get_field('likes_count').column)
+        author = ops.quote_name(Post._meta.get_field('author').column)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {ops.quote_name(Post._meta.db_table)} SET {count} = {count} + %s '
+                f'WHERE {ops.quote_name(Post._meta.pk.column)} = %s RETURNING {author}',
+                [delta, post_id],
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+    # No UPDATE ... RETURNING (MySQL/MariaDB): one more query
+    bump(Post, post_id, 'likes_count', delta)
+    return Post.objects.filter(pk=post_id).values_list('author_id', flat=True).first()
+
+
+def toggle_like(post_id, user):
+    """
+    Like the post, or remove user's existing like, and queue or retract
+    the author's notification. Returns True if a like was added; raises
+    Post.DoesNotExist for an unknown post.
+    """
+    from notifications import pipeline
+
+    with transaction.atomic():
+        liked = _insert_like(post_id, user.pk)
+        # A concurrent unlike may already have removed the existing like
+        changed = liked or Like.objects.filter(post_id=post_id, user=user).delete()[0]
+        author_id = _bump_likes(post_id, 1 if liked else -1) if changed else None
+        if liked and author_id is None:
+            # Rolls back the insert, whose foreign key check is deferred
+            raise Post.DoesNotExist
+
+    # Self-actions are ignored by the pipeline
+    if author_id is not None:
+        author, post = User(pk=author_id), Post(pk=post_id)
+        if liked:
+            pipeline.notify(author, user, LIKE_VERB, post)
+        else:
+            pipeline.retract(author, user, LIKE_VERB, post)
+    return liked
+
+
+def remove_like(post_id, user):
+    """
+    Remove user's like of the post. Returns False if there was none;
+    raises Post.DoesNotExist for an unknown post.
+    """
+    from notifications import pipeline
+
+    with transaction.atomic():
+        deleted, _ = Like.objects.filter(post_id=post_id, user=user).delete()
+        author_id = _bump_likes(post_id, -1) if deleted else None
+    if not deleted:
+        # Only the failure path pays for the existence check
+        if not Post.objects.filter(pk=post_id).exists():
+            raise Post.DoesNotExist
+        return False
+    if author_id is not None:
+        pipeline.retract(User(pk=author_id), user, LIKE_VERB, Post(pk=post_id))
+    return True
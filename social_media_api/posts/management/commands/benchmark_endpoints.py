@@ -0,0 +1,274 @@
+# posts/management/commands/benchmark_endpoints.py
+import json
+import math
+import random
+import subprocess
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.conf import settings
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from notifications.models import Notification
+from notifications.views import NotificationListView
+from posts import timeline
+from posts.counters import reconcile_post_counters, reconcile_user_counters
+from posts.models import Post
+from posts.search import post_index
+from posts.views import FeedView, PostViewSet
+
+User = get_user_model()
+Follow = User.followers.through
+
+WORDS = (
+    'django python api feed timeline cache index query release update '
+    'weekly review performance tuning async testing security deploy'
+).split()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+
+@contextmanager
+def counting_queries():
+    # Unlike CaptureQueriesContext, not capped by the 9000-entry query log
+    counter = {'queries': 0}
+
+    def count(execute, sql, params, many, context):
+        counter['queries'] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        yield counter
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """Endpoints that issue more queries, or got slower at p99, than the baseline."""
+    regressions = []
+    for name, current in results['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(name)
+        if previous is None or 'error' in previous:
+            continue
+        if 'error' in current:
+            regressions.append(f"{name}: {current['error']}")
+            continue
+        if current['queries'] > previous['queries']:
+            regressions.append(f"{name}: {previous['queries']} -> {current['queries']} queries")
+        if current['p99_ms'] > previous['p99_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {previous['p99_ms']:.2f} -> {current['p99_ms']:.2f} ms")
+    return regressions
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed synthetic users, a power-law follow graph, posts and notifications '
+        '(rolled back afterwards), then report p50/p99 latency and query counts '
+        'of the hot API endpoints as JSON. '
+        'Production-like scale: --users 100000 --posts 1000000.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--follows-per-user', type=int, default=20, help='Mean out-degree of the follow graph')
+        parser.add_argument('--notifications', type=int, default=500, help='Per benchmarked reader')
+        parser.add_argument('--readers', type=int, default=10, help='Users whose requests are timed')
+        parser.add_argument('--requests', type=int, default=50, help='Requests per endpoint')
+        parser.add_argument('--output', help='Write the JSON results to this file instead of stdout')
+        parser.add_argument('--baseline', help='Fail if results regress against this earlier JSON output')
+        parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed p99 slowdown vs the baseline')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--auth', choices=['force', 'token'], default='force',
+            help='"token" sends real Authorization headers, so authentication is measured too',
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        with transaction.atomic():
+            readers = self._seed(options)
+            endpoints = self._measure(readers, options['requests'], options['auth'])
+            transaction.set_rollback(True)
+
+        results = {
+            'project': 'social_media_api',
+            'commit': git_commit(),
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'scale': {
+                key: options[key]
+                for key in ('users', 'posts', 'follows_per_user', 'notifications', 'readers', 'requests', 'auth')
+            },
+            'endpoints': endpoints,
+        }
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+        if options['baseline']:
+            with open(options['baseline']) as fh:
+                regressions = compare(results, json.load(fh), options['tolerance'])
+            if regressions:
+                raise CommandError('Regressions against baseline:\n  ' + '\n  '.join(regressions))
+            self.stderr.write(self.style.SUCCESS('No regressions against baseline'))
+
+    # --- Seeding ---
+
+    def _seed(self, options):
+        user_count = options['users']
+        self.stderr.write(f'Seeding {user_count} users...')
+        User.objects.bulk_create(
+            [User(username=f'bench-{i}', password='!') for i in range(user_count)],
+            batch_size=5000,
+        )
+        user_ids = list(User.objects.filter(username__startswith='bench-').order_by('pk').values_list('pk', flat=True))
+
+        self.stderr.write('Seeding follow graph...')
+        self._seed_follows(user_ids, options['follows_per_user'])
+
+        self.stderr.write(f"Seeding {options['posts']} posts...")
+        self._seed_posts(user_ids, options['posts'])
+        reconcile_user_counters()
+        reconcile_post_counters()
+
+        # Readers are the most-following users, like the heaviest feed readers
+        readers = list(User.objects.filter(pk__in=user_ids).order_by('-following_count')[:options['readers']])
+        for reader in readers:
+            for author in reader.following.all():
+                timeline.backfill_author(reader, author)
+        self._seed_notifications(readers, user_ids, options['notifications'])
+        # The background sync cannot see the uncommitted seed, so load the
+        # search index in this transaction
+        post_index.sync()
+        return readers
+
+    def _seed_follows(self, user_ids, mean_degree):
+        # Popularity follows a Zipf law: the k-th user is followed ~1/k as often
+        weights = [1 / rank for rank in range(1, len(user_ids) + 1)]
+        cumulative, total = [], 0
+        for weight in weights:
+            total += weight
+            cumulative.append(total)
+
+        batch = []
+        for follower_id in user_ids:
+            # Out-degree is heavy-tailed too (Pareto with the requested mean)
+            degree = min(int(self.rng.paretovariate(2) * mean_degree / 2), len(user_ids) - 1)
+            followees = set(self.rng.choices(user_ids, cum_weights=cumulative, k=degree))
+            followees.discard(follower_id)
+            batch.extend(Follow(from_user_id=followee_id, to_user_id=follower_id) for followee_id in followees)
+            if len(batch) >= 10000:
+                Follow.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        Follow.objects.bulk_create(batch, ignore_conflicts=True)
+
+    def _seed_posts(self, user_ids, count):
+        batch = []
+        for i in range(count):
+            batch.append(Post(
+                author_id=self.rng.choice(user_ids),
+                title=' '.join(self.rng.choices(WORDS, k=4)),
+                content=' '.join(self.rng.choices(WORDS, k=60)),
+            ))
+            if len(batch) == 5000:
+                Post.objects.bulk_create(batch)
+                batch = []
+        Post.objects.bulk_create(batch)
+
+    def _seed_notifications(self, readers, user_ids, per_reader):
+        post_type = ContentType.objects.get_for_model(Post)
+        post_ids = list(Post.objects.order_by('-pk').values_list('pk', flat=True)[:1000])
+        rows = [
+            Notification(
+                recipient=reader,
+                actor_id=self.rng.choice(user_ids),
+                verb=self.rng.choice(['liked your post', 'commented on your post', 'started following you']),
+                content_type=post_type,
+                object_id=self.rng.choice(post_ids),
+            )
+            for reader in readers
+            for _ in range(per_reader)
+        ]
+        Notification.objects.bulk_create(rows, batch_size=5000)
+
+    # --- Measuring ---
+
+    def _measure(self, readers, requests, auth):
+        factory = APIRequestFactory()
+        tokens = None
+        if auth == 'token':
+            tokens = {reader.pk: Token.objects.get_or_create(user=reader)[0].key for reader in readers}
+        endpoints = {
+            'FeedView': (FeedView.as_view(), '/posts/feed/', {}),
+            'PostViewSet.list': (PostViewSet.as_view({'get': 'list'}), '/posts/posts/', {}),
+            'PostViewSet.list?search': (PostViewSet.as_view({'get': 'list'}), '/posts/posts/', {'search': 'performance tuning'}),
+            'NotificationListView': (NotificationListView.as_view(), '/notifications/', {}),
+        }
+        results = {}
+        # Requests are built by the test factory, whose host is "testserver"
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for name, (view, path, params) in endpoints.items():
+                try:
+                    results[name] = self._time_endpoint(factory, view, path, params, readers, requests, tokens)
+                except Exception as exc:
+                    # Keep benchmarking the other endpoints; a broken one is reported
+                    results[name] = {'error': f'{type(exc).__name__}: {exc}'}
+                    self.stderr.write(self.style.ERROR(f"{name}: {results[name]['error']}"))
+                    continue
+                self.stderr.write(
+                    f"{name}: p50 {results[name]['p50_ms']} ms, p99 {results[name]['p99_ms']} ms, "
+                    f"{results[name]['queries']} queries, {results[name]['requests_per_s']} req/s"
+                )
+        return results
+
+    def _request(self, factory, path, params, reader, tokens):
+        if tokens is None:
+            request = factory.get(path, params)
+            force_authenticate(request, user=reader)
+            return request
+        return factory.get(path, params, HTTP_AUTHORIZATION=f'Token {tokens[reader.pk]}')
+
+    def _time_endpoint(self, factory, view, path, params, readers, requests, tokens=None):
+        if tokens is not None:
+            # One untimed request per reader, as after a login, so the
+            # results show the steady state of the token cache
+            for reader in readers:
+                view(self._request(factory, path, params, reader, tokens)).render()
+        timings, queries = [], 0
+        for i in range(requests):
+            request = self._request(factory, path, params, readers[i % len(readers)], tokens)
+            with counting_queries() as counter:
+                start = time.perf_counter()
+                response = view(request)
+                response.render()
+                timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f'HTTP {response.status_code}')
+            queries = max(queries, counter['queries'])
+        return {
+            'requests': requests,
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+            'mean_ms': round(sum(timings) / len(timings), 3),
+            'requests_per_s': round(len(timings) / (sum(timings) / 1000), 1),
+            'queries': queries,
+        }
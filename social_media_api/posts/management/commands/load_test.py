@@ -0,0 +1,273 @@
+# posts/management/commands/load_test.py
+import asyncio
+import io
+import json
+import random
+import threading
+import time
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.asgi import get_asgi_application
+from django.core.management.base import CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+from django.urls import include, path
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from notifications.views import AsyncNotificationListView, NotificationListView
+from posts.models import Post
+from posts.views import AsyncFeedView, AsyncPostLikeView, FeedView, PostLikeView
+
+from .benchmark_endpoints import Command as BenchmarkCommand, git_commit, percentile
+
+User = get_user_model()
+
+# The endpoints under test, routed the same way as in the project's URLconf
+urlpatterns = [
+    path('feed/', FeedView.as_view()),
+    path('feed/async/', AsyncFeedView.as_view()),
+    path('<int:pk>/like/', PostLikeView.as_view()),
+    path('<int:pk>/like/async/', AsyncPostLikeView.as_view()),
+    path('notifications/', include([
+        path('', NotificationListView.as_view()),
+        path('async/', AsyncNotificationListView.as_view()),
+    ])),
+]
+
+# name: (method, sync view path, async view path); {post} is a random post id
+ENDPOINTS = {
+    'feed': ('get', '/feed/', '/feed/async/'),
+    'notifications': ('get', '/notifications/', '/notifications/async/'),
+    'like': ('post', '/{post}/like/', '/{post}/like/async/'),
+}
+
+# mode: (server interface, which view of each endpoint)
+MODES = {
+    'wsgi': ('wsgi', 'sync'),
+    'asgi': ('asgi', 'async'),
+    # DRF views under ASGI, to show what the async views buy
+    'asgi-sync-views': ('asgi', 'sync'),
+}
+
+
+def wsgi_request(app, method, url, authorization):
+    """Call a WSGI application the way a WSGI server would; returns the status."""
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': url,
+        'HTTP_HOST': 'testserver',
+        'HTTP_AUTHORIZATION': authorization,
+        'CONTENT_LENGTH': '0',
+        'wsgi.input': io.BytesIO(),
+    }
+    setup_testing_defaults(environ)
+    statuses = []
+    body = app(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    try:
+        for _ in body:
+            pass
+    finally:
+        body.close()
+    return int(statuses[0].split()[0])
+
+
+async def asgi_request(app, method, url, authorization):
+    """Call an ASGI application the way an ASGI server would; returns the status."""
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': url,
+        'raw_path': url.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(b'host', b'testserver'), (b'authorization', authorization.encode())],
+        'client': ('127.0.0.1', 0),
+        'server': ('testserver', 80),
+    }
+    messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+    statuses = []
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        # The client stays connected until the response is sent
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            statuses.append(message['status'])
+
+    await app(scope, receive, send)
+    return statuses[0]
+
+
+def add_db_latency(milliseconds):
+    """Make every query wait as if the database were this far away."""
+    delay = milliseconds / 1000
+
+    def wait(execute, sql, params, many, context):
+        time.sleep(delay)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        # First in the list: execute_wrapper() blocks pop the last entry
+        if wait not in connection.execute_wrappers:
+            connection.execute_wrappers.insert(0, wait)
+
+    connection_created.connect(install, weak=False)
+
+
+class Command(BenchmarkCommand):
+    help = (
+        'Compare sync WSGI and async ASGI throughput of the feed, like and '
+        'notification endpoints at high concurrency. Requests go through '
+        "the project's WSGI and ASGI applications in-process, called as a "
+        'server would (middleware, URL routing and token authentication '
+        'included): WSGI from --threads threads like a threaded worker, ASGI '
+        'with --concurrency requests in flight on one event loop. Seeds the same data as benchmark_endpoints, '
+        'but commits it (worker threads need to see it) and deletes it at the end. '
+        'Use a PostgreSQL database; SQLite serializes writers.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--follows-per-user', type=int, default=20, help='Mean out-degree of the follow graph')
+        parser.add_argument('--notifications', type=int, default=500, help='Per reader')
+        parser.add_argument('--readers', type=int, default=50, help='Users sending the requests')
+        parser.add_argument('--requests', type=int, default=1000, help='Requests per endpoint and mode')
+        parser.add_argument('--concurrency', type=int, default=100, help='ASGI requests in flight')
+        parser.add_argument('--threads', type=int, default=8, help='WSGI worker threads')
+        parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+        parser.add_argument(
+            '--db-latency', type=float, default=0,
+            help='Milliseconds added to every query, to emulate a database across the network',
+        )
+        parser.add_argument('--output', help='Write the JSON results to this file instead of stdout')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if User.objects.filter(username__startswith='bench-').exists():
+            raise CommandError('bench-* users already exist; remove them or use another database')
+        self.rng = random.Random(options['seed'])
+        try:
+            readers = self._seed(options)
+            tokens = [Token.objects.get_or_create(user=reader)[0].key for reader in readers]
+            post_ids = list(Post.objects.order_by('-pk').values_list('pk', flat=True)[:1000])
+            # One request plan per endpoint, replayed identically in every mode
+            plans = {
+                name: [
+                    (self.rng.choice(tokens), self.rng.choice(post_ids))
+                    for _ in range(options['requests'])
+                ]
+                for name in ENDPOINTS
+            }
+            if options['db_latency']:
+                add_db_latency(options['db_latency'])
+            with override_settings(ROOT_URLCONF=__name__, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                endpoints = self._run(plans, options)
+        finally:
+            self.stderr.write('Removing seeded data...')
+            User.objects.filter(username__startswith='bench-').delete()
+
+        results = {
+            'project': 'social_media_api',
+            'commit': git_commit(),
+            'created_at': timezone.now().isoformat(),
+            'database': connections['default'].vendor,
+            'scale': {
+                key: options[key]
+                for key in ('users', 'posts', 'follows_per_user', 'requests', 'concurrency', 'threads', 'db_latency')
+            },
+            'endpoints': endpoints,
+        }
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+    def _run(self, plans, options):
+        wsgi_app, asgi_app = get_wsgi_application(), get_asgi_application()
+        results = {}
+        for name, (method, sync_path, async_path) in ENDPOINTS.items():
+            results[name] = {}
+            for mode in options['modes']:
+                interface, views = MODES[mode]
+                path_template = sync_path if views == 'sync' else async_path
+                requests = [
+                    (method.upper(), path_template.format(post=post_id), f'Token {token}')
+                    for token, post_id in plans[name]
+                ]
+                if interface == 'wsgi':
+                    result = self._run_wsgi(wsgi_app, requests, options['threads'])
+                else:
+                    result = asyncio.run(self._run_asgi(asgi_app, requests, options['concurrency']))
+                results[name][mode] = result
+                self.stderr.write(
+                    f"{name} [{mode}]: {result['requests_per_s']} req/s, "
+                    f"p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms, {result['errors']} errors"
+                )
+        return results
+
+    def _run_wsgi(self, app, requests, threads):
+        timings, errors = [], []
+        pending = iter(requests)
+        lock = threading.Lock()
+
+        def worker():
+            while True:
+                with lock:
+                    request = next(pending, None)
+                if request is None:
+                    break
+                start = time.perf_counter()
+                status = wsgi_request(app, *request)
+                with lock:
+                    timings.append((time.perf_counter() - start) * 1000)
+                    if status >= 400:
+                        errors.append(status)
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        start = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return self._summary(timings, errors, time.perf_counter() - start)
+
+    async def _run_asgi(self, app, requests, concurrency):
+        timings, errors = [], []
+        slots = asyncio.Semaphore(concurrency)
+
+        async def send(request):
+            async with slots:
+                start = time.perf_counter()
+                status = await asgi_request(app, *request)
+                timings.append((time.perf_counter() - start) * 1000)
+                if status >= 400:
+                    errors.append(status)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(send(request) for request in requests))
+        return self._summary(timings, errors, time.perf_counter() - start)
+
+    def _summary(self, timings, errors, elapsed):
+        return {
+            'requests': len(timings),
+            'errors': len(errors),
+            'error_statuses': sorted(set(errors)),
+            'seconds': round(elapsed, 3),
+            'requests_per_s': round(len(timings) / elapsed, 1),
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+        }
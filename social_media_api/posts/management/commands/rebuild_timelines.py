@@ -0,0 +1,30 @@
+# posts/management/commands/rebuild_timelines.py
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from posts.models import TimelineEntry
+from posts.timeline import backfill_author, trim_timelines
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the materialized home timelines from the follow graph'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Only rebuild the timeline of this username')
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options['user']:
+            users = users.filter(username=options['user'])
+
+        rebuilt = 0
+        for user in users.iterator():
+            TimelineEntry.objects.filter(user=user).delete()
+            for author in user.following.all():
+                backfill_author(user, author)
+            trim_timelines([user.pk])
+            rebuilt += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rebuilt} timelines'))
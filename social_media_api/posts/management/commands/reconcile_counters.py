@@ -0,0 +1,13 @@
+# posts/management/commands/reconcile_counters.py
+from django.core.management.base import BaseCommand
+
+from posts.counters import reconcile_post_counters, reconcile_user_counters
+
+
+class Command(BaseCommand):
+    help = 'Recompute denormalized follower, like and comment counters to repair drift'
+
+    def handle(self, *args, **options):
+        posts = reconcile_post_counters()
+        users = reconcile_user_counters()
+        self.stdout.write(self.style.SUCCESS(f'Reconciled counters for {posts} posts and {users} users'))
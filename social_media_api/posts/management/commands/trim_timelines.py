@@ -0,0 +1,26 @@
+# posts/management/commands/trim_timelines.py
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from posts.timeline import MAX_LENGTH, trim_timelines
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = f'Delete timeline entries beyond the newest {MAX_LENGTH} of each user; run periodically'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Timelines trimmed per statement')
+
+    def handle(self, *args, **options):
+        user_ids = User.objects.order_by('pk').values_list('pk', flat=True)
+        batch, deleted = [], 0
+        for user_id in user_ids.iterator(chunk_size=options['batch_size']):
+            batch.append(user_id)
+            if len(batch) == options['batch_size']:
+                deleted += trim_timelines(batch)
+                batch = []
+        if batch:
+            deleted += trim_timelines(batch)
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} timeline entries'))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:26
+
+from django.db import migrations, models
+
+
+def backfill_counters(apps, schema_editor):
+    # Existing rows start at the real counts, so the first unlike or
+    # comment delete does not take a counter below zero
+    from posts.counters import reconcile_post_counters
+
+    try:
+        like_model = apps.get_model('posts', 'Like')
+    except LookupError:
+        like_model = None
+    reconcile_post_counters(apps.get_model('posts', 'Post'), like_model, apps.get_model('posts', 'Comment'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0003_post_comment_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
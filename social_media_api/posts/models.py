@@ -1,8 +1,22 @@
 # posts/models.py
 
 from django.db import models
+from django.db.models import Prefetch
 from accounts.models import CustomUser # Import the CustomUser model
 
+
+class PostQuerySet(models.QuerySet):
+    def for_list(self):
+        """Everything PostListSerializer reads, in a single query."""
+        # Comment and like counts are stored on the row (see posts/counters.py)
+        return self.select_related('author')
+
+    def for_detail(self):
+        """Everything PostDetailSerializer reads, in two queries."""
+        comments = Comment.objects.select_related('user')
+        return self.for_list().prefetch_related(Prefetch('comments', queryset=comments))
+
+
 class Post(models.Model):
     title = models.CharField(max_length=255)
     content = models.TextField()
@@ -10,13 +24,35 @@ class Post(models.Model):
     author = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='posts')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized counters, kept in sync by posts/counters.py
+    likes_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-created_at'] # Order by newest first
+        # Keyset pagination indexes: global listing and per-author listing
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='post_created_id_idx'),
+            models.Index(fields=['author', '-created_at', '-id'], name='post_author_created_id_idx'),
+            # Lets the search index catch up on recently edited posts
+            models.Index(fields=['updated_at'], name='post_updated_at_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+class PostTombstone(models.Model):
+    # Written when a post is deleted, so every process's search index can
+    # drop it (see posts/search.py); rows older than a day are purged
+    post_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Post {self.post_id} deleted at {self.deleted_at}"
+
+
 class Comment(models.Model):
     # ForeignKey to Post
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
@@ -28,6 +64,9 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['created_at'] # Order by oldest first for comment threading
+        indexes = [
+            models.Index(fields=['post', 'created_at', 'id'], name='comment_post_created_id_idx'),
+        ]
 
     def __str__(self):
         return f"Comment by {self.user.username} on Post {self.post.id}"
@@ -45,4 +84,22 @@ class Like(models.Model):
         ordering = ['-created_at']
 
     def __str__(self):
-        return f"{self.user.username} likes {self.post.title}"
\ No newline at end of file
+        return f"{self.user.username} likes {self.post.title}"
+
+class TimelineEntry(models.Model):
+    # Materialized home timeline: one row per (follower, post) pushed on write
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='timeline_entries')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='timeline_entries')
+    # Copy of post.created_at so a feed page is a single range scan on this table
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'post')
+        ordering = ['-created_at']
+        indexes = [
+            # Feed pages: one range scan in (created_at, post) order per user
+            models.Index(fields=['user', '-created_at', '-post'], name='timeline_user_created_post_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id} in {self.user_id}'s timeline"
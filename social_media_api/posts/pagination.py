@@ -1,7 +1,180 @@
 # posts/pagination.py
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+import math
+from datetime import datetime
 
-class StandardResultsSetPagination(PageNumberPagination):
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on a unique, indexed ordering such as (created_at, id).
+
+    Each page is fetched with a WHERE on the last row of the previous page
+    instead of an OFFSET, and no COUNT(*) is run, so page 10,000 costs the
+    same as page 1. Cursors are opaque base64-encoded positions; one that
+    does not decode to values of the ordering fields' types is a 400.
+    """
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    # Last field must be unique so every row has a distinct position
+    ordering = ('-created_at', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self._page(list(self._page_queryset(queryset, request, view)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() for async views (see posts/async_api.py)."""
+        return self._page([obj async for obj in self._page_queryset(queryset, request, view)])
+
+    def paginate_fetch(self, model, fetch, request, view=None):
+        """
+        Page rows of `model` merged from more than one query, e.g. the home
+        timeline: fetch(position, limit) returns up to limit rows in
+        ordering order, after position (None on the first page).
+        """
+        self._setup(request, view)
+        return self._page(fetch(self._position(request, model), self.page_size + 1))
+
+    async def apaginate_fetch(self, model, fetch, request, view=None):
+        """paginate_fetch() with an async fetch."""
+        self._setup(request, view)
+        return self._page(await fetch(self._position(request, model), self.page_size + 1))
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'results': data,
+        }
+
+    def _setup(self, request, view):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(view)
+
+    def _page_queryset(self, queryset, request, view):
+        self._setup(request, view)
+        queryset = queryset.order_by(*self.ordering)
+
+        position = self._position(request, queryset.model, queryset.query.annotations)
+        if position is not None:
+            queryset = queryset.filter(self.build_filter(position))
+
+        # Fetch one extra row to know whether there is a next page
+        return queryset[:self.page_size + 1]
+
+    def _page(self, results):
+        self.has_next = len(results) > self.page_size
+        results = results[:self.page_size]
+        self.next_position = self.get_position(results[-1]) if self.has_next else None
+        return results
+
+    def get_ordering(self, view):
+        # Views can page on another key, e.g. ('-search_rank', '-id') while searching
+        return getattr(view, 'keyset_ordering', None) or self.ordering
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_position(self, instance):
+        values = []
+        for field in self._field_names():
+            value = getattr(instance, field)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return values
+
+    def build_filter(self, position):
+        """
+        Rows strictly after `position` in ordering order, e.g. for
+        (-created_at, -id): created_at < x OR (created_at = x AND id < y).
+        """
+        condition = Q()
+        equal = {}
+        for ordering, field, value in zip(self.ordering, self._field_names(), position):
+            lookup = 'lt' if ordering.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{field}__{lookup}': value})
+            equal[field] = value
+        return condition
+
+    def encode_cursor(self, position):
+        raw = json.dumps(position, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii')
+
+    def decode_cursor(self, request, ordering=None):
+        ordering = ordering or self.ordering
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+        except (TypeError, ValueError, UnicodeError):
+            raise ParseError(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(ordering):
+            raise ParseError(self.invalid_cursor_message)
+        return position
+
+    def clean_position(self, position, model, annotations=None, ordering=None):
+        """
+        The decoded cursor's values converted to the types of the ordering
+        fields (model fields, or annotations such as search_rank). The
+        ordering defaults to the one this paginator pages on.
+        """
+        annotations = annotations or {}
+        cleaned = []
+        for name, value in zip(self._field_names(ordering), position):
+            field = annotations[name].output_field if name in annotations else model._meta.get_field(name)
+            # Cursors only ever hold scalars; anything else was forged
+            if value is None or isinstance(value, (bool, list, dict)):
+                raise ParseError(self.invalid_cursor_message)
+            try:
+                value = field.to_python(value)
+            except (ValidationError, TypeError, ValueError, OverflowError):
+                raise ParseError(self.invalid_cursor_message)
+            if isinstance(value, float) and not math.isfinite(value):
+                raise ParseError(self.invalid_cursor_message)
+            if isinstance(value, datetime) and timezone.is_naive(value):
+                raise ParseError(self.invalid_cursor_message)
+            cleaned.append(value)
+        return cleaned
+
+    def _position(self, request, model, annotations=None):
+        position = self.decode_cursor(request)
+        return None if position is None else self.clean_position(position, model, annotations)
+
+    def _field_names(self, ordering=None):
+        return [field.lstrip('-') for field in ordering or self.ordering]
+
+
+class PostCursorPagination(KeysetPagination):
+    # Newest posts first; matches the (created_at, id) indexes on Post
+    ordering = ('-created_at', '-id')
+
+
+class CommentCursorPagination(KeysetPagination):
+    # Oldest comments first for threading
+    ordering = ('created_at', 'id')
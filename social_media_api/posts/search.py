@@ -0,0 +1,317 @@
+# posts/search.py
+"""
+In-process inverted index for post search.
+
+Replaces DRF's SearchFilter, which turns ?search= into icontains scans over
+the whole posts table. Posts are tokenized into an inverted index
+(token -> {post_id: weight}) kept current by post_save/post_delete
+signals, so a lookup only touches the postings of the query terms.
+Query terms also match as prefixes ("djan" -> "django") and, through a
+trigram index over the vocabulary, with typos ("djnago" -> "django").
+Results are ranked by a TF-IDF style score.
+
+Each worker process holds its own index. A background thread loads it on
+first use, while searches fall back to the database, and then catches up
+every POST_SEARCH_SYNC_INTERVAL seconds on posts edited (via the
+updated_at index) or deleted (via PostTombstone) by other processes.
+
+A search returns at most POST_SEARCH_MAX_RESULTS posts, the best ranked;
+that also bounds ?search= exports.
+"""
+import bisect
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Case, FloatField, Q, Value, When
+from django.utils import timezone
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Post, PostTombstone
+from .pagination import KeysetPagination
+
+logger = logging.getLogger(__name__)
+
+# Field weights: a match in the title counts three times a body match
+FIELD_WEIGHTS = {'title': 3.0, 'content': 1.0}
+MAX_RESULTS = getattr(settings, 'POST_SEARCH_MAX_RESULTS', 1000)
+SYNC_INTERVAL = getattr(settings, 'POST_SEARCH_SYNC_INTERVAL', 30)
+# Tombstones only need to outlive the sync of every running process
+TOMBSTONE_TTL = timedelta(days=1)
+
+# Type of the search_rank annotation, for validating cursors
+SEARCH_RANK = Value(0.0, output_field=FloatField())
+
+PREFIX_WEIGHT = 0.5
+FUZZY_WEIGHT = 0.5
+MAX_EXPANSIONS = 50
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    return [token for token in _TOKEN_RE.findall(text.lower()) if len(token) > 1]
+
+
+def trigrams(token):
+    padded = f'  {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def max_typos(term):
+    return 2 if len(term) >= 8 else 1
+
+
+def edit_distance(a, b, limit):
+    """Damerau-Levenshtein (adjacent transpositions) distance, capped at limit + 1."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, char_b in enumerate(b, 1):
+            cost = char_a != char_b
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class InvertedIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = defaultdict(dict)   # token -> {doc_id: weight}
+        self._docs = {}                      # doc_id -> tokens, for removal
+        self._trigrams = defaultdict(set)    # trigram -> tokens, for typos
+        self._vocabulary = []                # sorted tokens, for prefixes
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, doc_id, fields):
+        """Index a document given as (text, weight) pairs, replacing any previous version."""
+        counts = Counter()
+        for text, weight in fields:
+            for token in tokenize(text):
+                counts[token] += weight
+        with self._lock:
+            self._remove(doc_id)
+            for token, weight in counts.items():
+                if token not in self._postings:
+                    self._add_token(token)
+                self._postings[token][doc_id] = weight
+            self._docs[doc_id] = set(counts)
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove(doc_id)
+
+    def search(self, query, limit=MAX_RESULTS):
+        """Return up to `limit` (doc_id, score) pairs, best first."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        scores = defaultdict(float)
+        with self._lock:
+            total = len(self._docs) or 1
+            for position, term in enumerate(terms):
+                # Only the last term is treated as a prefix (search-as-you-type)
+                prefix = position == len(terms) - 1
+                for token, match_weight in self._expand(term, prefix).items():
+                    postings = self._postings[token]
+                    idf = math.log(1 + total / len(postings))
+                    for doc_id, weight in postings.items():
+                        scores[doc_id] += match_weight * weight * idf
+        return heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], item[0]))
+
+    def _expand(self, term, prefix=True):
+        """Vocabulary tokens matching term, with how strongly each matches."""
+        matches = {}
+        if term in self._postings:
+            matches[term] = 1.0
+
+        if prefix:
+            start = bisect.bisect_left(self._vocabulary, term)
+            for token in self._vocabulary[start:start + MAX_EXPANSIONS]:
+                if not token.startswith(term):
+                    break
+                matches.setdefault(token, PREFIX_WEIGHT)
+
+        if not matches and len(term) >= 4:
+            # Tokens sharing the most trigrams are the likely typo targets;
+            # confirm them with a bounded edit distance
+            limit = max_typos(term)
+            candidates = Counter()
+            for gram in trigrams(term):
+                candidates.update(self._trigrams.get(gram, ()))
+            for token, _ in candidates.most_common(MAX_EXPANSIONS):
+                if edit_distance(term, token, limit) <= limit:
+                    matches[token] = FUZZY_WEIGHT
+        return matches
+
+    def _remove(self, doc_id):
+        for token in self._docs.pop(doc_id, ()):
+            postings = self._postings[token]
+            postings.pop(doc_id, None)
+            if not postings:
+                self._drop_token(token)
+
+    def _add_token(self, token):
+        bisect.insort(self._vocabulary, token)
+        for gram in trigrams(token):
+            self._trigrams[gram].add(token)
+
+    def _drop_token(self, token):
+        del self._postings[token]
+        position = bisect.bisect_left(self._vocabulary, token)
+        if position < len(self._vocabulary) and self._vocabulary[position] == token:
+            del self._vocabulary[position]
+        for gram in trigrams(token):
+            tokens = self._trigrams.get(gram)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._trigrams[gram]
+
+
+class PostSearchIndex:
+    """The process-wide post index, kept in sync with the DB in the background."""
+
+    def __init__(self):
+        self.index = InvertedIndex()
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._worker = None
+        self._loaded = False
+        self._high_water = None          # latest updated_at read from the DB
+        self._deleted_high_water = None  # latest tombstone read from the DB
+
+    def index_post(self, post):
+        if self._loaded:
+            self._add(post)
+
+    def remove_post(self, post_id):
+        if self._loaded:
+            self.index.remove(post_id)
+
+    def search(self, query, limit=MAX_RESULTS):
+        """Up to `limit` (post_id, score) pairs, best first; None until loaded."""
+        if not self._loaded:
+            self.warm()
+            return None
+        return self.index.search(query, limit)
+
+    def warm(self):
+        """Load the index, and keep it current, in a background thread."""
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='post-search-sync', daemon=True)
+                self._worker.start()
+
+    def sync(self):
+        """Read posts deleted and saved since the last sync (every post the first time)."""
+        # Overlap a little so rows committed late are not skipped;
+        # reindexing or removing a post is idempotent
+        overlap = timedelta(seconds=SYNC_INTERVAL)
+        with self._sync_lock:
+            # Deletes first: a post id the database reused is re-added below
+            tombstones = PostTombstone.objects.order_by()
+            if self._deleted_high_water is not None:
+                tombstones = tombstones.filter(deleted_at__gte=self._deleted_high_water - overlap)
+            for post_id, deleted_at in tombstones.values_list('post_id', 'deleted_at').iterator():
+                self.index.remove(post_id)
+                if self._deleted_high_water is None or deleted_at > self._deleted_high_water:
+                    self._deleted_high_water = deleted_at
+
+            posts = Post.objects.only('id', 'title', 'content', 'updated_at').order_by()
+            if self._high_water is not None:
+                posts = posts.filter(updated_at__gte=self._high_water - overlap)
+            for post in posts.iterator(chunk_size=2000):
+                self._add(post)
+                if self._high_water is None or post.updated_at > self._high_water:
+                    self._high_water = post.updated_at
+            self._loaded = True
+        PostTombstone.objects.filter(deleted_at__lt=timezone.now() - TOMBSTONE_TTL).delete()
+
+    def _run(self):
+        while True:
+            try:
+                self.sync()
+            except Exception:
+                logger.exception('Failed to sync the post search index')
+            finally:
+                close_old_connections()
+            time.sleep(SYNC_INTERVAL)
+
+    def _add(self, post):
+        self.index.add(post.pk, [(getattr(post, field) or '', weight) for field, weight in FIELD_WEIGHTS.items()])
+
+
+post_index = PostSearchIndex()
+
+
+class PostSearchFilter(BaseFilterBackend):
+    """
+    ?search= backed by the inverted index. Matching posts are annotated with
+    their score as `search_rank` and ordered by it, best first.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        hits = post_index.search(query)
+        if hits is None:
+            # The index is still loading: plain matching, newest first
+            matches = queryset.filter(Q(title__icontains=query) | Q(content__icontains=query))
+            return matches.annotate(search_rank=SEARCH_RANK).order_by('-search_rank', '-id')
+        hits = self.page_window(request, view, queryset, hits)
+        if not hits:
+            return queryset.none()
+        rank = Case(
+            *[When(pk=post_id, then=Value(score)) for post_id, score in hits],
+            output_field=FloatField(),
+        )
+        ids = [post_id for post_id, _ in hits]
+        return queryset.filter(pk__in=ids).annotate(search_rank=rank).order_by('-search_rank', '-id')
+
+    def page_window(self, request, view, queryset, hits):
+        """
+        With keyset pagination only the hits after the cursor, up to one
+        more than the page size, are sent to the database instead of a
+        CASE over every match. Hits no longer in the queryset, e.g. posts
+        deleted since this index last synced, are skipped and more are
+        pulled in, so the page is only short when the hits run out.
+        """
+        paginator = getattr(view, 'paginator', None)
+        if not isinstance(paginator, KeysetPagination):
+            return hits
+        # Cursors are checked against the ranked ordering, so a forged one,
+        # or one from the unsearched listing, is a 400 rather than a 500
+        ordering = paginator.get_ordering(view)
+        position = paginator.decode_cursor(request, ordering)
+        if position is not None:
+            rank, last_id = paginator.clean_position(position, Post, {'search_rank': SEARCH_RANK}, ordering)
+            hits = [(post_id, score) for post_id, score in hits if (score, post_id) < (rank, last_id)]
+
+        wanted = paginator.get_page_size(request) + 1
+        window, start = [], 0
+        while len(window) < wanted and start < len(hits):
+            batch = hits[start:start + (wanted - len(window)) * 2]
+            start += len(batch)
+            found = set(queryset.filter(pk__in=[post_id for post_id, _ in batch]).values_list('pk', flat=True))
+            window += [hit for hit in batch if hit[0] in found]
+        return window[:wanted]
@@ -6,8 +6,9 @@ from .models import Post, Comment
 User = get_user_model()
 
 class CommentSerializer(serializers.ModelSerializer):
-    author = serializers.StringRelatedField(read_only=True)  # returns username
-    author_id = serializers.IntegerField(source='author.id', read_only=True)
+    # Comment.user is loaded with select_related('user'), so these never query
+    author = serializers.StringRelatedField(source='user', read_only=True)  # returns username
+    author_id = serializers.IntegerField(source='user_id', read_only=True)
 
     class Meta:
         model = Comment
@@ -16,17 +17,18 @@ class CommentSerializer(serializers.ModelSerializer):
 
 class PostListSerializer(serializers.ModelSerializer):
     author = serializers.StringRelatedField(read_only=True)
-    comments_count = serializers.IntegerField(source='comments.count', read_only=True)
 
     class Meta:
         model = Post
-        fields = ['id', 'title', 'author', 'created_at', 'updated_at', 'comments_count']
+        # comments_count / likes_count are denormalized columns on Post
+        fields = ['id', 'title', 'author', 'created_at', 'updated_at', 'comments_count', 'likes_count']
+        read_only_fields = ['comments_count', 'likes_count']
 
 class PostDetailSerializer(serializers.ModelSerializer):
     author = serializers.StringRelatedField(read_only=True)
-    comments = CommentSerializer(many=True, read_only=True)  # nested comments
+    comments = CommentSerializer(many=True, read_only=True)  # nested comments, prefetched by for_detail()
 
     class Meta:
         model = Post
-        fields = ['id', 'title', 'content', 'author', 'created_at', 'updated_at', 'comments']
-        read_only_fields = ['id', 'author', 'created_at', 'updated_at', 'comments']
+        fields = ['id', 'title', 'content', 'author', 'created_at', 'updated_at', 'comments', 'comments_count', 'likes_count']
+        read_only_fields = ['id', 'author', 'created_at', 'updated_at', 'comments', 'comments_count', 'likes_count']
@@ -0,0 +1,19 @@
+# posts/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Post, PostTombstone
+from .search import post_index
+
+
+# Keep this process's search index in step with post writes
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    post_index.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    post_index.remove_post(instance.pk)
+    # Other processes drop it from their indexes when they next sync
+    PostTombstone.objects.create(post_id=instance.pk)
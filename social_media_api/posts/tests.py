@@ -1,3 +1,360 @@
-from django.test import TestCase
+import base64
+import json
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from .counters import reconcile_post_counters
+from .likes import remove_like, toggle_like
+from .models import Post, Comment, Like, TimelineEntry
+from .pagination import CommentCursorPagination, PostCursorPagination
+from .search import InvertedIndex, PostSearchIndex
+from .timeline import fan_out_post, follow, follow_many, home_timeline, trim_timelines, unfollow, unfollow_many
+
+User = get_user_model()
+
+
+class ConstantQueryCountMixin:
+    """
+    Fails when a list endpoint issues more queries for a bigger page,
+    i.e. when a serializer field triggers a query per row (N+1).
+    """
+
+    def assertConstantQueryCount(self, url, page_sizes=(1, 10), **params):
+        counts = {}
+        for size in page_sizes:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url, {**params, 'page_size': size})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['results']), size)
+            counts[size] = len(ctx.captured_queries)
+        self.assertEqual(
+            len(set(counts.values())), 1,
+            f"Query count grows with page size {counts}",
+        )
+
+
+class PostListQueryCountTests(ConstantQueryCountMixin, APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', password='testpass123')
+        for i in range(10):
+            author = User.objects.create_user(username=f'author{i}', password='testpass123')
+            post = Post.objects.create(title=f'Post {i}', content='Body', author=author)
+            Comment.objects.create(post=post, user=self.user, content='Nice')
+            Like.objects.create(post=post, user=self.user)
+        reconcile_post_counters()
+        self.client.force_authenticate(self.user)
+
+    def test_post_list_query_count_is_constant(self):
+        self.assertConstantQueryCount(reverse('post-list'))
+
+    def test_comment_list_query_count_is_constant(self):
+        self.assertConstantQueryCount(reverse('comment-list'))
+
+    def test_post_list_includes_counts(self):
+        response = self.client.get(reverse('post-list'))
+        first = response.data['results'][0]
+        self.assertEqual(first['comments_count'], 1)
+        self.assertEqual(first['likes_count'], 1)
+
+
+class CounterBackfillMigrationTests(TransactionTestCase):
+    """The counter migrations start existing rows at their real counts."""
+    before = [('accounts', '0001_initial'), ('posts', '0003_post_comment_keyset_indexes')]
+    after = [('accounts', '0002_user_followers_count_user_following_count'),
+             ('posts', '0004_post_comments_count_post_likes_count')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_counters_are_backfilled(self):
+        apps = self.migrate(self.before)
+        OldUser, OldPost = apps.get_model('accounts', 'User'), apps.get_model('posts', 'Post')
+        OldComment = apps.get_model('posts', 'Comment')
+        author = OldUser.objects.create(username='author')
+        fans = [OldUser.objects.create(username=f'fan{i}') for i in range(2)]
+        author.followers.add(*fans)
+        post = OldPost.objects.create(title='Post', content='Body', author=author)
+        for fan in fans:
+            OldComment.objects.create(post=post, author=fan, content='Nice')
+
+        apps = self.migrate(self.after)
+        author = apps.get_model('accounts', 'User').objects.get(pk=author.pk)
+        self.assertEqual((author.followers_count, author.following_count), (2, 0))
+        fan = apps.get_model('accounts', 'User').objects.get(pk=fans[0].pk)
+        self.assertEqual((fan.followers_count, fan.following_count), (0, 1))
+        self.assertEqual(apps.get_model('posts', 'Post').objects.get(pk=post.pk).comments_count, 2)
+
+
+class TimelineTests(TestCase):
+    def setUp(self):
+        self.reader = User.objects.create_user(username='reader', password='testpass123')
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.celebrity = User.objects.create_user(username='celebrity', password='testpass123')
+        follow(self.reader, self.author)
+        follow(self.reader, self.celebrity)
+        self.start = timezone.now() - timedelta(days=1)
+
+    def publish(self, author, minutes):
+        post = Post.objects.create(title='Post', content='Body', author=author)
+        created_at = self.start + timedelta(minutes=minutes)
+        Post.objects.filter(pk=post.pk).update(created_at=created_at)
+        post.created_at = created_at
+        post.author.refresh_from_db()
+        fan_out_post(post)
+        return post
+
+    def test_fan_out_fills_followers_timelines(self):
+        post = self.publish(self.author, 1)
+        self.assertTrue(TimelineEntry.objects.filter(user=self.reader, post=post).exists())
+        self.assertFalse(TimelineEntry.objects.filter(user=self.author, post=post).exists())
+
+    @mock.patch('posts.timeline.CELEBRITY_THRESHOLD', 0)
+    def test_fan_out_reads_current_follower_count(self):
+        post = Post.objects.create(title='Post', content='Body', author=self.author)
+        # As cached with the token before anyone followed the author
+        post.author.followers_count = 0
+        fan_out_post(post)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+
+    @mock.patch('posts.timeline.CELEBRITY_THRESHOLD', 0)
+    def test_celebrity_posts_are_merged_in_at_read_time(self):
+        old, loud, new = self.publish(self.author, 1), self.publish(self.celebrity, 2), self.publish(self.author, 3)
+        self.assertFalse(TimelineEntry.objects.filter(post=loud).exists())
+        with self.assertNumQueries(3):
+            posts = home_timeline(self.reader)
+        self.assertEqual(posts, [new, loud, old])
+
+    def test_pages_follow_position_across_equal_timestamps(self):
+        posts = [self.publish(self.author, 1) for _ in range(3)]
+        first = home_timeline(self.reader, limit=2)
+        rest = home_timeline(self.reader, (first[-1].created_at, first[-1].pk), limit=2)
+        self.assertEqual(first + rest, posts[::-1])
+
+    def test_unfollow_removes_author_posts(self):
+        self.publish(self.author, 1)
+        kept = self.publish(self.celebrity, 2)
+        unfollow(self.reader, self.author)
+        self.assertEqual(home_timeline(self.reader), [kept])
+
+    @mock.patch('posts.timeline.MAX_LENGTH', 2)
+    def test_trim_keeps_newest_entries(self):
+        posts = [self.publish(self.author, minutes) for minutes in range(4)]
+        self.assertEqual(trim_timelines([self.reader.pk]), 2)
+        entries = TimelineEntry.objects.filter(user=self.reader).order_by('-created_at')
+        self.assertEqual([entry.post_id for entry in entries], [posts[3].pk, posts[2].pk])
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.post = Post.objects.create(title='Post', content='Body', author=self.author)
+        self.factory = APIRequestFactory()
+
+    def request(self, cursor=None, page_size=2):
+        params = {'page_size': page_size}
+        if cursor:
+            params['cursor'] = cursor
+        return Request(self.factory.get('/', params))
+
+    def walk(self, pagination_class, queryset, page_size=2):
+        """Ids of every page, and the number of pages."""
+        ids, cursor, pages = [], None, 0
+        while True:
+            paginator = pagination_class()
+            ids += [obj.pk for obj in paginator.paginate_queryset(queryset, self.request(cursor, page_size))]
+            pages += 1
+            if paginator.next_position is None:
+                return ids, pages
+            cursor = paginator.encode_cursor(paginator.next_position)
+
+    def encode(self, value):
+        return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+    def test_equal_timestamps_are_paged_by_id(self):
+        for _ in range(4):
+            Post.objects.create(title='Post', content='Body', author=self.author)
+        Post.objects.update(created_at=timezone.now())
+        ids, _ = self.walk(PostCursorPagination, Post.objects.all())
+        self.assertEqual(ids, sorted(Post.objects.values_list('pk', flat=True), reverse=True))
+
+    def test_full_last_page_has_no_next_page(self):
+        Post.objects.create(title='Post', content='Body', author=self.author)
+        self.assertEqual(self.walk(PostCursorPagination, Post.objects.all())[1], 1)
+        Post.objects.create(title='Post', content='Body', author=self.author)
+        self.assertEqual(self.walk(PostCursorPagination, Post.objects.all())[1], 2)
+
+    def test_comments_are_paged_oldest_first(self):
+        comments = [Comment.objects.create(post=self.post, user=self.author, content=str(i)) for i in range(5)]
+        ids, _ = self.walk(CommentCursorPagination, Comment.objects.all())
+        self.assertEqual(ids, [comment.pk for comment in comments])
+
+    async def test_async_pages_match_sync_pages(self):
+        await Post.objects.acreate(title='Post', content='Body', author=self.author)
+        paginator = PostCursorPagination()
+        first = await paginator.apaginate_queryset(Post.objects.all(), self.request(page_size=1))
+        second = await PostCursorPagination().apaginate_queryset(
+            Post.objects.all(), self.request(paginator.encode_cursor(paginator.next_position), page_size=1),
+        )
+        self.assertEqual([post.pk for post in first + second], [self.post.pk + 1, self.post.pk])
+
+    def test_malformed_cursors_are_rejected(self):
+        now = timezone.now().isoformat()
+        for cursor in ['%%%', self.encode({'v': ['x', 1]}), self.encode(['x', 1]), self.encode([now, 'y']),
+                       self.encode([now]), self.encode([now, None]), self.encode(['2024-02-30T00:00:00+00:00', 1])]:
+            with self.subTest(cursor=cursor), self.assertRaises(ParseError):
+                PostCursorPagination().paginate_queryset(Post.objects.all(), self.request(cursor))
+
+
+class LikeToggleTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.user = User.objects.create_user(username='fan', password='testpass123')
+        self.post = Post.objects.create(title='Post', content='Body', author=self.author)
+
+    def assertLikes(self, count):
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, count)
+        self.assertEqual(Like.objects.filter(post=self.post).count(), count)
+
+    def test_toggle_adds_then_removes_like(self):
+        self.assertTrue(toggle_like(self.post.pk, self.user))
+        self.assertLikes(1)
+        self.assertFalse(toggle_like(self.post.pk, self.user))
+        self.assertLikes(0)
+
+    def test_remove_like(self):
+        self.assertFalse(remove_like(self.post.pk, self.user))
+        toggle_like(self.post.pk, self.user)
+        self.assertTrue(remove_like(self.post.pk, self.user))
+        self.assertLikes(0)
+
+    def test_unknown_post_leaves_no_like(self):
+        with self.assertRaises(Post.DoesNotExist):
+            toggle_like(self.post.pk + 1, self.user)
+        self.assertFalse(Like.objects.exists())
+
+
+class BulkFollowTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='newcomer', password='testpass123')
+        self.authors = [User.objects.create_user(username=f'author{i}', password='testpass123') for i in range(3)]
+        for author in self.authors:
+            Post.objects.create(title='Post', content='Body', author=author)
+        self.ids = [author.pk for author in self.authors]
+
+    def test_follow_many_skips_existing_and_unknown_ids(self):
+        follow(self.user, self.authors[0])
+        followed = follow_many(self.user, [*self.ids, self.user.pk, self.ids[-1] + 100])
+        self.assertEqual(sorted(followed), self.ids[1:])
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.following_count, 3)
+        self.assertEqual(User.objects.get(pk=self.ids[1]).followers_count, 1)
+        self.assertEqual(TimelineEntry.objects.filter(user=self.user).count(), 3)
+
+    def test_unfollow_many(self):
+        follow_many(self.user, self.ids)
+        self.assertEqual(sorted(unfollow_many(self.user, self.ids[:2])), self.ids[:2])
+        self.assertEqual(unfollow_many(self.user, self.ids[:2]), [])
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.following_count, 1)
+        self.assertEqual(User.objects.get(pk=self.ids[0]).followers_count, 0)
+        self.assertEqual(TimelineEntry.objects.filter(user=self.user).count(), 1)
+
+
+class InvertedIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = InvertedIndex()
+        self.index.add(1, [('Django performance tips', 3.0), ('Tuning the ORM', 1.0)])
+        self.index.add(2, [('Cooking pasta', 3.0), ('Not about django', 1.0)])
+
+    def ids(self, query):
+        return [doc_id for doc_id, _ in self.index.search(query)]
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.ids('django'), [1, 2])
+
+    def test_prefix_and_typo_matches(self):
+        self.assertEqual(self.ids('perf'), [1])
+        self.assertEqual(self.ids('djnago'), [1, 2])
+
+    def test_removed_documents_are_not_returned(self):
+        self.index.remove(1)
+        self.assertEqual(self.ids('django'), [2])
+        self.assertEqual(self.ids('tuning'), [])
+
+
+class PostSearchTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        for i in range(8):
+            Post.objects.create(title=f'Django tip {i}', content='Body ' * i, author=self.author)
+        Post.objects.create(title='Cooking pasta', content='Body', author=self.author)
+        self.index = PostSearchIndex()
+        patcher = mock.patch('posts.search.post_index', self.index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.index.sync()
+
+    def search(self, **params):
+        return self.client.get(reverse('post-list'), {'search': 'django', 'page_size': 2, **params})
+
+    def walk(self):
+        ids, response = [], self.search()
+        while True:
+            self.assertEqual(response.status_code, 200)
+            ids += [post['id'] for post in response.data['results']]
+            if not response.data['next']:
+                return ids
+            response = self.client.get(response.data['next'])
+
+    def django_ids(self):
+        return sorted(Post.objects.filter(title__startswith='Django').values_list('pk', flat=True))
+
+    def test_pages_walk_every_hit_once(self):
+        self.assertEqual(sorted(self.walk()), self.django_ids())
+
+    def test_hits_deleted_elsewhere_do_not_cut_pages_short(self):
+        # Deleted by another process: still in this index until it syncs
+        with mock.patch.object(PostSearchIndex, 'remove_post'):
+            for post_id, _ in self.index.search('django')[:5]:
+                Post.objects.get(pk=post_id).delete()
+        self.assertEqual(len(self.search().data['results']), 2)
+        self.assertEqual(sorted(self.walk()), self.django_ids())
+
+    def test_sync_drops_posts_deleted_elsewhere(self):
+        post_id = self.index.search('django')[0][0]
+        with mock.patch.object(PostSearchIndex, 'remove_post'):
+            Post.objects.get(pk=post_id).delete()
+        self.index.sync()
+        self.assertNotIn(post_id, [hit[0] for hit in self.index.search('django')])
+
+    def test_search_falls_back_to_database_while_loading(self):
+        loading = PostSearchIndex()
+        with mock.patch('posts.search.post_index', loading), mock.patch.object(loading, 'warm') as warm:
+            self.assertEqual(sorted(self.walk()), self.django_ids())
+        warm.assert_called()
+
+    def test_malformed_cursors_are_rejected(self):
+        listing_cursor = PostCursorPagination().encode_cursor([timezone.now().isoformat(), 1])
+        for position in [['x', 1], [1.0, 'y'], [None, 1], ['nan', 1], [1.0]]:
+            cursor = PostCursorPagination().encode_cursor(position)
+            with self.subTest(position=position):
+                self.assertEqual(self.search(cursor=cursor).status_code, 400)
+        self.assertEqual(self.search(cursor=listing_cursor).status_code, 400)
@@ -0,0 +1,252 @@
+# posts/timeline.py
+"""
+Fan-out-on-write home timeline.
+
+When a post is created it is pushed into the TimelineEntry rows of every
+follower of its author, so a feed page is one indexed range scan on
+(user, created_at, post) joined to its posts. Authors with more followers
+than TIMELINE_CELEBRITY_THRESHOLD are not fanned out; a page of their
+posts is read separately and merged in (fan-out-on-read).
+
+Timelines keep the newest TIMELINE_MAX_LENGTH entries: a follow trims the
+follower's timeline after the backfill, and the trim_timelines command
+trims the ones that fan-out has grown since.
+"""
+import heapq
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.contrib.auth import get_user_model
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+
+from accounts import follow_graph
+
+from .counters import follow_changed, follows_changed
+from .models import Post, TimelineEntry
+
+User = get_user_model()
+# Follow.from_user is the followed user, Follow.to_user the follower
+Follow = User.followers.through
+
+# Authors above this follower count are read on demand instead of pushed
+CELEBRITY_THRESHOLD = getattr(settings, 'TIMELINE_CELEBRITY_THRESHOLD', 10000)
+# How many of an author's recent posts to copy in when someone follows them
+BACKFILL_LIMIT = getattr(settings, 'TIMELINE_BACKFILL_LIMIT', 200)
+# Rows per INSERT when fanning out to a large follower list
+BATCH_SIZE = getattr(settings, 'TIMELINE_BATCH_SIZE', 1000)
+# Entries kept per timeline; older posts drop out of the feed
+MAX_LENGTH = getattr(settings, 'TIMELINE_MAX_LENGTH', 800)
+
+
+def is_celebrity(author):
+    """
+    True when the author's posts should be pulled at read time. `author`
+    must have been loaded from the database, not taken from the cache.
+    """
+    return author.followers_count > CELEBRITY_THRESHOLD
+
+
+def fan_out_post(post):
+    """Push a newly created post into the timelines of its author's followers."""
+    # post.author is usually request.user, whose count may come from the
+    # token cache; read the current one
+    followers_count = User.objects.values_list('followers_count', flat=True).get(pk=post.author_id)
+    if followers_count > CELEBRITY_THRESHOLD:
+        return
+    follower_ids = Follow.objects.filter(from_user_id=post.author_id).values_list('to_user_id', flat=True)
+    entries = [
+        TimelineEntry(user_id=follower_id, post_id=post.pk, created_at=post.created_at)
+        for follower_id in follower_ids.iterator()
+    ]
+    TimelineEntry.objects.bulk_create(entries, batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+
+def backfill_author(user, author):
+    """Copy the author's most recent posts into user's timeline after a follow."""
+    if is_celebrity(author):
+        return
+    recent = Post.objects.filter(author=author).order_by('-created_at').values_list('pk', 'created_at')
+    entries = [
+        TimelineEntry(user_id=user.pk, post_id=post_id, created_at=created_at)
+        for post_id, created_at in recent[:BACKFILL_LIMIT]
+    ]
+    TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+def backfill_authors(user, authors):
+    """backfill_author() for several authors, with one query for all their posts."""
+    author_ids = [author.pk for author in authors if not is_celebrity(author)]
+    if not author_ids:
+        return
+    recent = (
+        Post.objects.filter(author_id__in=author_ids)
+        .annotate(rank=Window(RowNumber(), partition_by=F('author_id'), order_by=F('created_at').desc()))
+        .filter(rank__lte=BACKFILL_LIMIT)
+        .values_list('pk', 'created_at')
+    )
+    entries = [
+        TimelineEntry(user_id=user.pk, post_id=post_id, created_at=created_at)
+        for post_id, created_at in recent
+    ]
+    TimelineEntry.objects.bulk_create(entries, batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+
+def prune_author(user, author):
+    """Drop the author's posts from user's timeline after an unfollow."""
+    TimelineEntry.objects.filter(user=user, post__author=author).delete()
+
+
+def trim_timelines(user_ids=None):
+    """
+    Delete entries beyond the newest MAX_LENGTH of each timeline (of these
+    users, or everyone's). Returns the number of entries deleted.
+    """
+    entries = TimelineEntry.objects.all()
+    if user_ids is not None:
+        entries = entries.filter(user_id__in=user_ids)
+    excess = (
+        entries.annotate(rank=Window(
+            RowNumber(), partition_by=F('user_id'), order_by=[F('created_at').desc(), F('post_id').desc()],
+        ))
+        .filter(rank__gt=MAX_LENGTH)
+        .values('pk')
+    )
+    return TimelineEntry.objects.filter(pk__in=excess).delete()[0]
+
+
+def follow(user, author):
+    """
+    Make user follow author. Counters and the timeline backfill are applied
+    in the same transaction, and only when the edge is actually new.
+    """
+    with transaction.atomic():
+        _, created = Follow.objects.get_or_create(from_user_id=author.pk, to_user_id=user.pk)
+        if created:
+            follow_changed(user, author, 1)
+            backfill_author(user, author)
+            trim_timelines([user.pk])
+            follow_graph.forget(user.pk)
+    return created
+
+
+def unfollow(user, author):
+    """Make user stop following author and prune the timeline."""
+    with transaction.atomic():
+        deleted, _ = Follow.objects.filter(from_user_id=author.pk, to_user_id=user.pk).delete()
+        if deleted:
+            follow_changed(user, author, -1)
+            prune_author(user, author)
+            follow_graph.forget(user.pk)
+    return bool(deleted)
+
+
+def follow_many(user, author_ids):
+    """
+    follow() for many authors at once, e.g. the accounts picked during
+    onboarding: the new edges are one bulk INSERT, and the counters and
+    backfill take a fixed number of queries. Unknown ids and authors
+    already followed are skipped. Returns the ids newly followed.
+    """
+    wanted = set(author_ids) - {user.pk}
+    with transaction.atomic():
+        followed = Follow.objects.filter(to_user_id=user.pk, from_user_id__in=wanted)
+        new = wanted - set(followed.values_list('from_user_id', flat=True))
+        authors = list(User.objects.filter(pk__in=new).only('pk', 'followers_count'))
+        if not authors:
+            return []
+        try:
+            with transaction.atomic():
+                Follow.objects.bulk_create(
+                    [Follow(from_user_id=author.pk, to_user_id=user.pk) for author in authors],
+                    batch_size=BATCH_SIZE,
+                )
+        except IntegrityError:
+            # A concurrent request added one of the edges; go one by one
+            return [author.pk for author in authors if follow(user, author)]
+        author_ids = [author.pk for author in authors]
+        follows_changed(user, author_ids, 1)
+        backfill_authors(user, authors)
+        trim_timelines([user.pk])
+        follow_graph.forget(user.pk)
+    return author_ids
+
+
+def unfollow_many(user, author_ids):
+    """unfollow() for many authors at once. Returns the ids unfollowed."""
+    with transaction.atomic():
+        # Locking the edges makes a concurrent unfollow of one of them wait,
+        # then skip it, so each removal is counted once
+        edges = dict(
+            Follow.objects.select_for_update()
+            .filter(to_user_id=user.pk, from_user_id__in=set(author_ids))
+            .values_list('pk', 'from_user_id')
+        )
+        if not edges:
+            return []
+        Follow.objects.filter(pk__in=list(edges)).delete()
+        unfollowed = list(edges.values())
+        follows_changed(user, unfollowed, -1)
+        TimelineEntry.objects.filter(user=user, post__author_id__in=unfollowed).delete()
+        follow_graph.forget(user.pk)
+    return unfollowed
+
+
+def home_timeline(user, position=None, limit=MAX_LENGTH):
+    """
+    Up to `limit` posts of user's feed, newest first, after `position`
+    (a (created_at, id) pair from the previous page, or None).
+
+    Fanned-out posts come from the user's TimelineEntry rows; posts by
+    followed celebrity authors are read with their own bounded query.
+    """
+    entries, celebrity_posts = _timeline_queries(user, list(_followed_celebrities(user)), position, limit)
+    return _merge([entry.post for entry in entries], list(celebrity_posts), limit)
+
+
+async def ahome_timeline(user, position=None, limit=MAX_LENGTH):
+    """home_timeline() for async views; every query is awaited."""
+    celebrity_ids = [pk async for pk in _followed_celebrities(user)]
+    entries, celebrity_posts = _timeline_queries(user, celebrity_ids, position, limit)
+    return _merge([entry.post async for entry in entries], [post async for post in celebrity_posts], limit)
+
+
+def _followed_celebrities(user):
+    return user.following.filter(followers_count__gt=CELEBRITY_THRESHOLD).values_list('pk', flat=True)
+
+
+def _after(position, id_field):
+    """Rows after position in (-created_at, -id) order."""
+    created_at, pk = position
+    return Q(created_at__lt=created_at) | Q(created_at=created_at, **{f'{id_field}__lt': pk})
+
+
+def _timeline_queries(user, celebrity_ids, position, limit):
+    # Ordered like the (user, -created_at, -post) index, so the page is a
+    # range scan that stops after `limit` rows
+    entries = (
+        TimelineEntry.objects.filter(user=user)
+        .select_related('post__author')
+        .order_by('-created_at', '-post_id')
+    )
+    celebrity_posts = (
+        Post.objects.filter(author_id__in=celebrity_ids).for_list().order_by('-created_at', '-id')
+        if celebrity_ids else Post.objects.none()
+    )
+    if position is not None:
+        entries = entries.filter(_after(position, 'post_id'))
+        celebrity_posts = celebrity_posts.filter(_after(position, 'id'))
+    return entries[:limit], celebrity_posts[:limit]
+
+
+def _merge(timeline_posts, celebrity_posts, limit):
+    # A post fanned out before its author became a celebrity is in both
+    merged = heapq.merge(timeline_posts, celebrity_posts, key=lambda post: (post.created_at, post.pk), reverse=True)
+    posts, seen = [], set()
+    for post in merged:
+        if post.pk not in seen:
+            seen.add(post.pk)
+            posts.append(post)
+            if len(posts) == limit:
+                break
+    return posts
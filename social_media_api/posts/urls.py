@@ -7,6 +7,7 @@ from .views import PostViewSet, CommentViewSet
 from django.conf import settings
 from django.conf.urls.static import static
 from .views import LikePostView, UnlikePostView
+from .views import AsyncFeedView, AsyncPostLikeView
 
 router = DefaultRouter()
 router.register(r'posts', PostViewSet, basename='post')
@@ -21,6 +22,9 @@ urlpatterns = [
     path('posts/', include('posts.urls'))
     path('<int:pk>/like/', LikePostView.as_view(), name='post-like'),
     path('<int:pk>/unlike/', UnlikePostView.as_view(), name='post-unlike'),
+    # Async-native variants for ASGI deployments (see posts/async_api.py)
+    path('feed/async/', AsyncFeedView.as_view(), name='feed-async'),
+    path('<int:pk>/like/async/', AsyncPostLikeView.as_view(), name='post-like-async'),
 ]
 
 if settings.DEBUG:
@@ -1,45 +1,86 @@
 # posts/views.py
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import viewsets, permissions, generics, status
-from rest_framework.filters import SearchFilter
-from rest_framework.pagination import PageNumberPagination
 from .models import Post, Comment, Like
-from .serializers import PostSerializer, CommentSerializer
+from .serializers import PostListSerializer, PostDetailSerializer, CommentSerializer
 from .permissions import IsAuthorOrReadOnly #StandardResultsPagination # We will define this custom permission
+from .pagination import PostCursorPagination, CommentCursorPagination
+from .timeline import ahome_timeline, fan_out_post, home_timeline
+from .search import PostSearchFilter
+from .counters import bump
+from .exports import export_response
+from .likes import remove_like, toggle_like
+from .async_api import AsyncAPIView, AsyncListAPIView
+from asgiref.sync import sync_to_async
+from functools import partial
+from rest_framework.decorators import action
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
+from django.http import Http404, JsonResponse
+from django.db import transaction
 from django.contrib.contenttypes.models import ContentType
 
 
-# --- Custom Pagination Class (Step 5) ---
-class StandardResultsPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 100
-
-
 # --- Post ViewSet (Step 3 & 5) ---
 class PostViewSet(viewsets.ModelViewSet):
     queryset = Post.objects.all()
-    serializer_class = PostSerializer
-    pagination_class = StandardResultsPagination # Pagination
+    pagination_class = PostCursorPagination # Keyset pagination on (created_at, id)
     
     # Permissions: Authenticated users can create/edit/delete, others can only read
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly] 
     
-    # Filtering: Allows searching by 'title' or 'content' (Step 5)
-    filter_backends = [SearchFilter]
-    search_fields = ['title', 'content'] 
+    # Filtering: Allows searching by 'title' or 'content' (Step 5) through
+    # the in-process inverted index (prefix and typo tolerant, ranked)
+    filter_backends = [PostSearchFilter]
 
     # We override perform_create to set the author (redundant due to serializer, but good practice)
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        post = serializer.save(author=self.request.user)
+        # Push the new post into followers' materialized timelines
+        fan_out_post(post)
+
+    def get_queryset(self):
+        # Authors, comment/like counts (and comments for detail) are loaded
+        # up front so serializing a page costs a fixed number of queries
+        if self.action == 'list':
+            return Post.objects.for_list()
+        return Post.objects.for_detail()
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return PostListSerializer
+        return PostDetailSerializer
+
+    # GET /posts/export.ndjson or /posts/export.csv, honouring ?search=.
+    # Streams every matching post instead of one page; with ?search= that
+    # is the POST_SEARCH_MAX_RESULTS best matches.
+    @action(detail=False, url_path=r'export\.(?P<export_format>ndjson|csv)', pagination_class=None)
+    def export(self, request, export_format):
+        posts = self.filter_queryset(Post.objects.all())
+        fields = {
+            'id': 'id',
+            'author': 'author__username',
+            'title': 'title',
+            'content': 'content',
+            'created_at': 'created_at',
+            'updated_at': 'updated_at',
+            'likes_count': 'likes_count',
+            'comments_count': 'comments_count',
+        }
+        return export_response(posts, fields, export_format, 'posts')
+
+    @property
+    def keyset_ordering(self):
+        # Search results are paged in relevance order
+        if self.request.query_params.get(PostSearchFilter.search_param):
+            return ('-search_rank', '-id')
+        return None
 
 # --- Comment ViewSet (Step 3 & 5) ---
 class CommentViewSet(viewsets.ModelViewSet):
     serializer_class = CommentSerializer
-    pagination_class = StandardResultsPagination # Pagination
+    pagination_class = CommentCursorPagination # Keyset pagination on (created_at, id)
     
     # Permissions: Authenticated users can create/edit/delete, others can only read
     # Use IsAuthenticated for comments to prevent anonymous comments, but IsAuthorOrReadOnly for edits
@@ -47,9 +88,10 @@ class CommentViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         # Restrict queryset to comments associated with a specific post (if nested URL is used)
+        comments = Comment.objects.select_related('user')
         if 'post_pk' in self.kwargs:
-            return Comment.objects.filter(post_id=self.kwargs['post_pk'])
-        return Comment.objects.all()
+            return comments.filter(post_id=self.kwargs['post_pk'])
+        return comments
 
     def perform_create(self, serializer):
         # We need the post ID for creation. Assuming non-nested URL for simplicity here.
@@ -59,42 +101,48 @@ class CommentViewSet(viewsets.ModelViewSet):
         # NOTE: For simplicity and following ModelViewSet pattern, we assume the Post ID is included
         # in the request data OR we'll use a mixin if nested routing is implemented.
         # Since we use the serializer's create method to set the user/post, this is sufficient.
-        serializer.save(user=self.request.user)
+        with transaction.atomic():
+            comment = serializer.save(user=self.request.user)
+            bump(Post, comment.post_id, 'comments_count', 1)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            bump(Post, instance.post_id, 'comments_count', -1)
         
 # --- /api/feed/ View (GET) ---
 class FeedView(generics.ListAPIView):
     """
     Retrieves a list of posts from users the current user is following.
     """
-    serializer_class = PostSerializer
+    serializer_class = PostListSerializer
     permission_classes = [IsAuthenticated]
-    pagination_class = StandardResultsPagination
-
-    def get_queryset(self):
-        # 1. Get the list of users the current user is following
-        following_users = self.request.user.following.all()
-
-        # 2. Retrieve posts created by those users
-        queryset = Post.objects.filter(author__in=following_users)
+    pagination_class = PostCursorPagination
 
-        # 3. Order by created_at (newest posts at the top)
-        return queryset.order_by('-created_at')
+    def list(self, request, *args, **kwargs):
+        # Read the precomputed timeline (newest posts at the top) instead of
+        # joining over the follow graph on every request. It merges two
+        # queries, so it is paged by position rather than as one queryset.
+        posts = self.paginator.paginate_fetch(Post, partial(home_timeline, request.user), request, self)
+        return self.get_paginated_response(self.get_serializer(posts, many=True).data)
 
 # --- Helper function for Notification creation (Place at the top of views.py) ---
 def create_notification(recipient, actor, verb, target):
-    """Creates a new Notification object."""
-    from notifications.models import Notification
-    
-    # Prevent notifying yourself for self-actions
-    if recipient.pk == actor.pk:
-        return 
+    """
+    Queues a Notification. Rows are coalesced and bulk-written by the
+    notifications pipeline, outside the request.
+    """
+    from notifications import pipeline
 
-    Notification.objects.create(
-        recipient=recipient,
-        actor=actor,
-        verb=verb,
-        target=target
-    )
+    # Self-actions are ignored by the pipeline
+    pipeline.notify(recipient, actor, verb, target)
+
+
+def retract_notification(recipient, actor, verb, target):
+    """Takes an undone action back out of its Notification, written or still queued."""
+    from notifications import pipeline
+
+    pipeline.retract(recipient, actor, verb, target)
 
 
 # --- /api/posts/<int:pk>/like/ View (POST/DELETE) ---
@@ -102,38 +150,57 @@ class PostLikeView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, pk):
-        post = get_object_or_404(Post, pk=pk)
-        user = request.user
-        
-        # Check if the user already liked the post
-        like, created = Like.objects.get_or_create(post=post, user=user)
-        
-        if created:
-            # SUCCESS: Like created, now generate notification
-            create_notification(
-                recipient=post.author,
-                actor=user,
-                verb="liked your post",
-                target=post
-            )
+        # Acts as a toggle: liking an already liked post unlikes it
+        try:
+            liked = toggle_like(pk, request.user)
+        except Post.DoesNotExist:
+            raise Http404
+        if liked:
             return Response({"detail": "Post liked successfully."}, status=status.HTTP_201_CREATED)
-        else:
-            # Already liked, this acts as a toggle (unlike)
-            like.delete()
-            return Response({"detail": "Post unliked successfully."}, status=status.HTTP_200_OK)
+        return Response({"detail": "Post unliked successfully."}, status=status.HTTP_200_OK)
 
     def delete(self, request, pk):
         # Handles explicit DELETE request for unlike
-        post = get_object_or_404(Post, pk=pk)
-        user = request.user
-        
-        liked_post = Like.objects.filter(post=post, user=user)
-        if liked_post.exists():
-            liked_post.delete()
+        try:
+            removed = remove_like(pk, request.user)
+        except Post.DoesNotExist:
+            raise Http404
+        if removed:
             return Response({"detail": "Post unliked successfully."}, status=status.HTTP_204_NO_CONTENT)
-        
         return Response({"detail": "You have not liked this post."}, status=status.HTTP_400_BAD_REQUEST)
 
+
+# --- Async (ASGI) variants, see posts/async_api.py ---
+class AsyncFeedView(AsyncListAPIView):
+    """FeedView with the timeline read through the async ORM."""
+    serializer_class = PostListSerializer
+    pagination_class = PostCursorPagination
+
+    async def apaginate(self, paginator, request):
+        return await paginator.apaginate_fetch(Post, partial(ahome_timeline, request.user), request, self)
+
+
+class AsyncPostLikeView(AsyncAPIView):
+    """PostLikeView for ASGI; the transactional writes run in sync_to_async."""
+
+    async def post(self, request, pk):
+        try:
+            liked = await sync_to_async(toggle_like)(pk, request.user)
+        except Post.DoesNotExist:
+            raise Http404
+        if liked:
+            return JsonResponse({"detail": "Post liked successfully."}, status=status.HTTP_201_CREATED)
+        return JsonResponse({"detail": "Post unliked successfully."}, status=status.HTTP_200_OK)
+
+    async def delete(self, request, pk):
+        try:
+            removed = await sync_to_async(remove_like)(pk, request.user)
+        except Post.DoesNotExist:
+            raise Http404
+        if removed:
+            return JsonResponse({"detail": "Post unliked successfully."}, status=status.HTTP_204_NO_CONTENT)
+        return JsonResponse({"detail": "You have not liked this post."}, status=status.HTTP_400_BAD_REQUEST)
+
 '''
 Post.objects.filter(author__in=following_users).order_by
 generics.get_object_or_404(Post, pk=pk)
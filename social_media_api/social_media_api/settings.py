@@ -59,6 +59,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    # Outermost after security, so queries made by other middleware count too
+    "social_media_api.sql_profiling.SQLProfilingMiddleware",
     'whitenoise.middleware.WhiteNoiseMiddleware', 
     'django.contrib.sessions.middleware.SessionMiddleware',
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -155,17 +157,57 @@ AUTH_USER_MODEL = 'accounts.CustomUser'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'accounts.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     )
 }
 
+# Home timeline fan-out (see posts/timeline.py)
+# Authors with more followers than this are merged into feeds at read time
+TIMELINE_CELEBRITY_THRESHOLD = 10000
+TIMELINE_BACKFILL_LIMIT = 200
+TIMELINE_MAX_LENGTH = 800  # entries kept per timeline; run trim_timelines periodically
+
+# Notification pipeline (see notifications/pipeline.py). Best-effort:
+# events wait in process memory until the next flush, so a worker that is
+# killed or recycled loses up to one interval of them. Set
+# NOTIFICATIONS_ASYNC = False to write them in the request instead.
+NOTIFICATION_FLUSH_INTERVAL = 2.0  # seconds between background bulk writes
+NOTIFICATION_BATCH_SIZE = 500
+# Real-time delivery (see notifications/realtime.py). With several worker
+# processes, run the notification_broker command at this address
+NOTIFICATION_BROKER_ADDRESS = os.environ.get('NOTIFICATION_BROKER_ADDRESS')  # e.g. 127.0.0.1:7788
+
+# Post search index (see posts/search.py)
+POST_SEARCH_SYNC_INTERVAL = 30  # seconds between catch-up reads of edited and deleted posts
+# Best-ranked hits kept per search; also caps ?search= exports
+POST_SEARCH_MAX_RESULTS = 1000
+
+# SQL profiling (see social_media_api/sql_profiling.py)
+SQL_PROFILING_SAMPLE_RATE = 1.0  # lower on busy production workers
+SQL_PROFILING_DUPLICATE_THRESHOLD = 5  # same query N times in a request = N+1
+
+# Cached token authentication (see accounts/authentication.py)
+# Use a cache shared by all workers (Redis, Memcached) in production, so
+# a deleted token or deactivated user is dropped everywhere at once
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+TOKEN_AUTH_CACHE_TIMEOUT = 60
+TOKEN_AUTH_LOCAL_TIMEOUT = 5
+
+# Cached "who do I follow" sets (see accounts/follow_graph.py)
+FOLLOW_GRAPH_CACHE_TIMEOUT = 300
+FOLLOW_GRAPH_CACHE_LIMIT = 5000  # users following more are checked with EXISTS
+
 
 '''
 DEBUG = False
 SECURE_BROWSER_XSS_FILTER
 X_FRAME_OPTIONS
 PORT
-'''
\ No newline at end of file
+'''
@@ -0,0 +1,300 @@
+# social_media_api/sql_profiling.py
+"""
+Request-level SQL profiling.
+
+SQLProfilingMiddleware wraps every database call made while a request is
+handled and records, per URL name: request count, query count, DB time
+and the normalized SQL ("fingerprint") of each query. A fingerprint that
+runs SQL_PROFILING_DUPLICATE_THRESHOLD or more times in one request is
+flagged as a likely N+1. Every response gets a Server-Timing header with
+its DB time and query count, except streaming ones: their headers are
+sent before the body runs its queries, which are recorded until the
+response is closed.
+
+Totals are kept in process memory (each worker profiles its own traffic)
+and are served as JSON to staff users by sql_profile_view.
+
+The same module lives in django_blog, LibraryProject and
+social_media_api. The projects share no package, so each carries a copy;
+apply fixes to all three.
+"""
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import JsonResponse
+
+logger = logging.getLogger(__name__)
+
+# Fraction of requests to profile
+SAMPLE_RATE = getattr(settings, 'SQL_PROFILING_SAMPLE_RATE', 1.0)
+# Same fingerprint this many times in one request is reported as N+1
+DUPLICATE_THRESHOLD = getattr(settings, 'SQL_PROFILING_DUPLICATE_THRESHOLD', 5)
+# Fingerprints tracked per endpoint, to bound memory
+MAX_FINGERPRINTS = 200
+TOP_FINGERPRINTS = 10
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\bIN \(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_SPACE_RE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """SQL with literals and placeholders replaced by ?, and IN lists collapsed."""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    """execute_wrapper that times every query of one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.db_time = 0.0
+        # raw SQL -> [executions, seconds]; fingerprinted once per distinct SQL
+        self.statements = defaultdict(lambda: [0, 0.0])
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.db_time += elapsed
+            entry = self.statements[sql]
+            entry[0] += 1
+            entry[1] += elapsed
+
+    def fingerprints(self):
+        merged = defaultdict(lambda: [0, 0.0])
+        for sql, (count, elapsed) in self.statements.items():
+            entry = merged[fingerprint(sql)]
+            entry[0] += count
+            entry[1] += elapsed
+        return merged
+
+
+class EndpointStats:
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.db_time = 0.0
+        self.total_time = 0.0
+        self.n_plus_one_requests = 0
+        self.fingerprint_counts = Counter()
+        self.fingerprint_time = Counter()
+        self.n_plus_one = Counter()
+
+    def add(self, recorder, elapsed):
+        self.requests += 1
+        self.queries += recorder.count
+        self.max_queries = max(self.max_queries, recorder.count)
+        self.db_time += recorder.db_time
+        self.total_time += elapsed
+
+        duplicates = []
+        for sql, (count, seconds) in recorder.fingerprints().items():
+            if sql in self.fingerprint_counts or len(self.fingerprint_counts) < MAX_FINGERPRINTS:
+                self.fingerprint_counts[sql] += count
+                self.fingerprint_time[sql] += seconds
+            if count >= DUPLICATE_THRESHOLD:
+                duplicates.append((sql, count))
+                self.n_plus_one[sql] += 1
+        if duplicates:
+            self.n_plus_one_requests += 1
+        return duplicates
+
+    def as_dict(self):
+        requests = self.requests or 1
+        return {
+            'requests': self.requests,
+            'queries_avg': round(self.queries / requests, 2),
+            'queries_max': self.max_queries,
+            'db_ms_total': round(self.db_time * 1000, 2),
+            'db_ms_avg': round(self.db_time * 1000 / requests, 3),
+            'response_ms_avg': round(self.total_time * 1000 / requests, 3),
+            'n_plus_one_requests': self.n_plus_one_requests,
+            'n_plus_one': [
+                {'sql': sql, 'requests': count} for sql, count in self.n_plus_one.most_common(TOP_FINGERPRINTS)
+            ],
+            'top_queries': [
+                {
+                    'sql': sql,
+                    'count': self.fingerprint_counts[sql],
+                    'per_request': round(self.fingerprint_counts[sql] / requests, 2),
+                    'ms_total': round(seconds * 1000, 2),
+                }
+                for sql, seconds in self.fingerprint_time.most_common(TOP_FINGERPRINTS)
+            ],
+        }
+
+
+class SQLProfile:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = defaultdict(EndpointStats)
+        self.started_at = time.time()
+
+    def record(self, endpoint, recorder, elapsed):
+        with self._lock:
+            return self._endpoints[endpoint].add(recorder, elapsed)
+
+    def snapshot(self):
+        with self._lock:
+            endpoints = sorted(self._endpoints.items(), key=lambda item: item[1].db_time, reverse=True)
+            return {
+                'since': self.started_at,
+                'endpoints': {name: stats.as_dict() for name, stats in endpoints},
+            }
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self.started_at = time.time()
+
+
+profile = SQLProfile()
+
+
+def endpoint_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name or match.route
+
+
+# The recorder of the request being handled. A context variable rather
+# than per-connection execute_wrapper() blocks, because async views run
+# their queries on sync_to_async threads, each with its own connections;
+# those threads see a copy of the request's context.
+_current_recorder = ContextVar('sql_profiling_recorder', default=None)
+
+
+def _record(execute, sql, params, many, context):
+    recorder = _current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+_END = object()
+
+
+def _record_chunks(chunks, recorder):
+    # Set around each next() rather than across the yield, which would
+    # leak the recorder into the server's context
+    chunks = iter(chunks)
+    while True:
+        token = _current_recorder.set(recorder)
+        try:
+            chunk = next(chunks, _END)
+        finally:
+            _current_recorder.reset(token)
+        if chunk is _END:
+            return
+        yield chunk
+
+
+async def _arecord_chunks(chunks, recorder):
+    chunks = aiter(chunks)
+    while True:
+        token = _current_recorder.set(recorder)
+        try:
+            chunk = await anext(chunks, _END)
+        finally:
+            _current_recorder.reset(token)
+        if chunk is _END:
+            return
+        yield chunk
+
+
+@receiver(connection_created)
+def _install_recorder(sender, connection, **kwargs):
+    # First in the list, since execute_wrapper() blocks pop the last entry
+    if _record not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _record)
+
+
+class SQLProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        # Connections opened before this middleware was loaded
+        for connection in connections.all(initialized_only=True):
+            _install_recorder(None, connection)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self._acall(request)
+        if SAMPLE_RATE < 1 and random.random() >= SAMPLE_RATE:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        token = _current_recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_recorder.reset(token)
+        return self._finish(request, response, recorder, start)
+
+    async def _acall(self, request):
+        if SAMPLE_RATE < 1 and random.random() >= SAMPLE_RATE:
+            return await self.get_response(request)
+
+        recorder = QueryRecorder()
+        token = _current_recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_recorder.reset(token)
+        return self._finish(request, response, recorder, start)
+
+    def _finish(self, request, response, recorder, start):
+        if response.streaming:
+            # The body runs its queries while the server iterates it, after
+            # this returns: keep recording until close()
+            record_chunks = _arecord_chunks if response.is_async else _record_chunks
+            response.streaming_content = record_chunks(response.streaming_content, recorder)
+            response._resource_closers.append(lambda: self._record(request, recorder, start))
+            return response
+        self._record(request, recorder, start)
+        response['Server-Timing'] = f'db;dur={recorder.db_time * 1000:.1f};desc="{recorder.count} queries"'
+        return response
+
+    def _record(self, request, recorder, start):
+        elapsed = time.perf_counter() - start
+        name = endpoint_name(request)
+        for sql, count in profile.record(name, recorder, elapsed):
+            logger.warning('Possible N+1 on %s: %d x %s', name, count, sql)
+
+
+def sql_profile_view(request):
+    """Staff-only JSON dump of the collected statistics; POST resets them."""
+    user = request.user
+    if not (user.is_active and user.is_staff):
+        return JsonResponse({'detail': 'Staff only.'}, status=403)
+    if request.method == 'POST':
+        profile.reset()
+    return JsonResponse(profile.snapshot())
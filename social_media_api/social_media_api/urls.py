@@ -5,6 +5,8 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from .sql_profiling import sql_profile_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
 
@@ -16,6 +18,9 @@ urlpatterns = [
 
     # DRF login/logout views (optional but recommended)
     path('api-auth/', include('rest_framework.urls')),
+
+    # Per-endpoint SQL statistics, staff only
+    path('_profiling/sql/', sql_profile_view, name='sql-profile'),
 ]
 
 # Serve media files during development